@@ -1,7 +1,7 @@
 import time
 from concurrent.futures import ThreadPoolExecutor, Future
 
-from threading import Lock
+from threading import Lock, Condition
 from typing import Optional, Callable, List
 
 from one_dragon.base.conditional_operation.atomic_op import AtomicOp
@@ -18,6 +18,7 @@ from one_dragon.utils import thread_utils
 from one_dragon.utils.log_utils import log
 
 _od_conditional_op_executor = ThreadPoolExecutor(thread_name_prefix='od_conditional_op', max_workers=32)
+_NORMAL_SCENE_RETRY_SECONDS: float = 0.02  # 主循环没有命中的状态时 最晚多久后重新判断
 
 
 class ConditionalOperator(YamlConfig):
@@ -39,10 +40,18 @@ class ConditionalOperator(YamlConfig):
         self.normal_scene_handler: Optional[SceneHandler] = None  # 不需要状态触发的场景处理
         self.is_running: bool = False  # 整体是否正在运行
 
+        self._mutex_recorders: dict[str, List[StateRecorder]] = {}  # 状态 -> 互斥状态的记录器 初始化时找好
+
         self._task_lock: Lock = Lock()
         self.running_task: Optional[OperationTask] = None  # 正在运行的任务
         self.running_task_cnt: AtomicInt = AtomicInt()
 
+        # 调度线程 状态更新、任务完成、主循环到时 都会唤醒调度线程
+        self._schedule_cond: Condition = Condition()
+        self._pending_triggers: List[str] = []  # 待触发的状态 按更新顺序
+        self._schedule_dirty: bool = False  # 有任务完成或被打断 需要重新判断主循环
+        self._run_id: int = 0  # 每次开始运行时增加 用于结束上一次运行的调度线程
+
     def init(
             self,
             op_getter: Callable[[OperationDef], AtomicOp],
@@ -77,8 +86,58 @@ class ConditionalOperator(YamlConfig):
             else:
                 self.normal_scene_handler = handler
 
+        self._init_mutex_recorders()
         self._inited = True
 
+    def _init_mutex_recorders(self) -> None:
+        """
+        预先找好使用的状态的互斥状态记录器 状态更新时不需要每次查找
+        有记录器找不到的状态不放入 之后更新时再查找
+        :return:
+        """
+        self._mutex_recorders = {}
+        for state_name in self.get_usage_states():
+            mutex_recorders = self._find_mutex_recorders(state_name)
+            if mutex_recorders is not None:
+                self._mutex_recorders[state_name] = mutex_recorders
+
+    def _find_mutex_recorders(self, state_name: str) -> Optional[List[StateRecorder]]:
+        """
+        查找互斥状态的记录器
+        :param state_name: 状态
+        :return: 互斥状态的记录器 有记录器找不到时返回空
+        """
+        recorder = self.get_state_recorder(state_name)
+        if recorder is None:
+            return None
+        mutex_recorders = []
+        if recorder.mutex_list is not None:
+            for mutex_state in recorder.mutex_list:
+                mutex_recorder = self.get_state_recorder(mutex_state)
+                if mutex_recorder is None:
+                    return None
+                mutex_recorders.append(mutex_recorder)
+        return mutex_recorders
+
+    def _get_mutex_recorders(self, state_name: str) -> List[StateRecorder]:
+        """
+        获取互斥状态的记录器 优先使用初始化时找好的
+        :param state_name: 状态
+        :return:
+        """
+        mutex_recorders = self._mutex_recorders.get(state_name)
+        if mutex_recorders is not None:
+            return mutex_recorders
+
+        mutex_recorders = []
+        recorder = self.get_state_recorder(state_name)
+        if recorder is not None and recorder.mutex_list is not None:
+            for mutex_state in recorder.mutex_list:
+                mutex_recorder = self.get_state_recorder(mutex_state)
+                if mutex_recorder is not None:
+                    mutex_recorders.append(mutex_recorder)
+        return mutex_recorders
+
     def dispose(self) -> None:
         """
         销毁 要对子模块进行完全销毁
@@ -102,55 +161,100 @@ class ConditionalOperator(YamlConfig):
         if self.is_running:
             return False
 
-        self.is_running = True
-        self.running_task_cnt.set(0)  # 每次重置计数器 防止有bug导致无法正常运行
+        with self._schedule_cond:
+            self.is_running = True
+            self.running_task_cnt.set(0)  # 每次重置计数器 防止有bug导致无法正常运行
+            self._pending_triggers.clear()
+            self._schedule_dirty = False
+            self._run_id += 1
+            run_id = self._run_id
 
-        if self.normal_scene_handler is not None:
-            future: Future = _od_conditional_op_executor.submit(self._normal_scene_loop)
-            future.add_done_callback(thread_utils.handle_future_result)
+        future: Future = _od_conditional_op_executor.submit(self._schedule_loop, run_id)
+        future.add_done_callback(thread_utils.handle_future_result)
 
         return True
 
-    def _normal_scene_loop(self) -> None:
+    def _wake_scheduler(self, state_name: Optional[str] = None) -> None:
+        """
+        唤醒调度线程
+        :param state_name: 需要触发场景的状态 为空时只重新判断主循环
+        :return:
         """
-        主循环
+        with self._schedule_cond:
+            if state_name is None:
+                self._schedule_dirty = True
+            elif state_name not in self._pending_triggers:  # 还没处理的相同状态 只需要触发一次
+                self._pending_triggers.append(state_name)
+            self._schedule_cond.notify()
+
+    def _schedule_loop(self, run_id: int) -> None:
+        """
+        调度线程 处理状态触发的场景 以及没有其它场景运行时的主循环
+        没有需要处理的内容时 等待唤醒或者主循环的下一次判断时间
+        :param run_id: 本次运行的id
         :return:
         """
+        next_normal_time: Optional[float] = 0 if self.normal_scene_handler is not None else None
+        while True:
+            with self._schedule_cond:
+                while (self.is_running and self._run_id == run_id
+                       and len(self._pending_triggers) == 0 and not self._schedule_dirty):
+                    if next_normal_time is None:
+                        self._schedule_cond.wait()
+                        continue
+                    timeout = next_normal_time - time.time()
+                    if timeout <= 0:
+                        break
+                    self._schedule_cond.wait(timeout)
+
+                if not self.is_running or self._run_id != run_id:
+                    # 已经被stop_running中断了 不继续
+                    break
+
+                trigger_list = self._pending_triggers
+                self._pending_triggers = []
+                self._schedule_dirty = False
+
+            for state_name in trigger_list:
+                self._trigger_scene(state_name)
+
+            if self.normal_scene_handler is not None:
+                next_normal_time = self._run_normal_scene()
+
+    def _run_normal_scene(self) -> Optional[float]:
+        """
+        没有其它场景在运行时 判断一次主循环
+        :return: 下一次需要判断的时间 为空时等待任务完成后再判断
+        """
+        if self.running_task_cnt.get() > 0:
+            # 有其它场景在运行 等待完成后唤醒
+            return None
+
         normal_handler_id = id(self.normal_scene_handler)
-        while self.is_running:
-            if self.running_task_cnt.get() > 0:
-                # 有其它场景在运行 等待
-                time.sleep(0.02)
-            else:
-                # log.debug('开始等待新的主循环')
-                to_sleep: Optional[float] = None
+        trigger_time = time.time()
+        last_trigger_time = self.last_trigger_time.get(normal_handler_id, 0)
+        past_time = trigger_time - last_trigger_time
+        if past_time < self.normal_scene_handler.interval_seconds:
+            return last_trigger_time + self.normal_scene_handler.interval_seconds
 
-                # 上锁后确保运行状态不会被篡改
-                with self._task_lock:
-                    if not self.is_running:
-                        # 已经被stop_running中断了 不继续
-                        break
+        new_task = self.normal_scene_handler.get_operations(trigger_time)
+        if new_task is None:
+            # 没有命中的状态 状态变化时会被唤醒 但条件也可能随时间满足 到时也需要重新判断
+            return trigger_time + _NORMAL_SCENE_RETRY_SECONDS
+
+        # 上锁后确保运行状态不会被篡改
+        with self._task_lock:
+            if not self.is_running:
+                # 已经被stop_running中断了 不继续
+                return None
 
-                    trigger_time = time.time()
-                    last_trigger_time = self.last_trigger_time.get(normal_handler_id, 0)
-                    past_time = trigger_time - last_trigger_time
-                    if past_time < self.normal_scene_handler.interval_seconds:
-                        to_sleep = self.normal_scene_handler.interval_seconds - past_time
-                    else:
-                        new_task = self.normal_scene_handler.get_operations(trigger_time)
-                        if new_task is not None:
-                            log.debug(f'当前场景 主循环 当前条件 {new_task.expr_display}')
-                            self.running_task = new_task
-                            self.last_trigger_time[normal_handler_id] = trigger_time
-                            self.running_task_cnt.inc()
-                            future = self.running_task.run_async()
-                            future.add_done_callback(self._on_task_done)
-
-                if to_sleep is not None:
-                    # 等待时间不能写在锁里 要尽快释放锁
-                    time.sleep(to_sleep)
-                else:  # 没有命中的状态 或者 提交执行了 那就自旋等待
-                    time.sleep(0.02)
+            log.debug(f'当前场景 主循环 当前条件 {new_task.expr_display}')
+            self.running_task = new_task
+            self.last_trigger_time[normal_handler_id] = trigger_time
+            self.running_task_cnt.inc()
+            future = self.running_task.run_async()
+            future.add_done_callback(self._on_task_done)
+            return None
 
     def _trigger_scene(self, state_name: str) -> None:
         """
@@ -163,22 +267,26 @@ class ConditionalOperator(YamlConfig):
         handler = self.trigger_scene_handler[state_name]
         trigger_handler_id = id(handler)
 
+        if not self.is_running:
+            return
+
+        # 只有调度线程会判断和修改触发时间 判断状态时不需要上锁 状态记录器的快照保证了一致性
+        trigger_time: float = time.time()  # 这里不应该使用事件发生时间 而是应该使用当前的实际操作时间
+        last_trigger_time = self.last_trigger_time.get(trigger_handler_id, 0)
+        if trigger_time - last_trigger_time < handler.interval_seconds:  # 冷却时间没过 不触发
+            return
+
+        new_task = handler.get_operations(trigger_time)
+        # 若new_task为空，即无匹配state，则不打断当前task
+        if new_task is None:
+            return
+
         # 上锁后确保运行状态不会被篡改
         with self._task_lock:
             if not self.is_running:
                 # 已经被stop_running中断了 不继续
                 return
 
-            trigger_time: float = time.time()  # 这里不应该使用事件发生时间 而是应该使用当前的实际操作时间
-            last_trigger_time = self.last_trigger_time.get(trigger_handler_id, 0)
-            if trigger_time - last_trigger_time < handler.interval_seconds:  # 冷却时间没过 不触发
-                return
-
-            new_task = handler.get_operations(trigger_time)
-            # 若new_task为空，即无匹配state，则不打断当前task
-            if new_task is None:
-                return
-
             can_interrupt: bool = False
             if self.running_task is not None:
                 old_priority = self.running_task.priority
@@ -215,6 +323,9 @@ class ConditionalOperator(YamlConfig):
         with self._task_lock:
             self.is_running = False
             self._stop_running_task()
+        with self._schedule_cond:
+            self._pending_triggers.clear()
+            self._schedule_cond.notify_all()
 
     def _stop_running_task(self) -> None:
         """
@@ -228,6 +339,7 @@ class ConditionalOperator(YamlConfig):
                 # 如果 finish=True 则计数器已经在 _on_task_done 减少了 这里就不减了
                 # 如果 finish=False 则代表还有操作在继续。在这里要减少计数器而不是等_on_task_done 让无触发器场景尽早运行
                 self.running_task_cnt.dec()
+                self._wake_scheduler()
 
     def _on_task_done(self, future: Future) -> None:
         """
@@ -241,6 +353,7 @@ class ConditionalOperator(YamlConfig):
                     self.running_task.priority = None
             except Exception:  # run_async里有callback打印日志
                 pass
+        self._wake_scheduler()
 
     def get_usage_states(self) -> set[str]:
         """
@@ -274,10 +387,9 @@ class ConditionalOperator(YamlConfig):
         if state_recorder is None:
             return
 
-        # 再去触发具体的场景 由自己的线程处理
-        if not state_record.is_clear:
-            future: Future = _od_conditional_op_executor.submit(self._trigger_scene, state_recorder.state_name)
-            future.add_done_callback(thread_utils.handle_future_result)
+        # 再去触发具体的场景 由调度线程处理
+        if not state_record.is_clear and self.is_running:
+            self._wake_scheduler(state_recorder.state_name)
 
     def batch_update_states(self, state_records: List[StateRecord]) -> None:
         """
@@ -319,10 +431,10 @@ class ConditionalOperator(YamlConfig):
                 top_priority_handler = handler
                 top_priority_state = state_name
 
-        # 触发具体的场景 由自己的线程处理
+        # 触发具体的场景 由调度线程处理
         if top_priority_state is not None:
-            future: Future = _od_conditional_op_executor.submit(self._trigger_scene, top_priority_state)
-            future.add_done_callback(thread_utils.handle_future_result)
+            if self.is_running:
+                self._wake_scheduler(top_priority_state)
         else:
             # 没有场景需要触发 看是否需要打断当前操作
             with self._task_lock:
@@ -354,11 +466,7 @@ class ConditionalOperator(YamlConfig):
             recorder.clear_state_record()
         else:
             recorder.update_state_record(new_record)
-            if recorder.mutex_list is not None:
-                for mutex_state in recorder.mutex_list:
-                    mutex_recorder = self.get_state_recorder(mutex_state)
-                    if mutex_recorder is None:
-                        continue
-                    mutex_recorder.clear_state_record()
+            for mutex_recorder in self._get_mutex_recorders(new_record.state_name):
+                mutex_recorder.clear_state_record()
 
         return recorder
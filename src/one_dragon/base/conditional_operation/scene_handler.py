@@ -1,7 +1,11 @@
+import bisect
+import heapq
+import math
 from typing import List, Optional
 
 from one_dragon.base.conditional_operation.operation_task import OperationTask
 from one_dragon.base.conditional_operation.state_handler import StateHandler
+from one_dragon.base.conditional_operation.state_recorder import StateRecorder
 
 
 class SceneHandler:
@@ -11,18 +15,104 @@ class SceneHandler:
         self.state_handlers: List[StateHandler] = state_handlers
         self.priority: Optional[int] = priority  # 优先级 只能被高等级的打断；为None时可以被随意打断
 
+        # 判断不通过的处理器 在使用的状态变化或者到达可能变化的时间前 都不需要再判断
+        # 只有调度线程会调用 get_operations 以下内容不需要加锁
+        self._recorders: List[StateRecorder] = []  # 场景中使用的状态记录器
+        self._recorder_versions: List[int] = []  # 上次判断时 各状态记录器的版本
+        self._dependent_handlers: List[List[int]] = []  # 状态记录器 -> 使用了它的处理器下标
+        self._candidates: List[int] = []  # 可能通过判断的处理器下标 按顺序
+        self._is_candidate: List[bool] = []  # 处理器是否在 _candidates 中
+        self._wake_time: List[float] = []  # 判断不通过的处理器 最早可能通过的时间
+        self._wake_heap: List[tuple[float, int]] = []  # (最早可能通过的时间, 处理器下标)
+        self._init_state_index()
+
+    def _init_state_index(self) -> None:
+        """
+        建立 状态记录器 -> 处理器 的反向索引
+        状态记录变化后 只需要重新判断使用了这个状态的处理器
+        :return:
+        """
+        self._recorders = []
+        self._dependent_handlers = []
+        for idx, sh in enumerate(self.state_handlers):
+            handler_recorders: List[StateRecorder] = []
+            sh.collect_state_recorders(handler_recorders)
+            for recorder in handler_recorders:
+                recorder_idx = next((i for i, r in enumerate(self._recorders) if r is recorder), -1)
+                if recorder_idx == -1:
+                    recorder_idx = len(self._recorders)
+                    self._recorders.append(recorder)
+                    self._dependent_handlers.append([])
+                self._dependent_handlers[recorder_idx].append(idx)
+
+        handler_cnt = len(self.state_handlers)
+        self._recorder_versions = [r.record[2] for r in self._recorders]
+        self._candidates = list(range(handler_cnt))
+        self._is_candidate = [True] * handler_cnt
+        self._wake_time = [0] * handler_cnt
+        self._wake_heap = []
+
     def get_operations(self, trigger_time: float) -> Optional[OperationTask]:
         """
         根据触发时间 和优先级 获取符合条件的场景下的指令
         :param trigger_time: 触发时间
         :return:
         """
-        for sh in self.state_handlers:
+        self._refresh_candidates(trigger_time)
+
+        task: Optional[OperationTask] = None
+        not_match_cnt: int = 0
+        for idx in self._candidates:
+            sh = self.state_handlers[idx]
             task = sh.get_operations(trigger_time)
             if task is not None:
                 task.set_priority(self.priority)
-                return task
-        return None
+                break
+
+            not_match_cnt += 1
+            self._is_candidate[idx] = False
+            wake_time = sh.get_next_change_time(trigger_time)
+            self._wake_time[idx] = wake_time
+            if wake_time != math.inf:
+                heapq.heappush(self._wake_heap, (wake_time, idx))
+
+        # 判断不通过的都在前面 命中的和之后没有判断的继续保留
+        del self._candidates[:not_match_cnt]
+        return task
+
+    def _refresh_candidates(self, trigger_time: float) -> None:
+        """
+        判断前 将可能通过判断的处理器重新加入
+        状态记录版本有变化的 不管是谁更新的 使用了它的处理器都需要重新判断
+        判断前读取版本 判断过程中有状态更新时 下次版本不一致 也会重新判断
+        :param trigger_time: 触发时间
+        :return:
+        """
+        versions = self._recorder_versions
+        for recorder_idx, recorder in enumerate(self._recorders):
+            version = recorder.record[2]
+            if version != versions[recorder_idx]:
+                versions[recorder_idx] = version
+                for idx in self._dependent_handlers[recorder_idx]:
+                    self._add_candidate(idx)
+
+        heap = self._wake_heap
+        while len(heap) > 0 and heap[0][0] <= trigger_time:
+            wake_time, idx = heapq.heappop(heap)
+            if self._wake_time[idx] == wake_time:  # 重新判断过的 旧的时间不再有效
+                self._add_candidate(idx)
+
+    def _add_candidate(self, idx: int) -> None:
+        """
+        将处理器重新加入可能通过判断的列表
+        :param idx: 处理器下标
+        :return:
+        """
+        if self._is_candidate[idx]:
+            return
+        self._is_candidate[idx] = True
+        self._wake_time[idx] = 0
+        bisect.insort(self._candidates, idx)
 
     def get_usage_states(self) -> set[str]:
         """
@@ -42,3 +132,6 @@ class SceneHandler:
         if self.state_handlers is not None:
             for handler in self.state_handlers:
                 handler.dispose()
+        self._recorders = []
+        self._dependent_handlers = []
+        self._wake_heap = []
@@ -1,5 +1,6 @@
+import math
 from enum import Enum
-from typing import Optional, Callable
+from typing import Optional, Callable, List
 
 from one_dragon.base.conditional_operation.state_recorder import StateRecorder
 from one_dragon.utils.log_utils import log
@@ -57,21 +58,97 @@ class StateCalNode:
         self.state_value_range_min: int = state_value_range_min
         self.state_value_range_max: int = state_value_range_max
 
+        self._compiled: Optional[Callable[[float], bool]] = None  # 编译后的判断函数 第一次判断时生成
+        self._time_ranges: Optional[List[tuple[StateRecorder, float, float]]] = None  # 所有状态记录器节点的时间区间 第一次计算变化时间时生成
+
     def in_time_range(self, now: float) -> bool:
         """
         根据当前时间 判断是否在状态的生效时间范围内
+        使用编译后的判断函数 结果和短路方式与逐个节点判断一致
+        :param now: 当前时间
+        :return:
+        """
+        if self._compiled is None:
+            self._compiled = self.compile()
+        return self._compiled(now)
+
+    def compile(self) -> Callable[[float], bool]:
+        """
+        将整棵树编译成一个函数 运行时不再逐层递归和比较节点类型
+        状态记录器按出现顺序编号 编号即函数参数中的下标 同一个记录器只占一个编号
+        函数开始时读取所有状态记录器的快照 整次判断使用同一份记录
+        :return: 入参为当前时间的判断函数
+        """
+        recorder_list: List[StateRecorder] = []
+        const_list: List = []
+        try:
+            expr = self._to_expr(recorder_list, const_list)
+            arg_list = ['now']
+            arg_list += ['r%d=_r[%d]' % (i, i) for i in range(len(recorder_list))]
+            arg_list += ['c%d=_c[%d]' % (i, i) for i in range(len(const_list))]
+            line_list = ['def _cal(%s):' % ', '.join(arg_list)]
+            line_list += ['    s%d = r%d.record' % (i, i) for i in range(len(recorder_list))]  # 即 snapshot() 省去函数调用
+            line_list.append('    return %s' % expr)
+            source = '\n'.join(line_list) + '\n'
+            namespace = {'_r': recorder_list, '_c': const_list}
+            exec(source, namespace)
+            return namespace['_cal']
+        except (SyntaxError, RecursionError, MemoryError):  # 嵌套过深时 退回逐层判断
+            log.debug('状态判断树无法编译 逐层判断')
+            return self._in_time_range_by_node
+
+    def _to_expr(self, recorder_list: List[StateRecorder], const_list: List) -> str:
+        """
+        生成本节点的判断表达式
+        :param recorder_list: 已编号的状态记录器
+        :param const_list: 已编号的常量
+        :return:
+        """
+        if self.node_type == StateCalNodeType.OP:
+            if self.op_type == StateCalOpType.AND:
+                return '(%s and %s)' % (self.left_child._to_expr(recorder_list, const_list),
+                                        self.right_child._to_expr(recorder_list, const_list))
+            elif self.op_type == StateCalOpType.OR:
+                return '(%s or %s)' % (self.left_child._to_expr(recorder_list, const_list),
+                                       self.right_child._to_expr(recorder_list, const_list))
+            elif self.op_type == StateCalOpType.NOT:
+                return '(not %s)' % self.left_child._to_expr(recorder_list, const_list)
+            else:
+                return 'None'
+        elif self.node_type == StateCalNodeType.STATE:
+            snapshot = 's%d' % _get_or_add_idx(recorder_list, self.state_recorder)
+            time_min = 'c%d' % _get_or_add_idx(const_list, self.state_time_range_min)
+            time_max = 'c%d' % _get_or_add_idx(const_list, self.state_time_range_max)
+            expr = '%s <= now - %s[0] <= %s' % (time_min, snapshot, time_max)
+            if self.state_value_range_min is not None and self.state_value_range_max is not None:
+                value_min = 'c%d' % _get_or_add_idx(const_list, self.state_value_range_min)
+                value_max = 'c%d' % _get_or_add_idx(const_list, self.state_value_range_max)
+                expr = '(%s and %s[1] is not None and %s <= %s[1] <= %s)' % (
+                    expr, snapshot, value_min, snapshot, value_max)
+            else:
+                expr = '(%s)' % expr
+            return expr
+        elif self.node_type == StateCalNodeType.TRUE:
+            return 'True'
+        else:
+            return 'None'
+
+    def _in_time_range_by_node(self, now: float) -> bool:
+        """
+        逐层判断是否在状态的生效时间范围内
         :param now: 当前时间
         :return:
         """
         if self.node_type == StateCalNodeType.OP:
             if self.op_type == StateCalOpType.AND:
-                return self.left_child.in_time_range(now) and self.right_child.in_time_range(now)
+                return self.left_child._in_time_range_by_node(now) and self.right_child._in_time_range_by_node(now)
             elif self.op_type == StateCalOpType.OR:
-                return self.left_child.in_time_range(now) or self.right_child.in_time_range(now)
+                return self.left_child._in_time_range_by_node(now) or self.right_child._in_time_range_by_node(now)
             elif self.op_type == StateCalOpType.NOT:
-                return not self.left_child.in_time_range(now)
+                return not self.left_child._in_time_range_by_node(now)
         elif self.node_type == StateCalNodeType.STATE:
-            diff = now - self.state_recorder.last_record_time
+            last_record_time, last_value, _ = self.state_recorder.snapshot()
+            diff = now - last_record_time
             # log.debug('状态 [ %s ] 距离上次 %.2f, 要求区间 [%.2f, %.2f]' % (
             #     self.state_recorder.state_name,
             #     999 if diff > 999 else diff,
@@ -87,15 +164,67 @@ class StateCalNode:
                 #     self.state_value_range_min,
                 #     self.state_value_range_max
                 # ))
-                if self.state_recorder.last_value is None:
+                if last_value is None:
                     value_valid = False
                 else:
-                    value_valid = self.state_value_range_min <= self.state_recorder.last_value <= self.state_value_range_max
+                    value_valid = self.state_value_range_min <= last_value <= self.state_value_range_max
 
             return time_valid and value_valid
         elif self.node_type == StateCalNodeType.TRUE:
             return True
 
+    def get_next_change_time(self, now: float) -> float:
+        """
+        状态值不变时 判断结果最早可能在什么时间发生变化
+        只有状态记录器节点的时间区间会随时间变化 取所有状态记录器节点中最早的区间边界
+        :param now: 当前时间
+        :return: 下一次可能变化的时间 不会再变化时返回 inf
+        """
+        if self._time_ranges is None:
+            time_ranges: List[tuple[StateRecorder, float, float]] = []
+            self._collect_time_ranges(time_ranges)
+            self._time_ranges = time_ranges
+
+        change_time = math.inf
+        for recorder, time_min, time_max in self._time_ranges:
+            last_record_time = recorder.record[0]
+            diff = now - last_record_time  # 与判断时的计算方式一致
+            if diff < time_min:
+                boundary = last_record_time + time_min
+            elif diff <= time_max:
+                boundary = last_record_time + time_max
+            else:
+                continue
+            if boundary < change_time:
+                change_time = boundary
+        return change_time
+
+    def _collect_time_ranges(self, time_ranges: List[tuple[StateRecorder, float, float]]) -> None:
+        """
+        收集所有状态记录器节点的时间区间
+        :param time_ranges: 列表 (状态记录器, 时间区间最小值, 时间区间最大值)
+        :return:
+        """
+        if self.node_type == StateCalNodeType.STATE:
+            time_ranges.append((self.state_recorder, self.state_time_range_min, self.state_time_range_max))
+        if self.left_child is not None:
+            self.left_child._collect_time_ranges(time_ranges)
+        if self.right_child is not None:
+            self.right_child._collect_time_ranges(time_ranges)
+
+    def collect_state_recorders(self, recorder_list: List[StateRecorder]) -> None:
+        """
+        收集使用的状态记录器 同一个记录器只加入一次
+        :param recorder_list: 列表
+        :return:
+        """
+        if self.state_recorder is not None:
+            _get_or_add_idx(recorder_list, self.state_recorder)
+        if self.left_child is not None:
+            self.left_child.collect_state_recorders(recorder_list)
+        if self.right_child is not None:
+            self.right_child.collect_state_recorders(recorder_list)
+
     def get_usage_states(self) -> set[str]:
         """
         获取使用的状态
@@ -115,6 +244,8 @@ class StateCalNode:
         销毁时 将子节点都销毁了
         :return:
         """
+        self._compiled = None
+        self._time_ranges = None
         if self.node_type == StateCalNodeType.OP:
             if self.op_type in [StateCalOpType.AND, StateCalOpType.OR]:
                 self.left_child.dispose()
@@ -125,6 +256,20 @@ class StateCalNode:
             self.state_recorder.dispose()
 
 
+def _get_or_add_idx(item_list: List, item) -> int:
+    """
+    获取对象在列表中的下标 不存在时加入
+    :param item_list: 列表
+    :param item: 对象
+    :return:
+    """
+    for idx, existed in enumerate(item_list):
+        if existed is item:
+            return idx
+    item_list.append(item)
+    return len(item_list) - 1
+
+
 def construct_state_cal_tree(expr_str: str, state_getter: Callable[[str], StateRecorder]) -> StateCalNode:
     """
     根据表达式 构造出状态判断树
@@ -269,7 +414,9 @@ def construct_state_cal_tree(expr_str: str, state_getter: Callable[[str], StateR
     if len(node_stack) > 1:
         raise ValueError('有多段表达式 未使用运算符连接')
     else:
-        return node_stack[0]
+        root = node_stack[0]
+        root._compiled = root.compile()  # 构造时编译 避免第一次触发时的耗时
+        return root
 
             
 def __debug():
@@ -1,8 +1,10 @@
+import math
 from typing import List, Optional, Set
 
 from one_dragon.base.conditional_operation.atomic_op import AtomicOp
 from one_dragon.base.conditional_operation.operation_task import OperationTask
 from one_dragon.base.conditional_operation.state_cal_tree import StateCalNode
+from one_dragon.base.conditional_operation.state_recorder import StateRecorder
 from one_dragon.utils.log_utils import log
 
 
@@ -49,6 +51,32 @@ class StateHandler:
 
         return None
 
+    def get_next_change_time(self, now: float) -> float:
+        """
+        状态记录不变时 判断结果最早可能在什么时间发生变化 包括子处理器
+        :param now: 当前时间
+        :return: 下一次可能变化的时间 不会再变化时返回 inf
+        """
+        change_time = math.inf
+        if self.state_cal_tree is not None:
+            change_time = self.state_cal_tree.get_next_change_time(now)
+        if self.sub_handlers is not None:
+            for sub in self.sub_handlers:
+                change_time = min(change_time, sub.get_next_change_time(now))
+        return change_time
+
+    def collect_state_recorders(self, recorder_list: List[StateRecorder]) -> None:
+        """
+        收集使用的状态记录器 包括子处理器 同一个记录器只加入一次
+        :param recorder_list: 列表
+        :return:
+        """
+        if self.state_cal_tree is not None:
+            self.state_cal_tree.collect_state_recorders(recorder_list)
+        if self.sub_handlers is not None:
+            for sub in self.sub_handlers:
+                sub.collect_state_recorders(recorder_list)
+
     def get_usage_states(self) -> set[str]:
         """
         获取使用的状态
@@ -1,5 +1,8 @@
+import itertools
 from typing import Optional, List
 
+_version_counter = itertools.count(1)  # 所有记录器共用 next() 在GIL下是原子的 每次发布的记录版本都不同
+
 
 class StateRecord:
 
@@ -23,8 +26,47 @@ class StateRecorder:
         self.state_name: str = state_name
         self.mutex_list: List[str] = mutex_list  # 互斥的状态 这种状态出现的时候 就会将自身状态清空
 
-        self.last_record_time: float = -1  # 上次记录这个状态的时间 -1代表还没有触发过 0代表被清除
-        self.last_value: Optional[int] = None  # 上一次记录的值
+        # (上次记录这个状态的时间, 上一次记录的值, 版本)
+        # 时间 -1代表还没有触发过 0代表被清除；版本每次变化时取一个新的 只增不减且不会重复
+        # 每次变化都整体替换 识别线程更新时不需要加锁 读取方也不会看到只更新了一半的记录
+        # 只读 修改需要通过 update_state_record 和 clear_state_record
+        self.record: tuple[float, Optional[int], int] = (-1, None, 0)
+
+    def snapshot(self) -> tuple[float, Optional[int], int]:
+        """
+        当前记录的快照 一次判断中应该只读取一次
+        :return: (上次记录的时间, 上一次记录的值, 版本)
+        """
+        return self.record
+
+    @property
+    def last_record_time(self) -> float:
+        """
+        上次记录这个状态的时间 -1代表还没有触发过 0代表被清除
+        """
+        return self.record[0]
+
+    @last_record_time.setter
+    def last_record_time(self, new_value: float) -> None:
+        self.record = (new_value, self.record[1], next(_version_counter))
+
+    @property
+    def last_value(self) -> Optional[int]:
+        """
+        上一次记录的值
+        """
+        return self.record[1]
+
+    @last_value.setter
+    def last_value(self, new_value: Optional[int]) -> None:
+        self.record = (self.record[0], new_value, next(_version_counter))
+
+    @property
+    def version(self) -> int:
+        """
+        记录的版本 每次变化时取新的版本 不同的记录不会有相同的版本
+        """
+        return self.record[2]
 
     def update_state_record(self, record: StateRecord) -> None:
         """
@@ -32,25 +74,26 @@ class StateRecorder:
         :param record:
         :return:
         """
-        self.last_record_time = record.trigger_time
-        if self.last_value is None:
-            self.last_value = 0
+        last_value = self.record[1]
+        if last_value is None:
+            last_value = 0
 
         if record.value is not None:
-            self.last_value = record.value
+            last_value = record.value
 
         if record.value_add is not None:
-            self.last_value += record.value_add
+            last_value += record.value_add
+
+        self.record = (record.trigger_time, last_value, next(_version_counter))
 
     def clear_state_record(self) -> None:
         """
         互斥事件发生时 清空
         """
-        if self.last_record_time == -1:
+        if self.record[0] == -1:
             # 原来没有出现过的话 就不重置
             return
-        self.last_record_time = 0
-        self.last_value = None
+        self.record = (0, None, next(_version_counter))
 
     def dispose(self) -> None:
         """
@@ -60,4 +103,3 @@ class StateRecorder:
         self.state_name = None
         self.mutex_list = None
         self.last_value = None
-        self.last_value = None
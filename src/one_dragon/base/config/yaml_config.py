@@ -32,7 +32,7 @@ class YamlConfig(YamlOperator):
         self._copy_from_sample: bool = copy_from_sample
         """配置文件不存在时 是否从sample文件中读取"""
 
-        YamlOperator.__init__(self, self._get_yaml_file_path())
+        YamlOperator.__init__(self, self._get_yaml_file_path(), write_behind=True)
 
     def _get_yaml_file_path(self) -> Optional[str]:
         """
@@ -1,17 +1,22 @@
+import copy
 import os
 from typing import Optional
 
 import yaml
 
+from one_dragon.base.config.yaml_write_behind import yaml_write_behind
+from one_dragon.utils import yaml_utils
 from one_dragon.utils.log_utils import log
 
 
 class YamlOperator:
 
-    def __init__(self, file_path: Optional[str] = None):
+    def __init__(self, file_path: Optional[str] = None, write_behind: bool = False, is_asset: bool = False):
         """
         yml文件的操作器
         :param file_path: yml文件的路径。不传入时认为是mock，用于测试。
+        :param write_behind: update时是否延迟保存 由后台线程合并写入
+        :param is_asset: 是否只读的静态资源 是的话会使用解析结果的缓存
         """
 
         self.file_path: str = file_path
@@ -20,6 +25,12 @@ class YamlOperator:
         self.data: dict = {}
         """存放数据的地方"""
 
+        self.write_behind: bool = write_behind
+        """update时是否延迟保存"""
+
+        self.is_asset: bool = is_asset
+        """是否只读的静态资源"""
+
         self.__read_from_file()
 
     def __read_from_file(self) -> None:
@@ -29,12 +40,15 @@ class YamlOperator:
         """
         if self.file_path is None:
             return
+        yaml_write_behind.flush(self.file_path)  # 先写入未保存的修改 保证读取到最新内容
         if not os.path.exists(self.file_path):
             return
 
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                self.data = yaml.safe_load(file)
+            if self.is_asset:
+                self.data = yaml_utils.load_asset_file(self.file_path)
+            else:
+                self.data = yaml_utils.load_file(self.file_path)
         except Exception:
             log.error(f'文件读取失败 将使用默认值 {self.file_path}', exc_info=True)
             return
@@ -46,8 +60,24 @@ class YamlOperator:
         if self.file_path is None:
             return
 
-        with open(self.file_path, 'w', encoding='utf-8') as file:
-            yaml.dump(self.data, file, allow_unicode=True, sort_keys=False)
+        yaml_write_behind.save(self.file_path, self.dump_to_text())
+
+    def save_later(self) -> None:
+        """
+        延迟保存 由后台线程合并多次修改后写入文件
+        :return:
+        """
+        if self.file_path is None:
+            return
+        yaml_write_behind.mark_dirty(self)
+
+    def dump_to_text(self) -> str:
+        """
+        将当前数据转化成yml文本
+        :return:
+        """
+        data = copy.deepcopy(self.data) if self.data is not None else {}  # 深拷贝一份 避免转化过程中嵌套的内容被其它线程修改
+        return yaml.dump(data, allow_unicode=True, sort_keys=False)
 
     def save_diy(self, text: str):
         """
@@ -58,8 +88,7 @@ class YamlOperator:
         if self.file_path is None:
             return
 
-        with open(self.file_path, "w", encoding="utf-8") as file:
-            file.write(text)
+        yaml_write_behind.save(self.file_path, text)
 
     def get(self, prop: str, value=None):
         return self.data.get(prop, value)
@@ -71,13 +100,17 @@ class YamlOperator:
             return
         self.data[key] = value
         if save:
-            self.save()
+            if self.write_behind:
+                self.save_later()
+            else:
+                self.save()
 
     def delete(self):
         """
         删除配置文件
         :return:
         """
+        yaml_write_behind.discard(self.file_path)
         if os.path.exists(self.file_path):
             os.remove(self.file_path)
 
@@ -0,0 +1,136 @@
+import atexit
+import threading
+import time
+from typing import Optional, ClassVar
+
+from one_dragon.utils import file_utils
+from one_dragon.utils.log_utils import log
+
+
+class YamlWriteBehind:
+
+    MAX_RETRY_TIMES: ClassVar[int] = 3  # 写入失败时最多尝试的次数
+
+    def __init__(self, delay: float = 0.5):
+        """
+        配置文件的延迟写入
+        标记需要保存的配置 由后台线程合并多次修改后统一写入文件
+        :param delay: 第一次标记后 等待多少秒再写入 期间的修改会合并为一次写入
+        """
+        self.delay: float = delay
+        """合并写入的等待秒数"""
+
+        self._dirty_map: dict[str, object] = {}  # 文件路径 -> YamlOperator
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # 保证同一时间只有一个线程在写文件 读取时可以等待写完
+        self._thread: Optional[threading.Thread] = None
+        self._fail_cnt: dict[str, int] = {}  # 文件路径 -> 连续写入失败的次数
+
+    def mark_dirty(self, operator) -> None:
+        """
+        标记一个配置需要保存
+        :param operator: YamlOperator
+        :return:
+        """
+        if operator.file_path is None:
+            return
+        with self._cond:
+            self._dirty_map[operator.file_path] = operator
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='od_yaml_write_behind', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def discard(self, file_path: Optional[str]) -> None:
+        """
+        放弃一个文件未写入的修改 用于删除配置文件前
+        :param file_path: 文件路径
+        :return:
+        """
+        with self._write_lock:
+            with self._cond:
+                self._dirty_map.pop(file_path, None)
+
+    def save(self, file_path: str, text: str) -> None:
+        """
+        在当前线程中立刻写入文件 并放弃这个文件未写入的延迟修改
+        和后台写入使用同一个锁 避免同时写入同一个文件
+        :param file_path: 文件路径
+        :param text: 文件内容
+        :return:
+        """
+        with self._write_lock:
+            with self._cond:
+                self._dirty_map.pop(file_path, None)
+            self._fail_cnt.pop(file_path, None)
+            file_utils.save_text_atomically(file_path, text)
+
+    def flush(self, file_path: Optional[str] = None) -> None:
+        """
+        在当前线程中立刻写入未保存的修改
+        :param file_path: 只写入这个文件 不传入时写入全部
+        :return:
+        """
+        with self._write_lock:
+            with self._cond:
+                if file_path is None:
+                    to_write = list(self._dirty_map.values())
+                    self._dirty_map.clear()
+                else:
+                    operator = self._dirty_map.pop(file_path, None)
+                    to_write = [] if operator is None else [operator]
+            for operator in to_write:
+                self._write(operator)
+
+    def has_dirty(self, file_path: Optional[str] = None) -> bool:
+        """
+        是否有未写入的修改
+        :param file_path: 文件路径 不传入时判断全部
+        :return:
+        """
+        with self._cond:
+            if file_path is None:
+                return len(self._dirty_map) > 0
+            else:
+                return file_path in self._dirty_map
+
+    def _run(self) -> None:
+        """
+        后台写入线程
+        :return:
+        """
+        while True:
+            with self._cond:
+                while len(self._dirty_map) == 0:
+                    self._cond.wait()
+            time.sleep(self.delay)  # 等待一段时间 合并这期间的修改
+            self.flush()
+
+    def _write(self, operator) -> None:
+        """
+        写入一个配置 失败时重新标记 下一轮再尝试写入
+        :param operator: YamlOperator
+        :return:
+        """
+        file_path = operator.file_path
+        try:
+            text = operator.dump_to_text()
+            file_utils.save_text_atomically(file_path, text)
+            self._fail_cnt.pop(file_path, None)
+        except Exception:
+            fail_cnt = self._fail_cnt.get(file_path, 0) + 1
+            if fail_cnt >= YamlWriteBehind.MAX_RETRY_TIMES:
+                self._fail_cnt.pop(file_path, None)
+                log.error(f'配置保存失败 {file_path}', exc_info=True)
+                return
+            self._fail_cnt[file_path] = fail_cnt
+            log.warning(f'配置保存失败 稍后重试 {file_path}', exc_info=True)
+            with self._cond:
+                self._dirty_map.setdefault(file_path, operator)  # 期间有新的修改时 已经被重新标记
+                self._cond.notify()
+
+
+yaml_write_behind: YamlWriteBehind = YamlWriteBehind()
+"""全局唯一的延迟写入管理器"""
+
+atexit.register(yaml_write_behind.flush)
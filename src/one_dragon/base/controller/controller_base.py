@@ -1,9 +1,12 @@
+import os
 import time
 
 from cv2.typing import MatLike
-from typing import List
+from typing import List, Optional, Any
 
+from one_dragon.base.controller.frame_recorder import FrameRecorder
 from one_dragon.base.geometry.point import Point
+from one_dragon.utils import os_utils
 
 
 class ScreenshotWithTime:
@@ -24,6 +27,10 @@ class ControllerBase:
         self.screenshot_history: List[ScreenshotWithTime] = []
         self.screenshot_alive_seconds: float = screenshot_alive_seconds  # 截图在内存的存活时间
         self.max_screenshot_cnt: int = max_screenshot_cnt  # 内存中最多保持的截图数量
+        self.frame_recorder: Optional[FrameRecorder] = None  # 画面录制 开启时记录截图和输入操作
+
+        # (截图, 识别结果缓存) 截图后失效 放在一个元组中整体替换 多线程时截图和缓存不会错配
+        self._frame_memo: tuple[Optional[MatLike], dict[Any, Any]] = (None, {})
 
     def init_before_context_run(self) -> bool:
         """
@@ -67,8 +74,58 @@ class ControllerBase:
             and now - self.screenshot_history[0].create_time > self.screenshot_alive_seconds):
             self.screenshot_history.pop(0)
 
+        if self.frame_recorder is not None:
+            self.frame_recorder.record_frame(fix_screen, now)
+
+        self._frame_memo = (fix_screen, {})
+
         return fix_screen
 
+    def get_frame_memo(self, screen: MatLike) -> dict[Any, Any]:
+        """
+        一张截图的识别结果缓存 用于同一张截图中多次识别同一区域的情况
+        只保留一张截图的缓存 截图或者传入其它截图时失效
+        :param screen: 截图
+        :return: 这张截图的缓存 可以直接写入
+        """
+        memo_screen, memo = self._frame_memo
+        if memo_screen is not screen:
+            memo = {}
+            self._frame_memo = (screen, memo)
+        return memo
+
+    def start_frame_record(self, root_dir: str, max_total_mb: float = 1024) -> None:
+        """
+        开始录制画面 每次开始都是一个新的会话文件夹
+        :param root_dir: 录制的根目录
+        :param max_total_mb: 根目录下全部录制文件的大小上限
+        :return:
+        """
+        self.stop_frame_record()
+        session_dir = os.path.join(root_dir, os_utils.now_timestamp_str())
+        self.frame_recorder = FrameRecorder(session_dir, max_total_mb=max_total_mb)
+
+    def stop_frame_record(self) -> None:
+        """
+        停止录制画面
+        :return:
+        """
+        if self.frame_recorder is None:
+            return
+        recorder = self.frame_recorder
+        self.frame_recorder = None
+        recorder.stop()
+
+    def record_input(self, action: str, **kwargs) -> None:
+        """
+        录制画面时 记录一次输入操作
+        :param action: 操作名称
+        :param kwargs: 操作参数
+        :return:
+        """
+        if self.frame_recorder is not None:
+            self.frame_recorder.record_action(action, **kwargs)
+
     def before_screenshot(self) -> None:
         """
         截图前的操作 由子类实现
@@ -0,0 +1,290 @@
+import json
+import os
+import shutil
+import struct
+import threading
+import time
+from collections import deque
+from typing import Optional, List, Any
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from one_dragon.base.geometry.point import Point
+from one_dragon.utils import os_utils, cv2_utils
+from one_dragon.utils.log_utils import log
+
+_INDEX_FILE_NAME: str = 'index.jsonl'
+_CHUNK_FILE_FORMAT: str = 'chunk_%05d.bin'
+_RECORD_HEADER = struct.Struct('<I')  # 每帧前记录图片字节数
+
+
+def get_frame_record_dir() -> str:
+    """
+    录制画面的根目录 每次运行一个会话文件夹
+    :return:
+    """
+    return os_utils.get_path_under_work_dir('.debug', 'frame_record')
+
+
+class FrameRecorder:
+
+    def __init__(self, session_dir: str,
+                 chunk_frames: int = 300,
+                 max_total_mb: float = 1024,
+                 jpeg_quality: int = 80,
+                 diff_threshold: float = 0.3,
+                 max_pending: int = 30):
+        """
+        录制截图和输入操作 用于之后离线回放
+        截图在后台线程中压缩写入 积压过多时丢弃新的截图 不影响运行
+        输入操作使用单独的队列 不会丢弃 也不需要等待截图压缩
+        画面没有变化的截图只记录引用 每 chunk_frames 张图片写入一个分块文件
+        超过磁盘上限时 删除根目录下最旧的分块文件
+        :param session_dir: 会话文件夹
+        :param chunk_frames: 每个分块文件的图片数量
+        :param max_total_mb: 根目录下全部录制文件的大小上限
+        :param jpeg_quality: 图片压缩质量
+        :param diff_threshold: 与上一张图片缩略图的差异小于这个值时 认为画面没有变化
+        :param max_pending: 最多积压的截图数量
+        """
+        self.session_dir: str = session_dir
+        self.root_dir: str = os.path.dirname(session_dir)
+        self.chunk_frames: int = chunk_frames
+        self.max_total_bytes: int = int(max_total_mb * 1024 * 1024)
+        self.jpeg_quality: int = jpeg_quality
+        self.diff_threshold: float = diff_threshold
+
+        self.frame_cnt: int = 0
+        """已写入的截图数量 包括只记录引用的"""
+
+        self.dropped_cnt: int = 0
+        """积压过多而丢弃的截图数量"""
+
+        os.makedirs(self.session_dir, exist_ok=True)
+        self._max_pending: int = max_pending
+        self._frame_queue: deque[tuple[float, MatLike]] = deque()
+        self._action_queue: deque[tuple[float, str, dict[str, Any]]] = deque()
+        self._cond = threading.Condition()
+        self._index_file = open(os.path.join(self.session_dir, _INDEX_FILE_NAME), 'a', encoding='utf-8')
+        self._chunk_idx: int = -1
+        self._chunk_file = None
+        self._chunk_image_cnt: int = 0
+        self._last_thumbnail: Optional[MatLike] = None
+        self._last_frame_no: int = -1  # 上一张实际写入图片的截图序号
+
+        self._running: bool = True
+        self._thread = threading.Thread(target=self._write_loop, name='od_frame_recorder', daemon=True)
+        self._thread.start()
+
+    def record_frame(self, image: MatLike, create_time: float) -> None:
+        """
+        记录一张截图 复制后放入队列
+        :param image: RGB截图
+        :param create_time: 截图时间
+        :return:
+        """
+        if not self._running or image is None:
+            return
+        if len(self._frame_queue) >= self._max_pending:
+            self.dropped_cnt += 1
+            return
+        image = image.copy()
+        with self._cond:
+            self._frame_queue.append((create_time, image))
+            self._cond.notify()
+
+    def record_action(self, action: str, **kwargs) -> None:
+        """
+        记录一次输入操作 不会丢弃 也不会阻塞
+        :param action: 操作名称
+        :param kwargs: 操作参数
+        :return:
+        """
+        if not self._running:
+            return
+        args = {k: str(v) if isinstance(v, Point) else v for k, v in kwargs.items()}
+        with self._cond:
+            self._action_queue.append((time.time(), action, args))
+            self._cond.notify()
+
+    def stop(self) -> None:
+        """
+        停止录制 等待积压的内容写入完毕
+        :return:
+        """
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+        if self.dropped_cnt > 0:
+            log.info('画面录制结束 共 %d 张截图 丢弃 %d 张', self.frame_cnt, self.dropped_cnt)
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._cond:
+                while self._running and len(self._action_queue) == 0 and len(self._frame_queue) == 0:
+                    self._cond.wait()
+                # 输入操作写入很快 优先写入
+                if len(self._action_queue) > 0:
+                    action = self._action_queue.popleft()
+                    frame = None
+                elif len(self._frame_queue) > 0:
+                    action = None
+                    frame = self._frame_queue.popleft()
+                else:  # 已停止且全部写入
+                    break
+            try:
+                if action is not None:
+                    self._write_index({'t': action[0], 'type': 'action', 'action': action[1], 'args': action[2]})
+                else:
+                    self._write_frame(frame[1], frame[0])
+            except Exception:
+                log.error('画面录制写入失败', exc_info=True)
+        self._close_chunk()
+        self._index_file.close()
+
+    def _write_frame(self, image: MatLike, create_time: float) -> None:
+        frame_no = self.frame_cnt
+        self.frame_cnt += 1
+
+        thumbnail = cv2_utils.to_thumbnail(image, max_size=128)
+        if (self._last_thumbnail is not None
+                and cv2_utils.thumbnail_diff(self._last_thumbnail, thumbnail) < self.diff_threshold):
+            self._write_index({'t': create_time, 'type': 'frame', 'no': frame_no, 'ref': self._last_frame_no})
+            return
+
+        success, buf = cv2.imencode('.jpg', cv2.cvtColor(image, cv2.COLOR_RGB2BGR),
+                                    [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not success:
+            return
+
+        if self._chunk_file is None or self._chunk_image_cnt >= self.chunk_frames:
+            self._open_next_chunk()
+
+        offset = self._chunk_file.tell()
+        data = buf.tobytes()
+        self._chunk_file.write(_RECORD_HEADER.pack(len(data)))
+        self._chunk_file.write(data)
+        self._chunk_image_cnt += 1
+
+        self._write_index({'t': create_time, 'type': 'frame', 'no': frame_no,
+                           'chunk': self._chunk_idx, 'offset': offset + _RECORD_HEADER.size, 'size': len(data)})
+        self._last_thumbnail = thumbnail
+        self._last_frame_no = frame_no
+
+    def _write_index(self, entry: dict[str, Any]) -> None:
+        self._index_file.write(json.dumps(entry, ensure_ascii=False))
+        self._index_file.write('\n')
+
+    def _open_next_chunk(self) -> None:
+        self._close_chunk()
+        self._chunk_idx += 1
+        self._chunk_image_cnt = 0
+        self._chunk_file = open(os.path.join(self.session_dir, _CHUNK_FILE_FORMAT % self._chunk_idx), 'wb')
+
+    def _close_chunk(self) -> None:
+        if self._chunk_file is None:
+            return
+        self._chunk_file.close()
+        self._chunk_file = None
+        self._index_file.flush()
+        self._limit_disk_usage()
+
+    def _limit_disk_usage(self) -> None:
+        """
+        超过磁盘上限时 按时间删除最旧的分块文件 删除后空的会话文件夹也一并删除
+        :return:
+        """
+        chunk_list: List[tuple[float, int, str]] = []
+        total_bytes = 0
+        for session_name in os.listdir(self.root_dir):
+            session_dir = os.path.join(self.root_dir, session_name)
+            if not os.path.isdir(session_dir):
+                continue
+            for file_name in os.listdir(session_dir):
+                file_path = os.path.join(session_dir, file_name)
+                stat = os.stat(file_path)
+                total_bytes += stat.st_size
+                if file_name.startswith('chunk_'):
+                    chunk_list.append((stat.st_mtime, stat.st_size, file_path))
+
+        if total_bytes <= self.max_total_bytes:
+            return
+
+        chunk_list.sort()
+        for _, size, file_path in chunk_list:
+            if total_bytes <= self.max_total_bytes:
+                break
+            os.remove(file_path)
+            total_bytes -= size
+            session_dir = os.path.dirname(file_path)
+            if session_dir != self.session_dir and not any(i.startswith('chunk_') for i in os.listdir(session_dir)):
+                shutil.rmtree(session_dir, ignore_errors=True)
+
+
+class FrameRecordSession:
+
+    def __init__(self, session_dir: str):
+        """
+        读取录制的会话 分块文件已被删除的截图会被跳过
+        :param session_dir: 会话文件夹
+        """
+        self.session_dir: str = session_dir
+        self.frame_list: List[dict[str, Any]] = []
+        """截图 引用已解析为实际写入的图片"""
+
+        self.action_list: List[dict[str, Any]] = []
+        """输入操作"""
+
+        frame_map: dict[int, dict[str, Any]] = {}
+        with open(os.path.join(session_dir, _INDEX_FILE_NAME), 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if len(line) == 0:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:  # 异常退出时最后一行可能不完整
+                    continue
+                if entry['type'] == 'action':
+                    self.action_list.append(entry)
+                    continue
+
+                if 'ref' in entry:
+                    ref = frame_map.get(entry['ref'])
+                    if ref is None:
+                        continue
+                    entry = dict(ref, t=entry['t'], no=entry['no'])
+                frame_map[entry['no']] = entry
+                if os.path.exists(self._chunk_path(entry['chunk'])):
+                    self.frame_list.append(entry)
+
+    @staticmethod
+    def is_session_dir(dir_path: str) -> bool:
+        """
+        :param dir_path: 文件夹
+        :return: 是否录制的会话文件夹
+        """
+        return os.path.exists(os.path.join(dir_path, _INDEX_FILE_NAME))
+
+    def _chunk_path(self, chunk_idx: int) -> str:
+        return os.path.join(self.session_dir, _CHUNK_FILE_FORMAT % chunk_idx)
+
+    def read_frame(self, idx: int) -> Optional[MatLike]:
+        """
+        读取一张截图
+        :param idx: frame_list 的下标
+        :return: RGB截图
+        """
+        if idx < 0 or idx >= len(self.frame_list):
+            return None
+        entry = self.frame_list[idx]
+        with open(self._chunk_path(entry['chunk']), 'rb') as file:
+            file.seek(entry['offset'])
+            data = file.read(entry['size'])
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return None if image is None else cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
@@ -0,0 +1,34 @@
+from typing import Optional, Callable
+
+from one_dragon.base.controller.pc_button.pc_button_controller import PcButtonController
+
+
+class RecordingButtonController(PcButtonController):
+
+    def __init__(self, get_controller: Callable[[], PcButtonController], on_input: Callable):
+        """
+        录制画面时使用 按键交给实际的按键控制器 同时记录下来
+        :param get_controller: 获取当前实际使用的按键控制器
+        :param on_input: 记录输入的回调 参数为 (操作名称, **参数)
+        """
+        PcButtonController.__init__(self)
+        self.get_controller: Callable[[], PcButtonController] = get_controller
+        self.on_input: Callable = on_input
+
+    def tap(self, key: str) -> None:
+        self.on_input('tap', key=key)
+        self.get_controller().tap(key)
+
+    def press(self, key: str, press_time: Optional[float] = None) -> None:
+        self.on_input('press', key=key, press_time=press_time)
+        self.get_controller().press(key, press_time)
+
+    def reset(self) -> None:
+        self.get_controller().reset()
+
+    def release(self, key: str) -> None:
+        self.on_input('release', key=key)
+        self.get_controller().release(key)
+
+    def set_key_press_time(self, key_press_time: float) -> None:
+        self.get_controller().set_key_press_time(key_press_time)
@@ -15,6 +15,7 @@ from one_dragon.base.controller.pc_button import pc_button_utils
 from one_dragon.base.controller.pc_button.ds4_button_controller import Ds4ButtonController
 from one_dragon.base.controller.pc_button.keyboard_mouse_controller import KeyboardMouseController
 from one_dragon.base.controller.pc_button.pc_button_controller import PcButtonController
+from one_dragon.base.controller.pc_button.recording_button_controller import RecordingButtonController
 from one_dragon.base.controller.pc_button.xbox_button_controller import XboxButtonController
 from one_dragon.base.controller.pc_game_window import PcGameWindow
 from one_dragon.base.geometry.point import Point
@@ -41,7 +42,11 @@ class PcControllerBase(ControllerBase):
         self.xbox_controller: Optional[XboxButtonController] = None
         self.ds4_controller: Optional[Ds4ButtonController] = None
 
-        self.btn_controller: PcButtonController = self.keyboard_controller
+        self._btn_controller: PcButtonController = self.keyboard_controller
+        self._recording_btn_controller: RecordingButtonController = RecordingButtonController(
+            get_controller=lambda: self._btn_controller,
+            on_input=self.record_input
+        )
         self.sct = None
 
     def init_before_context_run(self) -> bool:
@@ -67,6 +72,20 @@ class PcControllerBase(ControllerBase):
         self.game_win.init_win()
         self.game_win.active()
 
+    @property
+    def btn_controller(self) -> PcButtonController:
+        """
+        当前使用的按键控制器 录制画面时会同时记录按键
+        :return:
+        """
+        if self.frame_recorder is not None:
+            return self._recording_btn_controller
+        return self._btn_controller
+
+    @btn_controller.setter
+    def btn_controller(self, new_value: PcButtonController) -> None:
+        self._btn_controller = new_value
+
     def enable_xbox(self):
         if pc_button_utils.is_vgamepad_installed():
             if self.xbox_controller is None:
@@ -100,6 +119,7 @@ class PcControllerBase(ControllerBase):
         :param pc_alt: 只在PC端有用 使用ALT键进行点击
         :return: 不在窗口区域时不点击 返回False
         """
+        self.record_input('click', pos=pos, press_time=press_time, pc_alt=pc_alt)
         click_pos: Point
         if pos is not None:
             click_pos: Point = self.game_win.game2win_pos(pos)
@@ -158,6 +178,7 @@ class PcControllerBase(ControllerBase):
         :param pos: 滚动位置 默认分辨率下的游戏窗口里的坐标
         :return:
         """
+        self.record_input('scroll', down=down, pos=pos)
         if pos is None:
             pos = get_current_mouse_pos()
         win_pos = self.game_win.game2win_pos(pos)
@@ -171,6 +192,7 @@ class PcControllerBase(ControllerBase):
         :param duration: 拖拽持续时间
         :return:
         """
+        self.record_input('drag_to', end=end, start=start, duration=duration)
         from_pos: Point
         if start is None:
             from_pos = get_current_mouse_pos()
@@ -197,6 +219,7 @@ class PcControllerBase(ControllerBase):
         :param to_input: 文本
         :return:
         """
+        self.record_input('input_str', to_input=to_input)
         self.keyboard_controller.keyboard.type(to_input)
 
     def mouse_move(self, game_pos: Point):
@@ -0,0 +1,250 @@
+import os
+import time
+from typing import Optional, List, Any, Callable
+
+import cv2
+from cv2.typing import MatLike
+
+from one_dragon.base.controller.controller_base import ControllerBase
+from one_dragon.base.controller.frame_recorder import FrameRecordSession
+from one_dragon.base.geometry.point import Point
+from one_dragon.utils import cv2_utils
+from one_dragon.utils.log_utils import log
+
+_IMAGE_SUFFIX_LIST: List[str] = ['.png', '.jpg', '.jpeg', '.bmp', '.webp']
+
+
+class ReplayAction:
+
+    def __init__(self, frame_idx: int, action: str, args: dict[str, Any]):
+        """
+        回放时 指令发出的输入操作
+        :param frame_idx: 当时显示的是第几帧
+        :param action: 操作名称
+        :param args: 操作参数
+        """
+        self.create_time: float = time.time()
+        self.frame_idx: int = frame_idx
+        self.action: str = action
+        self.args: dict[str, Any] = args
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'create_time': self.create_time,
+            'frame_idx': self.frame_idx,
+            'action': self.action,
+            'args': {k: str(v) if isinstance(v, Point) else v for k, v in self.args.items()},
+        }
+
+
+class ReplayController(ControllerBase):
+
+    def __init__(self, frame_source: str,
+                 advance_on_input: bool = False,
+                 loop: bool = False,
+                 standard_width: int = 1920,
+                 standard_height: int = 1080):
+        """
+        使用录制好的画面代替游戏窗口 不需要运行游戏
+        截图时按顺序返回画面 点击、按键等输入只做记录
+        用于在没有游戏窗口的环境下 测试和统计识别类指令的效果和耗时
+        :param frame_source: 画面来源 画面录制的会话文件夹、图片文件夹(按文件名排序)或者视频文件
+        :param advance_on_input: 有输入操作后才切换到下一帧 否则每次截图都切换到下一帧
+        :param loop: 画面播放完后是否从头开始
+        :param standard_width: 标准分辨率的宽 画面会缩放到这个分辨率
+        :param standard_height: 标准分辨率的高
+        """
+        ControllerBase.__init__(self)
+        self.standard_width: int = standard_width
+        self.standard_height: int = standard_height
+
+        self.frame_source: str = frame_source
+        self.advance_on_input: bool = advance_on_input
+        self.loop: bool = loop
+
+        self.frame_idx: int = -1
+        """当前是第几帧"""
+
+        self.current_frame: Optional[MatLike] = None
+        """当前帧"""
+
+        self.is_finished: bool = False
+        """画面是否已经播放完"""
+
+        self.on_finished: Optional[Callable[[], None]] = None
+        """画面播放完时的回调 可以用来结束运行中的指令"""
+
+        self.action_list: List[ReplayAction] = []
+        """指令发出的输入操作"""
+
+        self.game_win = None  # 没有游戏窗口
+        self.btn_controller: ReplayController = self  # 按键也只做记录
+
+        self.record_session: Optional[FrameRecordSession] = None
+        """画面录制的会话 可以用于对比录制时的输入操作"""
+
+        self._frame_path_list: Optional[List[str]] = None
+        self._video: Optional[cv2.VideoCapture] = None
+        self._input_since_last_frame: bool = True  # 第一次截图时需要读取第一帧
+
+        self._open_source()
+
+    def _open_source(self) -> None:
+        """
+        打开画面来源
+        :return:
+        """
+        if FrameRecordSession.is_session_dir(self.frame_source):
+            self.record_session = FrameRecordSession(self.frame_source)
+        elif os.path.isdir(self.frame_source):
+            self._frame_path_list = [
+                os.path.join(self.frame_source, file_name)
+                for file_name in sorted(os.listdir(self.frame_source))
+                if os.path.splitext(file_name)[1].lower() in _IMAGE_SUFFIX_LIST
+            ]
+        else:
+            self._video = cv2.VideoCapture(self.frame_source)
+            if not self._video.isOpened():
+                raise ValueError('无法打开画面来源 %s' % self.frame_source)
+
+    def _read_frame(self, idx: int) -> Optional[MatLike]:
+        """
+        读取一帧 视频只能按顺序读取
+        :param idx: 第几帧
+        :return: RGB图片 没有更多画面时返回空
+        """
+        if self.record_session is not None:
+            return self.record_session.read_frame(idx)
+        elif self._frame_path_list is not None:
+            if idx >= len(self._frame_path_list):
+                return None
+            return cv2_utils.read_image(self._frame_path_list[idx])
+        else:
+            success, frame = self._video.read()
+            if not success:
+                return None
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def _rewind(self) -> None:
+        """
+        回到第一帧
+        :return:
+        """
+        self.frame_idx = -1
+        if self._video is not None:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def next_frame(self) -> Optional[MatLike]:
+        """
+        切换到下一帧 没有更多画面时保持最后一帧
+        :return: 当前帧
+        """
+        frame = self._read_frame(self.frame_idx + 1)
+        if frame is None and self.loop and self.frame_idx >= 0:
+            self._rewind()
+            frame = self._read_frame(0)
+
+        if frame is None:
+            if not self.is_finished and self.on_finished is not None:
+                self.on_finished()
+            self.is_finished = True
+            return self.current_frame
+
+        self.frame_idx += 1
+        if frame.shape[1] != self.standard_width or frame.shape[0] != self.standard_height:
+            frame = cv2.resize(frame, (self.standard_width, self.standard_height))
+        self.current_frame = frame
+        return self.current_frame
+
+    def init_before_context_run(self) -> bool:
+        return True
+
+    @property
+    def is_game_window_ready(self) -> bool:
+        return True
+
+    def active_window(self) -> None:
+        pass
+
+    def get_screenshot(self, independent: bool = False) -> MatLike:
+        """
+        返回当前帧 按设置切换到下一帧
+        :return: 当前帧的副本 调用方可以随意修改
+        """
+        if not self.advance_on_input or self._input_since_last_frame:
+            self.next_frame()
+            self._input_since_last_frame = False
+        return None if self.current_frame is None else self.current_frame.copy()
+
+    def fill_uid_black(self, screen: MatLike) -> MatLike:
+        return screen
+
+    def record_action(self, action: str, **kwargs) -> None:
+        """
+        记录一次输入操作
+        :param action: 操作名称
+        :param kwargs: 操作参数
+        :return:
+        """
+        self.action_list.append(ReplayAction(self.frame_idx, action, kwargs))
+        self._input_since_last_frame = True
+        log.debug('回放 第%d帧 %s %s', self.frame_idx, action, kwargs)
+
+    def click(self, pos: Point = None, press_time: float = 0, pc_alt: bool = False) -> bool:
+        self.record_action('click', pos=pos, press_time=press_time, pc_alt=pc_alt)
+        return True
+
+    def scroll(self, down: int, pos: Point = None):
+        self.record_action('scroll', down=down, pos=pos)
+
+    def drag_to(self, end: Point, start: Point = None, duration: float = 0.5):
+        self.record_action('drag_to', end=end, start=start, duration=duration)
+
+    def close_game(self):
+        self.record_action('close_game')
+
+    def input_str(self, to_input: str, interval: float = 0.1):
+        self.record_action('input_str', to_input=to_input)
+
+    def delete_all_input(self):
+        self.record_action('delete_all_input')
+
+    def tap(self, key: str) -> None:
+        """
+        按键
+        :param key: 按键
+        :return:
+        """
+        self.record_action('tap', key=key)
+
+    def press(self, key: str, press_time: Optional[float] = None) -> None:
+        """
+        按住按键
+        :param key: 按键
+        :param press_time: 持续秒数 不传入时需要调用 release
+        :return:
+        """
+        self.record_action('press', key=key, press_time=press_time)
+
+    def release(self, key: str) -> None:
+        """
+        放开按键
+        :param key: 按键
+        :return:
+        """
+        self.record_action('release', key=key)
+
+    def export_action_list(self) -> List[dict[str, Any]]:
+        """
+        :return: 全部输入操作
+        """
+        return [i.to_dict() for i in self.action_list]
+
+    def close(self) -> None:
+        """
+        释放画面来源
+        :return:
+        """
+        if self._video is not None:
+            self._video.release()
+            self._video = None
@@ -7,6 +7,7 @@ from typing import List
 from one_dragon.base.matcher.match_result import MatchResult, MatchResultList
 from one_dragon.base.matcher.ocr import ocr_utils
 from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
+from one_dragon.base.operation.operation_profiler import profile_call
 from one_dragon.utils import os_utils
 from one_dragon.utils import str_utils
 from one_dragon.utils.i18_utils import gt
@@ -56,6 +57,7 @@ class OnnxOcrMatcher(OcrMatcher):
         self._loading = False
         return True
 
+    @profile_call('ocr')
     def run_ocr_single_line(self, image: MatLike, threshold: float = None, strict_one_line: bool = True) -> str:
         """
         单行文本识别 手动合成一行 按匹配结果从左到右 从上到下
@@ -72,6 +74,7 @@ class OnnxOcrMatcher(OcrMatcher):
             tmp = ocr_utils.merge_ocr_result_to_single_line(ocr_map, join_space=False)
             return tmp
 
+    @profile_call('ocr')
     def run_ocr(self, image: MatLike, threshold: float = None,
                 merge_line_distance: float = -1) -> dict[str, MatchResultList]:
         """
@@ -130,6 +133,7 @@ class OnnxOcrMatcher(OcrMatcher):
         log.debug('OCR结果 %s 耗时 %.2f', scan_result, time.time() - start_time)
         return img_result[0][0]
 
+    @profile_call('ocr')
     def match_words(self, image: MatLike, words: List[str], threshold: float = None,
                     same_word: bool = False,
                     ignore_case: bool = True, lcs_percent: float = -1, merge_line_distance: float = -1) -> dict[
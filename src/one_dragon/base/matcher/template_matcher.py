@@ -3,6 +3,7 @@ from cv2.typing import MatLike
 from typing import Optional
 
 from one_dragon.base.matcher.match_result import MatchResultList, MatchResult
+from one_dragon.base.operation.operation_profiler import profile_call
 from one_dragon.base.screen.template_info import TemplateInfo
 from one_dragon.base.screen.template_loader import TemplateLoader
 from one_dragon.utils import cv2_utils
@@ -14,6 +15,7 @@ class TemplateMatcher:
     def __init__(self, template_loader: TemplateLoader):
         self.template_loader: TemplateLoader = template_loader
 
+    @profile_call('template')
     def match_template(self, source: MatLike,
                        template_sub_dir: str,
                        template_id: str,
@@ -49,6 +51,7 @@ class TemplateMatcher:
         return cv2_utils.match_template(source, template.get_image(template_type), threshold, mask=mask_usage,
                                         only_best=only_best, ignore_inf=ignore_inf)
 
+    @profile_call('template')
     def match_one_by_feature(self, source: MatLike,
                              template_sub_dir: str,
                              template_id: str,
@@ -1,12 +1,17 @@
+import os
 from concurrent.futures import ThreadPoolExecutor
 
 from enum import Enum
 from typing import Optional, Callable
 
+from one_dragon.base.config.yaml_write_behind import yaml_write_behind
 from one_dragon.base.operation.application_run_record import AppRunRecord
 from one_dragon.base.operation.one_dragon_context import OneDragonContext
 from one_dragon.base.operation.operation import Operation
 from one_dragon.base.operation.operation_base import OperationResult
+from one_dragon.base.operation.operation_profiler import operation_profiler
+from one_dragon.utils import os_utils
+from one_dragon.utils.log_utils import log
 
 _app_preheat_executor = ThreadPoolExecutor(thread_name_prefix='od_app_preheat', max_workers=1)
 
@@ -60,6 +65,9 @@ class Application(Operation):
         if self.run_record is not None:
             self.run_record.update_status(AppRunRecord.STATUS_RUNNING)
 
+        self.ctx.template_loader.start_usage_record(self.app_id)
+        self.ctx.template_loader.warm_up_by_app(self.app_id)  # 按上次使用过的模板 提前并行读取图片
+
         self.init_for_application()
         self.ctx.start_running()
         self.ctx.dispatch_event(ApplicationEventId.APPLICATION_START.value, self.app_id)
@@ -78,10 +86,29 @@ class Application(Operation):
         """
         super().after_operation_done(result)
         self._update_record_after_stop(result)
+        self.ctx.template_loader.stop_usage_record(self.app_id)
+        yaml_write_behind.flush()  # 切换应用前 保证配置和运行记录都已经写入文件
+        self._export_profile()
         if self.stop_context_after_stop:
             self.ctx.stop_running()
         self.ctx.dispatch_event(ApplicationEventId.APPLICATION_STOP.value, self.app_id)
 
+    def _export_profile(self) -> None:
+        """
+        开启了指令耗时统计时 导出本次应用运行的统计结果
+        :return:
+        """
+        if not operation_profiler.enabled:
+            return
+        try:
+            file_path_prefix = os.path.join(os_utils.get_path_under_work_dir('.debug', 'profile'),
+                                            '%s_%s' % (self.app_id, os_utils.now_timestamp_str()))
+            operation_profiler.export(file_path_prefix)
+            log.info('指令耗时统计已导出 %s', file_path_prefix)
+        except Exception:
+            log.error('指令耗时统计导出失败', exc_info=True)
+        operation_profiler.clear()
+
     def _update_record_after_stop(self, result: OperationResult):
         """
         应用停止后的对运行记录的更新
@@ -68,7 +68,7 @@ class AppRunRecord(YamlConfig):
             self.update('run_time', self.run_time, False)
             self.update('run_time_float', self.run_time_float, False)
 
-        self.save()
+        self.save_later()
 
     def reset_record(self):
         """
@@ -3,18 +3,19 @@ from concurrent.futures import ThreadPoolExecutor
 
 import logging
 from enum import Enum
-from pynput import keyboard, mouse
 from typing import Optional
 
 from one_dragon.base.config.one_dragon_app_config import OneDragonAppConfig
 from one_dragon.base.config.one_dragon_config import OneDragonConfig
+from one_dragon.base.config.yaml_write_behind import yaml_write_behind
 from one_dragon.base.controller.controller_base import ControllerBase
-from one_dragon.base.controller.pc_button.pc_button_listener import PcButtonListener
+from one_dragon.base.controller.frame_recorder import get_frame_record_dir
 from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
 from one_dragon.base.matcher.ocr.onnx_ocr_matcher import OnnxOcrMatcher
 from one_dragon.base.matcher.template_matcher import TemplateMatcher
 from one_dragon.base.operation.context_event_bus import ContextEventBus
 from one_dragon.base.operation.one_dragon_env_context import OneDragonEnvContext
+from one_dragon.base.operation.operation_profiler import operation_profiler
 from one_dragon.base.screen.screen_loader import ScreenContext
 from one_dragon.base.screen.template_loader import TemplateLoader
 from one_dragon.utils import debug_utils, log_utils
@@ -55,7 +56,11 @@ class ContextInstanceEventEnum(Enum):
 
 class OneDragonContext(ContextEventBus, OneDragonEnvContext):
 
-    def __init__(self, controller: Optional = None):
+    def __init__(self, controller: Optional = None, listen_button: bool = True):
+        """
+        :param controller: 控制器
+        :param listen_button: 是否监听键盘鼠标的快捷键 回放录制画面等没有界面的环境下不需要
+        """
         ContextEventBus.__init__(self)
         OneDragonEnvContext.__init__(self)
 
@@ -75,10 +80,17 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
         self.ocr: OcrMatcher = OnnxOcrMatcher()
         self.controller: ControllerBase = controller
 
-        self.keyboard_controller = keyboard.Controller()
-        self.mouse_controller = mouse.Controller()
-        self.btn_listener = PcButtonListener(on_button_tap=self._on_key_press, listen_keyboard=True, listen_mouse=True)
-        self.btn_listener.start()
+        self.keyboard_controller = None
+        self.mouse_controller = None
+        self.btn_listener = None
+        if listen_button:
+            # 只有PC上需要 延迟导入 没有界面的环境下导入 pynput 会失败
+            from pynput import keyboard, mouse
+            from one_dragon.base.controller.pc_button.pc_button_listener import PcButtonListener
+            self.keyboard_controller = keyboard.Controller()
+            self.mouse_controller = mouse.Controller()
+            self.btn_listener = PcButtonListener(on_button_tap=self._on_key_press, listen_keyboard=True, listen_mouse=True)
+            self.btn_listener.start()
 
     def init_by_config(self) -> None:
         """
@@ -87,6 +99,7 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
         :return:
         """
         log_utils.set_log_level(logging.DEBUG if self.env_config.is_debug else logging.INFO)
+        operation_profiler.enabled = self.env_config.is_profile
 
     def start_running(self) -> bool:
         """
@@ -99,6 +112,8 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
 
         self.context_running_state = ContextRunStateEnum.RUN
         self.controller.init_before_context_run()
+        if self.env_config.is_frame_record:
+            self.controller.start_frame_record(get_frame_record_dir(), max_total_mb=self.env_config.frame_record_max_mb)
         self.dispatch_event(ContextRunningStateEventEnum.START_RUNNING.value, self.context_running_state)
         return True
 
@@ -106,6 +121,8 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
         if self.is_context_running:  # 先触发暂停 让执行中的指令停止
             self.switch_context_pause_and_run()
         self.context_running_state = ContextRunStateEnum.STOP
+        if self.controller is not None:
+            self.controller.stop_frame_record()
         log.info('停止运行')
         self.dispatch_event(ContextRunningStateEventEnum.STOP_RUNNING.value, self.context_running_state)
 
@@ -199,6 +216,7 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
         :param instance_idx:
         :return:
         """
+        yaml_write_behind.flush()  # 切换前 先写入当前实例未保存的修改
         self.one_dragon_config.active_instance(instance_idx)
         self.current_instance_idx = self.one_dragon_config.current_active_instance.idx
         self.load_instance_config()
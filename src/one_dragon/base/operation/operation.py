@@ -7,11 +7,13 @@ from cv2.typing import MatLike
 from typing import Optional, ClassVar, Callable, List, Any, Tuple
 
 from one_dragon.base.geometry.point import Point
+from one_dragon.base.geometry.rectangle import Rect
 from one_dragon.base.matcher.match_result import MatchResultList
 from one_dragon.base.operation.one_dragon_context import OneDragonContext, ContextRunningStateEventEnum
 from one_dragon.base.operation.operation_base import OperationBase, OperationResult
 from one_dragon.base.operation.operation_edge import OperationEdge, OperationEdgeDesc
 from one_dragon.base.operation.operation_node import OperationNode
+from one_dragon.base.operation.operation_profiler import operation_profiler, profile_call
 from one_dragon.base.operation.operation_round_result import OperationRoundResultEnum, OperationRoundResult
 from one_dragon.base.screen import screen_utils
 from one_dragon.base.screen.screen_area import ScreenArea
@@ -21,10 +23,32 @@ from one_dragon.utils.i18_utils import coalesce_gt, gt
 from one_dragon.utils.log_utils import log
 
 
+class OperationAnnotationGraph:
+
+    def __init__(self, start_node: Optional[OperationNode], edge_list: List[OperationEdge]):
+        """
+        根据类方法标注生成的节点网络 同一个类的所有实例共用
+        节点中保存的是未绑定的方法 执行时再传入实例 因此可以共用
+        """
+        self.start_node: Optional[OperationNode] = start_node
+        """标注的开始节点"""
+
+        self.edge_list: List[OperationEdge] = edge_list
+        """标注的边"""
+
+
 class Operation(OperationBase):
     STATUS_TIMEOUT: ClassVar[str] = '执行超时'
     STATUS_SCREEN_UNKNOWN: ClassVar[str] = '未能识别当前画面'
 
+    _annotation_graph_cache: ClassVar[dict[type, OperationAnnotationGraph]] = {}
+    """每个类根据标注生成的节点网络"""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # 类定义时就生成节点网络 标注有误时在导入时就会报错 而不是等到执行时
+        cls._get_annotation_graph()
+
     def __init__(self, ctx: OneDragonContext,
                  node_max_retry_times: int = 3,
                  op_name: str = '',
@@ -113,39 +137,65 @@ class Operation(OperationBase):
         """
         pass
 
-    def _add_edges_and_nodes_by_annotation(self) -> None:
+    @classmethod
+    def _get_annotation_graph(cls) -> OperationAnnotationGraph:
         """
-        初始化前 读取类方法的标注 自动添加边和节点
+        获取根据类方法标注生成的节点网络 每个类只生成一次
+        :return:
+        """
+        graph = Operation._annotation_graph_cache.get(cls)
+        if graph is None:
+            graph = cls._build_annotation_graph()
+            Operation._annotation_graph_cache[cls] = graph
+        return graph
+
+    @classmethod
+    def _build_annotation_graph(cls) -> OperationAnnotationGraph:
+        """
+        读取类方法的标注 生成节点网络
         :return:
         """
         node_name_map: dict[str, OperationNode] = {}
-        edge_desc_list: List[OperationEdgeDesc] = []
+        edge_desc_list: List[Tuple[str, OperationEdgeDesc]] = []  # (目标节点名称, 边描述)
+        start_node: Optional[OperationNode] = None
 
-        for name, method in inspect.getmembers(self, predicate=inspect.ismethod):
+        for name, method in inspect.getmembers(cls, predicate=inspect.isfunction):
             node: OperationNode = method.__annotations__.get('operation_node_annotation')
             if node is not None:
                 node_name_map[node.cn] = node
             else:  # 不是节点的话 一定没有边
                 continue
             if node.is_start_node:
-                self.param_start_node = node
+                start_node = node
             edges: List[OperationEdgeDesc] = method.__annotations__.get('operation_edge_annotation')
             if edges is not None:
                 for edge in edges:
-                    edge.node_to_name = node.cn
-                    edge_desc_list.append(edge)
+                    edge_desc_list.append((node.cn, edge))
 
-        for edge_desc in edge_desc_list:
+        edge_list: List[OperationEdge] = []
+        for node_to_name, edge_desc in edge_desc_list:
             node_from = node_name_map.get(edge_desc.node_from_name, None)
             if node_from is None:
-                raise ValueError('找不到节点 %s' % edge_desc.node_from_name)
-            node_to = node_name_map.get(edge_desc.node_to_name, None)
+                raise ValueError('%s 找不到节点 %s' % (cls.__name__, edge_desc.node_from_name))
+            node_to = node_name_map.get(node_to_name, None)
             if node_to is None:
-                raise ValueError('找不到节点 %s' % edge_desc.node_to_name)
-            self.add_edge(node_from, node_to,
-                          success=edge_desc.success,
-                          status=edge_desc.status,
-                          ignore_status=edge_desc.ignore_status)
+                raise ValueError('%s 找不到节点 %s' % (cls.__name__, node_to_name))
+            edge_list.append(OperationEdge(node_from, node_to,
+                                           success=edge_desc.success,
+                                           status=edge_desc.status,
+                                           ignore_status=edge_desc.ignore_status))
+
+        return OperationAnnotationGraph(start_node, edge_list)
+
+    def _add_edges_and_nodes_by_annotation(self) -> None:
+        """
+        初始化前 读取类方法的标注 自动添加边和节点
+        :return:
+        """
+        graph = self._get_annotation_graph()
+        if graph.start_node is not None:
+            self.param_start_node = graph.start_node
+        self._add_edge_list.extend(graph.edge_list)
 
     def _init_edge_list(self) -> None:
         """
@@ -276,10 +326,16 @@ class Operation(OperationBase):
         """
         循环执行指令直到完成为止
         """
+        profile = operation_profiler.enabled
+        if profile:
+            operation_profiler.start_operation(type(self).__name__)
+
         try:
             self._init_before_execute()
         except Exception:
             log.error('初始化失败', exc_info=True)
+            if profile:
+                operation_profiler.end_operation(type(self).__name__, False)
             return self.op_fail('初始化失败')
 
         op_result: Optional[OperationResult] = None
@@ -295,6 +351,9 @@ class Operation(OperationBase):
                 time.sleep(1)
                 continue
 
+            if profile:
+                operation_profiler.start_node_round(type(self).__name__,
+                                                    'none' if self._current_node is None else self._current_node.cn)
             try:
                 round_result: OperationRoundResult = self._execute_one_round()
                 if (self._current_node is None
@@ -317,6 +376,8 @@ class Operation(OperationBase):
                     log.error('%s 执行出错 相关截图保存至 %s', self.display_name, file_name, exc_info=True)
                 else:
                     log.error('%s 执行出错', self.display_name, exc_info=True)
+            if profile:
+                operation_profiler.end_node_round(round_result.result.name)
 
             # 重试或者等待的
             if round_result.result == OperationRoundResultEnum.RETRY:
@@ -349,6 +410,8 @@ class Operation(OperationBase):
                 self._reset_status_for_new_node()  # 充值状态
                 continue
 
+        if profile:  # 在结束回调前记录 应用可以在结束回调中导出统计结果
+            operation_profiler.end_operation(type(self).__name__, op_result.success)
         self.after_operation_done(op_result)
         return op_result
 
@@ -472,6 +535,7 @@ class Operation(OperationBase):
         """
         return time.time() - self.operation_start_time - self.pause_total_time
 
+    @profile_call('screenshot')
     def screenshot(self):
         """
         包装一层截图 会在内存中保存上一张截图 方便出错时候保存
@@ -481,6 +545,66 @@ class Operation(OperationBase):
         self.last_screenshot = screen
         return self.last_screenshot
 
+    @profile_call('wait')
+    def wait_until_changed(self, before: MatLike, rect: Optional[Rect] = None, timeout: float = 1,
+                           diff_threshold: float = 3, stable_diff_threshold: float = 1,
+                           interval: float = 0.05) -> bool:
+        """
+        等待画面发生变化并稳定下来 用于代替点击后固定时间的等待
+        刚发生变化时通常只是切换动画的开始 所以变化后还会等待画面稳定
+        使用缩小后的灰度图比较 开销很小
+        :param before: 操作前的画面 需要在点击前截图 更早的截图可能已经和点击前不一样
+        :param rect: 比较的区域 不传入时比较整个画面
+        :param timeout: 最多等待的秒数 即原来固定等待的时间
+        :param diff_threshold: 和操作前的平均像素差超过这个值认为有变化
+        :param stable_diff_threshold: 变化后 相邻截图的平均像素差低于这个值认为稳定
+        :param interval: 截图间隔
+        :return: 是否在超时前发生了变化并稳定下来
+        """
+        before_thumbnail = cv2_utils.to_thumbnail(before, rect)
+        end_time = time.time() + timeout
+        while True:
+            current = cv2_utils.to_thumbnail(self.screenshot(), rect)
+            if cv2_utils.thumbnail_diff(before_thumbnail, current) > diff_threshold:
+                break
+            if time.time() + interval > end_time:
+                return False
+            time.sleep(interval)
+
+        return self.wait_until_stable(rect=rect, timeout=end_time - time.time(),
+                                      diff_threshold=stable_diff_threshold, interval=interval)
+
+    @profile_call('wait')
+    def wait_until_stable(self, rect: Optional[Rect] = None, frames: int = 2, timeout: float = 1,
+                          diff_threshold: float = 1, interval: float = 0.05) -> bool:
+        """
+        等待画面稳定下来 例如转动视角、界面切换动画之后
+        连续多张截图都没有变化时认为稳定
+        :param rect: 比较的区域 不传入时比较整个画面
+        :param frames: 需要连续多少张截图没有变化
+        :param timeout: 最多等待的秒数 即原来固定等待的时间
+        :param diff_threshold: 平均像素差低于这个值认为没有变化 3D场景有待机动作和特效 需要调大
+        :param interval: 截图间隔
+        :return: 是否在超时前稳定
+        """
+        if timeout <= 0:
+            return False
+        end_time = time.time() + timeout
+        last_thumbnail = cv2_utils.to_thumbnail(self.screenshot(), rect)
+        same_frames = 1
+        while same_frames < frames:
+            if time.time() + interval > end_time:
+                return False
+            time.sleep(interval)
+            current = cv2_utils.to_thumbnail(self.screenshot(), rect)
+            if cv2_utils.thumbnail_diff(last_thumbnail, current) < diff_threshold:
+                same_frames += 1
+            else:
+                same_frames = 1
+            last_thumbnail = current
+
+        return True
+
     def save_screenshot(self, prefix: Optional[str] = None) -> str:
         """
         保存上一次的截图 并对UID打码
@@ -567,6 +691,7 @@ class Operation(OperationBase):
         self._after_round_wait(wait=wait, wait_round_time=wait_round_time)
         return OperationRoundResult(result=OperationRoundResultEnum.FAIL, status=status, data=data)
 
+    @profile_call('sleep')
     def _after_round_wait(self, wait: Optional[float] = None, wait_round_time: Optional[float] = None):
         """
         每轮指令后进行的等待
@@ -0,0 +1,251 @@
+import json
+import threading
+import time
+from functools import wraps
+from typing import Optional, List, Callable
+
+
+class _ProfileFrame:
+
+    def __init__(self, name: str, node_key: Optional[tuple[str, str]] = None):
+        """
+        调用栈中的一层 可以是指令、节点或者某类耗时调用
+        :param name: 名称 用于火焰图
+        :param node_key: 节点的 (指令类名, 节点名称) 只有节点层才有
+        """
+        self.name: str = name
+        self.node_key: Optional[tuple[str, str]] = node_key
+        self.start_time: float = time.perf_counter()
+        self.child_seconds: float = 0  # 子层的耗时 用于计算本层自身的耗时
+        self.call_seconds: dict[str, float] = {}  # 节点层使用 本轮中各类调用的耗时
+
+
+class OperationProfiler:
+
+    def __init__(self):
+        """
+        指令耗时统计 默认不开启
+        按 指令 -> 节点 统计每轮耗时、重试次数 以及轮内截图、OCR、模板匹配、YOLO、等待的耗时
+        同时按调用栈统计自身耗时 可以导出火焰图使用的折叠格式
+        """
+        self.enabled: bool = False
+        """是否开启统计"""
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self._op_stat: dict[str, dict] = {}  # 指令类名 -> 统计
+        self._node_stat: dict[tuple[str, str], dict] = {}  # (指令类名, 节点名称) -> 统计
+        self._call_stat: dict[str, dict] = {}  # 调用类型 -> 统计 包含不在节点中的调用 例如异步识别
+        self._folded: dict[str, float] = {}  # 调用栈 -> 自身耗时
+
+    def _get_stack(self) -> List[_ProfileFrame]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = []
+            self._local.stack = stack
+        return stack
+
+    def _push(self, frame: _ProfileFrame) -> None:
+        self._get_stack().append(frame)
+
+    def _pop(self) -> Optional[tuple[_ProfileFrame, float, str]]:
+        """
+        结束最上层 并记录火焰图的自身耗时
+        :return: 结束的层, 总耗时, 调用栈
+        """
+        stack = self._get_stack()
+        if len(stack) == 0:
+            return None
+        frame = stack[-1]
+        path = ';'.join(f.name for f in stack)
+        stack.pop()
+
+        seconds = time.perf_counter() - frame.start_time
+        if len(stack) > 0:
+            stack[-1].child_seconds += seconds
+        with self._lock:
+            self._folded[path] = self._folded.get(path, 0) + max(seconds - frame.child_seconds, 0)
+
+        return frame, seconds, path
+
+    def start_operation(self, op_name: str) -> None:
+        """
+        指令开始执行
+        :param op_name: 指令类名
+        :return:
+        """
+        self._push(_ProfileFrame(op_name))
+
+    def end_operation(self, op_name: str, success: bool) -> None:
+        """
+        指令执行结束
+        :param op_name: 指令类名
+        :param success: 是否成功
+        :return:
+        """
+        stack = self._get_stack()
+        if len(stack) == 0 or stack[-1].name != op_name:  # 开启统计前已经开始的指令
+            return
+        _, seconds, _ = self._pop()
+        with self._lock:
+            stat = self._op_stat.get(op_name)
+            if stat is None:
+                stat = {'cnt': 0, 'success_cnt': 0, 'total_seconds': 0, 'max_seconds': 0}
+                self._op_stat[op_name] = stat
+            stat['cnt'] += 1
+            if success:
+                stat['success_cnt'] += 1
+            stat['total_seconds'] += seconds
+            stat['max_seconds'] = max(stat['max_seconds'], seconds)
+
+    def start_node_round(self, op_name: str, node_name: str) -> None:
+        """
+        节点的一轮开始
+        :param op_name: 指令类名
+        :param node_name: 节点名称
+        :return:
+        """
+        self._push(_ProfileFrame(node_name, node_key=(op_name, node_name)))
+
+    def end_node_round(self, result: Optional[str]) -> None:
+        """
+        节点的一轮结束
+        :param result: 本轮结果 SUCCESS FAIL RETRY WAIT
+        :return:
+        """
+        stack = self._get_stack()
+        if len(stack) == 0 or stack[-1].node_key is None:
+            return
+        frame, seconds, _ = self._pop()
+        with self._lock:
+            stat = self._node_stat.get(frame.node_key)
+            if stat is None:
+                stat = {'round_cnt': 0, 'total_seconds': 0, 'max_seconds': 0, 'result_cnt': {}, 'call_seconds': {}}
+                self._node_stat[frame.node_key] = stat
+            stat['round_cnt'] += 1
+            stat['total_seconds'] += seconds
+            stat['max_seconds'] = max(stat['max_seconds'], seconds)
+            result_key = str(result)
+            stat['result_cnt'][result_key] = stat['result_cnt'].get(result_key, 0) + 1
+            for category, call_seconds in frame.call_seconds.items():
+                stat['call_seconds'][category] = stat['call_seconds'].get(category, 0) + call_seconds
+
+    def start_call(self, category: str) -> bool:
+        """
+        某类耗时调用开始 同类调用嵌套时只统计最外层
+        :param category: 调用类型 例如 screenshot ocr template yolo sleep
+        :return: 是否需要调用 end_call
+        """
+        stack = self._get_stack()
+        for frame in stack:
+            if frame.node_key is None and frame.name == category:
+                return False
+        self._push(_ProfileFrame(category))
+        return True
+
+    def end_call(self, category: str) -> None:
+        """
+        某类耗时调用结束
+        :param category: 调用类型
+        :return:
+        """
+        stack = self._get_stack()
+        if len(stack) == 0 or stack[-1].name != category:
+            return
+        _, seconds, _ = self._pop()
+
+        for frame in reversed(stack):  # 计入最近的节点
+            if frame.node_key is not None:
+                frame.call_seconds[category] = frame.call_seconds.get(category, 0) + seconds
+                break
+
+        with self._lock:
+            stat = self._call_stat.get(category)
+            if stat is None:
+                stat = {'cnt': 0, 'total_seconds': 0, 'max_seconds': 0}
+                self._call_stat[category] = stat
+            stat['cnt'] += 1
+            stat['total_seconds'] += seconds
+            stat['max_seconds'] = max(stat['max_seconds'], seconds)
+
+    def summary(self) -> dict:
+        """
+        :return: 统计结果
+        """
+        with self._lock:
+            op_summary = {}
+            for op_name, stat in self._op_stat.items():
+                op_summary[op_name] = dict(stat)
+                op_summary[op_name]['avg_seconds'] = stat['total_seconds'] / stat['cnt']
+                op_summary[op_name]['node'] = {}
+
+            for (op_name, node_name), stat in self._node_stat.items():
+                if op_name not in op_summary:
+                    op_summary[op_name] = {'node': {}}
+                node_summary = dict(stat)
+                node_summary['avg_seconds'] = stat['total_seconds'] / stat['round_cnt']
+                node_summary['retry_cnt'] = stat['result_cnt'].get('RETRY', 0)
+                node_summary['result_cnt'] = dict(stat['result_cnt'])
+                node_summary['call_seconds'] = dict(stat['call_seconds'])
+                op_summary[op_name]['node'][node_name] = node_summary
+
+            return {
+                'operation': op_summary,
+                'call': {k: dict(v) for k, v in self._call_stat.items()},
+            }
+
+    def folded_lines(self) -> List[str]:
+        """
+        火焰图使用的折叠格式 每行为 调用栈 自身耗时(毫秒)
+        :return:
+        """
+        with self._lock:
+            return ['%s %d' % (path.replace(' ', '_'), round(seconds * 1000))
+                    for path, seconds in self._folded.items()
+                    if seconds >= 0.0005]
+
+    def export(self, file_path_prefix: str) -> None:
+        """
+        导出统计结果
+        :param file_path_prefix: 文件路径前缀 会生成 .json 和 .folded 两个文件
+        :return:
+        """
+        with open(f'{file_path_prefix}.json', 'w', encoding='utf-8') as file:
+            json.dump(self.summary(), file, ensure_ascii=False, indent=2)
+        with open(f'{file_path_prefix}.folded', 'w', encoding='utf-8') as file:
+            file.write('\n'.join(self.folded_lines()))
+
+    def clear(self) -> None:
+        """
+        清空统计结果
+        :return:
+        """
+        with self._lock:
+            self._op_stat.clear()
+            self._node_stat.clear()
+            self._call_stat.clear()
+            self._folded.clear()
+
+
+operation_profiler: OperationProfiler = OperationProfiler()
+"""全局唯一的指令耗时统计"""
+
+
+def profile_call(category: str) -> Callable:
+    """
+    装饰器 统计某类耗时调用 未开启统计时几乎没有开销
+    :param category: 调用类型
+    :return:
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not operation_profiler.enabled or not operation_profiler.start_call(category):
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                operation_profiler.end_call(category)
+        return wrapper
+    return decorator
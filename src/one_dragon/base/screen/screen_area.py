@@ -1,7 +1,15 @@
+from collections import deque
+
+from cv2.typing import MatLike
 from typing import Optional, List
 
 from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.utils import cv2_utils
+
+ID_FINGERPRINT_SIZE: int = 24  # 标识区域缩略图的最长边
+ID_FINGERPRINT_SAMPLE_CNT: int = 3  # 最多保留多少个缩略图样本
+ID_FINGERPRINT_MATCH_DIFF: float = 2  # 和样本的平均像素差不超过这个值时 认为区域一致
 
 
 class ScreenArea:
@@ -31,6 +39,9 @@ class ScreenArea:
         self.goto_list: List[str] = [] if goto_list is None else goto_list # 交互后 可能会跳转的画面名称列表
         self.color_range: List[List[int]] = color_range  # 识别时候的筛选的颜色范围 文本时候有效
 
+        self._id_fingerprint_list: deque[MatLike] = deque(maxlen=ID_FINGERPRINT_SAMPLE_CNT)  # 标识区域的缩略图样本 用于快速确认是这个画面
+        self._id_fingerprint_rect: Optional[tuple[int, int, int, int]] = None  # 生成样本时的区域 区域修改后失效
+
     @property
     def rect(self) -> Rect:
         return self.pc_rect
@@ -104,6 +115,49 @@ class ScreenArea:
         """
         return self.template_id is not None and len(self.template_id) > 0
 
+    @property
+    def id_fingerprint_list(self) -> List[MatLike]:
+        """
+        可用于快速确认的缩略图样本 区域修改后返回空
+        :return:
+        """
+        if self._id_fingerprint_rect != self._rect_key:
+            return []
+        return list(self._id_fingerprint_list)
+
+    @property
+    def _rect_key(self) -> tuple[int, int, int, int]:
+        return self.pc_rect.x1, self.pc_rect.y1, self.pc_rect.x2, self.pc_rect.y2
+
+    def get_fingerprint_in_screen(self, screen: MatLike) -> MatLike:
+        """
+        截图中这个区域的缩略图
+        :param screen: 游戏截图
+        :return:
+        """
+        return cv2_utils.to_thumbnail(screen, self.rect, max_size=ID_FINGERPRINT_SIZE)
+
+    def is_fingerprint_matched(self, fingerprint: MatLike) -> bool:
+        """
+        缩略图是否和某个样本几乎一致 一致时可以跳过OCR或模板匹配
+        不一致时不代表不是这个画面 需要继续完整识别
+        :param fingerprint: 截图中这个区域的缩略图
+        :return:
+        """
+        return any(cv2_utils.thumbnail_diff(sample, fingerprint) <= ID_FINGERPRINT_MATCH_DIFF
+                   for sample in self.id_fingerprint_list)
+
+    def add_id_fingerprint(self, fingerprint: MatLike) -> None:
+        """
+        增加一个缩略图样本 只保留最近的几个 背景变化后可以学到新的样本
+        :param fingerprint: 属于这个画面的截图中 这个区域的缩略图
+        :return:
+        """
+        if self._id_fingerprint_rect != self._rect_key:
+            self._id_fingerprint_list = deque(maxlen=ID_FINGERPRINT_SAMPLE_CNT)
+            self._id_fingerprint_rect = self._rect_key
+        self._id_fingerprint_list.append(fingerprint)
+
     def to_order_dict(self) -> dict:
         """
         有顺序的dict 用于保存时候展示
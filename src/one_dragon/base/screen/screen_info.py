@@ -24,7 +24,7 @@ class ScreenInfo(YamlOperator):
         if create_new:
             YamlOperator.__init__(self)
         else:
-            YamlOperator.__init__(self, self.get_yml_file_path())
+            YamlOperator.__init__(self, self.get_yml_file_path(), is_asset=True)
             self._init_from_data()
 
     @staticmethod
@@ -80,6 +80,8 @@ class ScreenInfo(YamlOperator):
                 id_mark=data_area.get('id_mark', False),
                 goto_list=data_area.get('goto_list', [])
             )
+            if area.id_mark and self.screen_image is not None:
+                area.add_id_fingerprint(area.get_fingerprint_in_screen(self.screen_image))
             self.area_list.append(area)
 
     def get_image_to_show(self) -> MatLike:
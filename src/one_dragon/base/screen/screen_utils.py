@@ -5,6 +5,8 @@ from enum import Enum
 from typing import Optional, List
 
 from one_dragon.base.geometry.point import Point
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.matcher.match_result import MatchResult
 from one_dragon.base.operation.one_dragon_context import OneDragonContext
 from one_dragon.base.screen.screen_area import ScreenArea
 from one_dragon.base.screen.screen_info import ScreenInfo
@@ -81,6 +83,134 @@ def find_area_in_screen(ctx: OneDragonContext, screen: MatLike, area: ScreenArea
     return FindAreaResultEnum.TRUE if find else FindAreaResultEnum.FALSE
 
 
+def find_any_area_in_screen(ctx: OneDragonContext, screen: MatLike, area_list: List[ScreenArea]) -> Optional[ScreenArea]:
+    """
+    游戏截图中 按顺序找到的第一个区域
+    识别方式相同且位置重叠的区域 会合并成一个裁剪区域 只识别一次
+    适合同一个画面中 同一内容出现在不同位置的多个区域
+    :param ctx: 上下文
+    :param screen: 游戏截图
+    :param area_list: 区域列表 为空的会被忽略
+    :return: 第一个找到的区域 都找不到时返回空
+    """
+    group_map: dict[tuple, List[int]] = {}  # 识别方式 -> 区域下标
+    for idx, area in enumerate(area_list):
+        if area is None:
+            continue
+        if area.is_text_area:
+            key = ('text', None if area.color_range is None else str(area.color_range))
+        elif area.is_template_area:
+            key = ('template', area.template_sub_dir, area.template_id, area.template_match_threshold)
+        else:
+            continue
+        if key not in group_map:
+            group_map[key] = []
+        group_map[key].append(idx)
+
+    cluster_list: List[tuple[Rect, List[int]]] = []
+    for idx_list in group_map.values():
+        cluster_list.extend(_merge_area_rect(area_list, idx_list))
+    cluster_list.sort(key=lambda i: i[1][0])  # 优先识别排在前面的区域
+
+    found_idx_set: set[int] = set()
+    checked_idx_set: set[int] = set()
+    for crop_rect, idx_list in cluster_list:
+        found_idx_set.update(_find_area_in_crop(ctx, screen, area_list, crop_rect, idx_list))
+        checked_idx_set.update(idx_list)
+
+        # 前面的区域都已经识别过时 就可以确定第一个找到的区域
+        for idx, area in enumerate(area_list):
+            if idx in found_idx_set:
+                return area
+            if area is not None and idx not in checked_idx_set:
+                break
+
+    return None
+
+
+def _merge_area_rect(area_list: List[ScreenArea], idx_list: List[int]) -> List[tuple[Rect, List[int]]]:
+    """
+    将重叠的区域合并
+    :param area_list: 区域列表
+    :param idx_list: 需要合并的区域下标
+    :return: [(合并后的区域, 包含的区域下标)]
+    """
+    cluster_list: List[tuple[Rect, List[int]]] = []
+    for idx in idx_list:
+        rect = area_list[idx].rect
+        merged_rect = Rect(rect.x1, rect.y1, rect.x2, rect.y2)
+        merged_idx_list = [idx]
+        remain_list = []
+        for cluster_rect, cluster_idx_list in cluster_list:
+            if (cluster_rect.x1 <= merged_rect.x2 and merged_rect.x1 <= cluster_rect.x2
+                    and cluster_rect.y1 <= merged_rect.y2 and merged_rect.y1 <= cluster_rect.y2):
+                merged_rect = Rect(min(merged_rect.x1, cluster_rect.x1), min(merged_rect.y1, cluster_rect.y1),
+                                   max(merged_rect.x2, cluster_rect.x2), max(merged_rect.y2, cluster_rect.y2))
+                merged_idx_list = cluster_idx_list + merged_idx_list
+            else:
+                remain_list.append((cluster_rect, cluster_idx_list))
+        remain_list.append((merged_rect, sorted(merged_idx_list)))
+        cluster_list = remain_list
+    return cluster_list
+
+
+def _find_area_in_crop(ctx: OneDragonContext, screen: MatLike, area_list: List[ScreenArea],
+                       crop_rect: Rect, idx_list: List[int]) -> List[int]:
+    """
+    在合并后的区域中识别一次 再按位置判断各个区域是否找到
+    文本区域要求识别结果的中心在区域内 模板区域要求匹配结果完全在区域内 与单独裁剪区域识别时一致
+    :param ctx: 上下文
+    :param screen: 游戏截图
+    :param area_list: 区域列表
+    :param crop_rect: 合并后的区域
+    :param idx_list: 包含的区域下标 识别方式都相同
+    :return: 找到的区域下标
+    """
+    first_area = area_list[idx_list[0]]
+    part, crop_rect = cv2_utils.crop_image(screen, crop_rect)
+    offset = crop_rect.left_top
+    found_idx_list: List[int] = []
+
+    if first_area.is_text_area:
+        if first_area.color_range is None:
+            to_ocr = part
+        else:
+            mask = cv2.inRange(part,
+                               np.array(first_area.color_range[0], dtype=np.uint8),
+                               np.array(first_area.color_range[1], dtype=np.uint8))
+            mask = cv2_utils.dilate(mask, 2)
+            to_ocr = cv2.bitwise_and(part, part, mask=mask)
+
+        ocr_result_map = ctx.ocr.run_ocr(to_ocr)
+        for idx in idx_list:
+            area = area_list[idx]
+            target_text = gt(area.text)
+            for ocr_result, mrl in ocr_result_map.items():
+                if not str_utils.find_by_lcs(target_text, ocr_result, percent=area.lcs_percent):
+                    continue
+                if any(_is_point_in_rect(mr.center + offset, area.rect) for mr in mrl):
+                    found_idx_list.append(idx)
+                    break
+    else:
+        mrl = ctx.tm.match_template(part, first_area.template_sub_dir, first_area.template_id,
+                                    threshold=first_area.template_match_threshold, only_best=False)
+        for idx in idx_list:
+            area = area_list[idx]
+            if any(_is_match_in_rect(mr, offset, area.rect) for mr in mrl):
+                found_idx_list.append(idx)
+
+    return found_idx_list
+
+
+def _is_point_in_rect(point: Point, rect: Rect) -> bool:
+    return rect.x1 <= point.x <= rect.x2 and rect.y1 <= point.y <= rect.y2
+
+
+def _is_match_in_rect(mr: MatchResult, offset: Point, rect: Rect) -> bool:
+    return (rect.x1 <= mr.x + offset.x and mr.x + offset.x + mr.w <= rect.x2
+            and rect.y1 <= mr.y + offset.y and mr.y + offset.y + mr.h <= rect.y2)
+
+
 def find_and_click_area(ctx: OneDragonContext, screen: MatLike, screen_name: str, area_name: str) -> OcrClickResultEnum:
     """
     在一个区域匹配成功后进行点击
@@ -185,18 +315,22 @@ def is_target_screen(ctx: OneDragonContext, screen: MatLike,
         if screen_info is None:
             return False
 
-    existed_id_mark: bool = False
-    fit_id_mark: bool = True
-    for screen_area in screen_info.area_list:
-        if not screen_area.id_mark:
-            continue
-        existed_id_mark = True
+    id_area_list: List[ScreenArea] = [i for i in screen_info.area_list if i.id_mark]
+    if len(id_area_list) == 0:
+        return False
 
+    for screen_area in id_area_list:
+        # 缩略图和之前识别成功的样本几乎一致时 跳过OCR或模板匹配 否则完整识别
+        # 缩略图只用于确认 不用于否定 画面配置没有附带截图 样本只能在运行时识别成功后得到
+        # 也没有录制的画面可以用来验证否定的阈值 误判会导致画面识别错误
+        fingerprint = screen_area.get_fingerprint_in_screen(screen)
+        if screen_area.is_fingerprint_matched(fingerprint):
+            continue
         if find_area_in_screen(ctx, screen, screen_area) != FindAreaResultEnum.TRUE:
-            fit_id_mark = False
-            break
+            return False
+        screen_area.add_id_fingerprint(fingerprint)
 
-    return existed_id_mark and fit_id_mark
+    return True
 
 
 def find_by_ocr(ctx: OneDragonContext, screen: MatLike, target_cn: str,
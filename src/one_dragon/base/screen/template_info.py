@@ -12,6 +12,8 @@ from one_dragon.base.config.yaml_operator import YamlOperator
 from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
 from one_dragon.utils import os_utils, cal_utils, cv2_utils
+from one_dragon.utils import image_pack_utils
+from one_dragon.utils.image_pack_utils import ImagePack
 
 TEMPLATE_RAW_FILE_NAME = 'raw.png'
 TEMPLATE_MASK_FILE_NAME = 'mask.png'
@@ -30,7 +32,7 @@ class TemplateShapeEnum(Enum):
 
 class TemplateInfo(YamlOperator):
 
-    def __init__(self, sub_dir: str, template_id: str):
+    def __init__(self, sub_dir: str, template_id: str, image_pack: Optional[ImagePack] = None):
         # 旧的模板ID 在开发工具中使用 方便更改后迁移文件
         self.old_sub_dir: str = sub_dir
         self.old_template_id: str = template_id
@@ -40,7 +42,7 @@ class TemplateInfo(YamlOperator):
 
         self.screen_image: Optional[MatLike] = None
 
-        YamlOperator.__init__(self, file_path=self.get_yml_file_path())
+        YamlOperator.__init__(self, file_path=self.get_yml_file_path(), is_asset=True)
 
         self.template_name: str = self.get('template_name', '')
         self.template_shape: str = self.get('template_shape', TemplateShapeEnum.RECTANGLE.value.value)
@@ -52,8 +54,11 @@ class TemplateInfo(YamlOperator):
         self.auto_mask: bool = self.get('auto_mask', True)
         self.point_updated: bool = False  # 点位是否更改过 开发工具中用
 
-        self.raw: MatLike = cv2_utils.read_image(get_template_raw_path(self.sub_dir, self.template_id))  # 原图
-        self.mask: MatLike = cv2_utils.read_image(get_template_mask_path(self.sub_dir, self.template_id))  # 掩码
+        # 图片在第一次使用时才读取
+        self._image_pack: Optional[ImagePack] = image_pack  # 打包的模板图片 有的话优先使用
+        self._image_loaded: bool = False
+        self._raw: Optional[MatLike] = None  # 原图
+        self._mask: Optional[MatLike] = None  # 掩码
 
         # 运算后保存在内存的
         self._gray: MatLike = None  # 灰度图
@@ -63,6 +68,54 @@ class TemplateInfo(YamlOperator):
     def get_yml_file_path(self) -> str:
         return get_template_config_path(self.sub_dir, self.template_id)
 
+    @property
+    def raw(self) -> Optional[MatLike]:
+        if not self._image_loaded:
+            self.load_image()
+        return self._raw
+
+    @raw.setter
+    def raw(self, new_value: Optional[MatLike]) -> None:
+        if not self._image_loaded:  # 先读取掩码 避免之后读取时覆盖这次设置的原图
+            self.load_image()
+        self._raw = new_value
+
+    @property
+    def mask(self) -> Optional[MatLike]:
+        if not self._image_loaded:
+            self.load_image()
+        return self._mask
+
+    @mask.setter
+    def mask(self, new_value: Optional[MatLike]) -> None:
+        if not self._image_loaded:  # 先读取原图 避免之后读取时覆盖这次设置的掩码
+            self.load_image()
+        self._mask = new_value
+
+    @property
+    def is_image_loaded(self) -> bool:
+        """
+        图片是否已经读取
+        :return:
+        """
+        return self._image_loaded
+
+    def load_image(self) -> None:
+        """
+        读取原图和掩码 打包文件中的图片与原文件一致时直接使用 否则读取原文件
+        可以在其它线程中提前调用
+        :return:
+        """
+        raw_path = get_template_raw_path(self.sub_dir, self.template_id)
+        mask_path = get_template_mask_path(self.sub_dir, self.template_id)
+        self._raw = image_pack_utils.get_fresh_image(self._image_pack, get_image_pack_key(raw_path), raw_path)
+        if self._raw is None:
+            self._raw = cv2_utils.read_image(raw_path)
+        self._mask = image_pack_utils.get_fresh_image(self._image_pack, get_image_pack_key(mask_path), mask_path)
+        if self._mask is None:
+            self._mask = cv2_utils.read_image(mask_path)
+        self._image_loaded = True
+
     def remove_point_by_idx(self, idx: int) -> None:
         """
         移除坐标
@@ -497,6 +550,8 @@ class TemplateInfo(YamlOperator):
         复制变成一个新的
         :return:
         """
+        if not self._image_loaded:  # 改变ID前 先读取原来的图片
+            self.load_image()
         self.template_id = self.template_id + '_copy'
 
         self.old_sub_dir = self.sub_dir  # 无需删除
@@ -514,6 +569,15 @@ class TemplateInfo(YamlOperator):
         self.point_updated = True
 
 
+def get_image_pack_key(file_path: str) -> str:
+    """
+    图片在打包文件中的key 使用模板根目录下的相对路径
+    :param file_path: 图片路径
+    :return:
+    """
+    return os.path.relpath(file_path, get_template_root_dir_path()).replace('\\', '/')
+
+
 @lru_cache
 def get_template_root_dir_path() -> str:
     """
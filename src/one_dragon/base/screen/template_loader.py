@@ -1,19 +1,43 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
 from cv2.typing import MatLike
-from typing import List, Optional
+from typing import List, Optional, Tuple, Callable, Any
 
-from one_dragon.base.screen.template_info import TemplateInfo, is_template_existed
-from one_dragon.utils import os_utils
+from one_dragon.base.config.yaml_operator import YamlOperator
+from one_dragon.base.screen.template_info import TemplateInfo, is_template_existed, get_template_raw_path, \
+    get_template_mask_path, get_image_pack_key
+from one_dragon.utils import os_utils, thread_utils, cv2_utils
+from one_dragon.utils.image_pack_utils import ImagePack, write_image_pack, get_file_meta
+from one_dragon.utils.log_utils import log
+
+_template_loader_executor = ThreadPoolExecutor(thread_name_prefix='od_template_loader', max_workers=4)
 
 
 class TemplateLoader:
 
-    def __init__(self):
+    def __init__(self, use_atlas: bool = True):
+        """
+        模板加载器 模板图片在第一次使用时才读取
+        :param use_atlas: 是否使用打包的模板图片 需要先用 build_atlas 生成
+        """
         self.template: dict[str, TemplateInfo] = {}
 
+        self.atlas: Optional[ImagePack] = None
+        """打包的模板图片"""
+        if use_atlas:
+            self.atlas = ImagePack(get_atlas_path())
+            if not self.atlas.is_valid:
+                self.atlas = None
+
+        self._usage_lock = threading.Lock()
+        self._usage_map: dict[str, set[str]] = {}  # 正在记录的应用 -> 使用过的模板key
+
+        self._derived_cache: dict[str, Tuple[Tuple[Optional[TemplateInfo], ...], Any]] = {}  # key -> (计算时使用的模板, 结果)
+
     def get_all_template_info_from_disk(self, need_raw: bool = True, need_config: bool = False) -> List[TemplateInfo]:
         """
-        从硬盘加载模板信息
+        从硬盘加载模板信息 图片在使用时才读取
         模板存放在 assets/template 中，再按二级目录区分，例如 assets/template/x/y/
         x = 页面或者类别
         y = 具体的模板文件夹
@@ -38,7 +62,7 @@ class TemplateLoader:
                 if not is_template_existed(sub_name_1, sub_name_2, need_raw=need_raw, need_config=need_config):
                     continue
 
-                info_list.append(TemplateInfo(sub_name_1, sub_name_2))
+                info_list.append(TemplateInfo(sub_name_1, sub_name_2, image_pack=self.atlas))
 
         return info_list
 
@@ -52,7 +76,7 @@ class TemplateLoader:
         """
         if not is_template_existed(sub_dir, template_id, need_raw=not only_mask):
             return None
-        template: TemplateInfo = TemplateInfo(sub_dir, template_id)
+        template: TemplateInfo = TemplateInfo(sub_dir, template_id, image_pack=self.atlas)
 
         key = '%s:%s' % (sub_dir, template_id)
         self.template[key] = template
@@ -66,6 +90,7 @@ class TemplateLoader:
         :return: 模板图片
         """
         key = '%s:%s' % (sub_dir, template_id)
+        self._record_usage(key)
         if key in self.template:
             return self.template[key]
         else:
@@ -79,7 +104,138 @@ class TemplateLoader:
         :return: 模板图片
         """
         key = '%s:%s' % (sub_dir, template_id)
+        self._record_usage(key)
         if key in self.template:
             return self.template[key].mask
         else:
             return self.load_template(sub_dir, template_id, only_mask=True).mask
+
+    def get_derived(self, key: str, template_list: List[Tuple[str, str]],
+                    builder: Callable[[List[Optional[TemplateInfo]]], Any]) -> Any:
+        """
+        由多个模板计算得到的结果 例如合并后的特征 缓存在加载器中
+        有模板被重新加载后 会重新计算
+        :param key: 结果的key
+        :param template_list: 使用的模板 (sub_dir, template_id)
+        :param builder: 计算方法 入参为按顺序的模板 不存在的为空
+        :return:
+        """
+        templates = tuple(self.get_template(sub_dir, template_id) for sub_dir, template_id in template_list)
+        cached = self._derived_cache.get(key)
+        if (cached is not None and len(cached[0]) == len(templates)
+                and all(i is j for i, j in zip(cached[0], templates))):
+            return cached[1]
+
+        value = builder(list(templates))
+        self._derived_cache[key] = (templates, value)
+        return value
+
+    def warm_up(self, template_list: List[Tuple[str, str]]) -> List[Future]:
+        """
+        使用线程池并行读取模板图片
+        :param template_list: 需要读取的模板 (sub_dir, template_id)
+        :return:
+        """
+        future_list: List[Future] = []
+        for sub_dir, template_id in template_list:
+            key = '%s:%s' % (sub_dir, template_id)
+            template = self.template.get(key)
+            if template is None:
+                template = self.load_template(sub_dir, template_id)
+            if template is None or template.is_image_loaded:
+                continue
+            f = _template_loader_executor.submit(template.load_image)
+            f.add_done_callback(thread_utils.handle_future_result)
+            future_list.append(f)
+
+        return future_list
+
+    def warm_up_by_app(self, app_id: str) -> List[Future]:
+        """
+        按应用上次运行时使用过的模板 并行读取模板图片
+        :param app_id: 应用ID
+        :return:
+        """
+        manifest = get_manifest_operator()
+        key_list: List[str] = manifest.get(app_id, [])
+        template_list: List[Tuple[str, str]] = []
+        for key in key_list:
+            sub_dir, template_id = key.split(':', 1)
+            template_list.append((sub_dir, template_id))
+        return self.warm_up(template_list)
+
+    def start_usage_record(self, app_id: str) -> None:
+        """
+        开始记录一个应用使用的模板
+        :param app_id: 应用ID
+        :return:
+        """
+        with self._usage_lock:
+            self._usage_map[app_id] = set()
+
+    def stop_usage_record(self, app_id: str) -> None:
+        """
+        结束记录一个应用使用的模板 并合并到模板清单中
+        :param app_id: 应用ID
+        :return:
+        """
+        with self._usage_lock:
+            used = self._usage_map.pop(app_id, None)
+        if used is None or len(used) == 0:
+            return
+
+        manifest = get_manifest_operator()
+        old_list: List[str] = manifest.get(app_id, [])
+        if used.issubset(old_list):
+            return
+        manifest.update(app_id, sorted(used.union(old_list)))
+
+    def _record_usage(self, key: str) -> None:
+        """
+        记录模板被使用了
+        :param key: 模板key
+        :return:
+        """
+        if len(self._usage_map) == 0:
+            return
+        with self._usage_lock:
+            for used in self._usage_map.values():
+                used.add(key)
+
+    def build_atlas(self) -> None:
+        """
+        将全部模板图片不压缩地打包成一个文件 启动时内存映射读取 不需要逐个解码
+        :return:
+        """
+        image_map: dict[str, MatLike] = {}
+        meta_map: dict[str, dict] = {}
+        for template in self.get_all_template_info_from_disk(need_raw=False):
+            for file_path in [get_template_raw_path(template.sub_dir, template.template_id),
+                              get_template_mask_path(template.sub_dir, template.template_id)]:
+                image = cv2_utils.read_image(file_path)
+                if image is None:
+                    continue
+                key = get_image_pack_key(file_path)
+                image_map[key] = image
+                meta_map[key] = get_file_meta(file_path)
+
+        atlas_path = get_atlas_path()
+        write_image_pack(atlas_path, image_map, meta_map)
+        log.info('模板打包完成 共 %d 张图片 %s', len(image_map), atlas_path)
+
+
+def get_atlas_path() -> str:
+    """
+    打包的模板图片的文件路径
+    :return:
+    """
+    return os.path.join(os_utils.get_path_under_work_dir('.cache'), 'template_atlas.pack')
+
+
+def get_manifest_operator() -> YamlOperator:
+    """
+    模板清单 记录每个应用使用过的模板 用于下次运行前并行预读
+    :return:
+    """
+    return YamlOperator(os.path.join(os_utils.get_path_under_work_dir('.cache'), 'template_manifest.yml'),
+                        write_behind=True)
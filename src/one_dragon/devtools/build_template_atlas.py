@@ -0,0 +1,15 @@
+from one_dragon.base.screen.template_loader import TemplateLoader
+
+
+def build_template_atlas():
+    """
+    将全部模板图片打包成一个文件
+    模板图片有更新后需要重新运行 过时的图片会自动改为读取原文件
+    :return: None
+    """
+    loader = TemplateLoader(use_atlas=False)
+    loader.build_atlas()
+
+
+if __name__ == '__main__':
+    build_template_atlas()
@@ -0,0 +1,99 @@
+import time
+
+import numpy as np
+
+from onnxocr.db_postprocess import DBPostProcess
+
+
+def make_pred_map(rng: np.random.Generator, height: int = 736, width: int = 1280, num: int = 160) -> np.ndarray:
+    """
+    生成模拟的DB概率图 包含完整的矩形、边缘缺角的矩形和细长的文本行
+    :param rng: 随机数
+    :param height: 高
+    :param width: 宽
+    :param num: 文本框数量
+    :return: 概率图
+    """
+    pred = np.zeros((height, width), dtype=np.float32)
+    for _ in range(num):
+        h = int(rng.integers(4, 30))
+        w = int(rng.integers(10, 300))
+        y = int(rng.integers(0, height - h))
+        x = int(rng.integers(0, width - w))
+        pred[y:y + h, x:x + w] = rng.uniform(0.31, 1, size=(h, w))
+        if rng.random() < 0.3:  # 缺角 走原来的路径
+            pred[y, x] = 0
+        if rng.random() < 0.3:  # 低分的边缘
+            pred[y:y + h, x] = rng.uniform(0.31, 0.4, size=h)
+    return pred
+
+
+def check_once(post: DBPostProcess, rect_post: DBPostProcess,
+               pred: np.ndarray) -> list[str]:
+    """
+    对比原来的路径和矩形快速路径的结果 框的坐标按概率图的大小对比
+    :param post: 原来的后处理
+    :param rect_post: 开启矩形快速路径的后处理
+    :param pred: 概率图
+    :return: 不一致的描述
+    """
+    bitmap = pred > post.thresh
+    dest_height, dest_width = pred.shape
+    boxes, scores = post.boxes_from_bitmap(pred, bitmap, dest_width, dest_height)
+    rect_boxes, rect_scores = rect_post.boxes_from_bitmap(pred, bitmap, dest_width, dest_height)
+
+    problems = []
+    if len(boxes) != len(rect_boxes):
+        problems.append('数量不一致 %d %d' % (len(boxes), len(rect_boxes)))
+
+    used = set()
+    for box, score in zip(boxes, scores):
+        matched = False
+        for idx, (rect_box, rect_score) in enumerate(zip(rect_boxes, rect_scores)):
+            if idx in used or abs(score - rect_score) > 1e-6:
+                continue
+            if np.abs(np.sort(box, axis=0) - np.sort(rect_box, axis=0)).max() > 1:
+                continue
+            used.add(idx)
+            matched = True
+            break
+        if not matched:
+            problems.append('没有对应的框 %s %.4f' % (box.tolist(), score))
+    return problems
+
+
+def check_rect_fast_path(times: int = 50, seed: int = 0):
+    """
+    检查DB后处理的矩形快速路径 选出的框和分数与原来的路径一致 框的坐标在概率图上最多差1像素
+    :param times: 随机的次数
+    :param seed: 随机种子
+    :return: None
+    """
+    rng = np.random.default_rng(seed)
+    post = DBPostProcess(thresh=0.3, box_thresh=0.6, unclip_ratio=1.5)
+    rect_post = DBPostProcess(thresh=0.3, box_thresh=0.6, unclip_ratio=1.5, use_rect_fast_path=True)
+    cost = [0.0, 0.0]
+    total_problems = 0
+    for i in range(times):
+        pred = make_pred_map(rng)
+        dest_height, dest_width = pred.shape
+        problems = check_once(post, rect_post, pred)
+        for p in problems:
+            print('第%d次 %s' % (i, p))
+        total_problems += len(problems)
+
+        bitmap = pred > post.thresh
+        t1 = time.perf_counter()
+        post.boxes_from_bitmap(pred, bitmap, dest_width, dest_height)
+        t2 = time.perf_counter()
+        rect_post.boxes_from_bitmap(pred, bitmap, dest_width, dest_height)
+        t3 = time.perf_counter()
+        cost[0] += t2 - t1
+        cost[1] += t3 - t2
+
+    print('不一致 %d 个' % total_problems)
+    print('原来的路径 %.2fms 矩形快速路径 %.2fms' % (cost[0] * 1000 / times, cost[1] * 1000 / times))
+
+
+if __name__ == '__main__':
+    check_rect_fast_path()
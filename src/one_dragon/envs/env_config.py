@@ -281,6 +281,54 @@ class EnvConfig(YamlConfig):
         """
         self.update('is_debug', new_value)
 
+    @property
+    def is_profile(self) -> bool:
+        """
+        指令耗时统计 应用结束时导出到 .debug/profile
+        :return:
+        """
+        return self.get('is_profile', False)
+
+    @is_profile.setter
+    def is_profile(self, new_value: bool):
+        """
+        更新指令耗时统计
+        :return:
+        """
+        self.update('is_profile', new_value)
+
+    @property
+    def is_frame_record(self) -> bool:
+        """
+        画面录制 运行时记录截图和输入操作到 .debug/frame_record
+        :return:
+        """
+        return self.get('is_frame_record', False)
+
+    @is_frame_record.setter
+    def is_frame_record(self, new_value: bool):
+        """
+        更新画面录制
+        :return:
+        """
+        self.update('is_frame_record', new_value)
+
+    @property
+    def frame_record_max_mb(self) -> int:
+        """
+        画面录制最多占用的磁盘空间
+        :return:
+        """
+        return self.get('frame_record_max_mb', 1024)
+
+    @frame_record_max_mb.setter
+    def frame_record_max_mb(self, new_value: int):
+        """
+        更新画面录制最多占用的磁盘空间
+        :return:
+        """
+        self.update('frame_record_max_mb', new_value)
+
     @property
     def key_start_running(self) -> str:
         """
@@ -1,42 +1,8 @@
-from collections import deque
-import logging
-from PySide6.QtCore import Signal, QObject, QTimer
+from PySide6.QtCore import QTimer
 from qfluentwidgets import PlainTextEdit, isDarkTheme
-from one_dragon.utils.log_utils import log as od_log
-from one_dragon.yolo.log_utils import log as yolo_log
 
-class LogSignal(QObject):
-    new_log = Signal(str)
-
-class LogReceiver(logging.Handler):
-    def __init__(self):
-        super().__init__()
-        # 限制日志数量
-        self.log_list: deque[str] = deque(maxlen=64)  
-        # 新日志
-        self.new_logs: list[str] = []
-        # 是否接收日志
-        self.update = False 
-
-    def emit(self, record):
-        """将新日志记录添加到日志队列"""
-        # 不接收日志时直接返回
-        if not self.update:
-            return
-        msg = self.format(record)
-        self.log_list.append(msg)
-        self.new_logs.append(msg)
-
-    def get_new_logs(self) -> list[str]:
-        """获取新的日志"""
-        new_logs = self.new_logs.copy()
-        self.new_logs.clear()
-        return new_logs
-
-    def clear_logs(self):
-        """清空日志队列"""
-        self.log_list.clear()
-        self.new_logs.clear()
+from one_dragon.utils.log_utils import log_buffer, attach_to_log_queue
+from one_dragon.yolo.log_utils import log as yolo_log
 
 
 class LogDisplayCard(PlainTextEdit):
@@ -49,10 +15,11 @@ class LogDisplayCard(PlainTextEdit):
         # 初始化颜色
         self.init_color()  
 
-        # 初始化接收器
-        self.receiver = LogReceiver()
-        od_log.addHandler(self.receiver)
-        yolo_log.addHandler(self.receiver)
+        # 直接读取内存中的日志 YOLO的日志也通过队列写入
+        attach_to_log_queue(yolo_log)
+
+        # 已经显示的最后一条日志序号
+        self._last_log_seq: int = log_buffer.latest_seq
 
         # 初始化定时器
         self.update_timer = QTimer()
@@ -83,14 +50,13 @@ class LogDisplayCard(PlainTextEdit):
     def start(self, clear_log: bool = False):
         """启动日志显示"""
         if clear_log:
-            self.receiver.clear_logs()
+            self._last_log_seq = log_buffer.latest_seq
             self.clear()
         self.init_color()
-        self.receiver.update = True
         if not self.is_running:
             self.is_running = True
         if not self.is_pause:
-            self.receiver.clear_logs()
+            self._last_log_seq = log_buffer.latest_seq
             self.clear()
         self.auto_scroll = True
         self.update_timer.start(self.update_frequency)
@@ -102,7 +68,6 @@ class LogDisplayCard(PlainTextEdit):
         self.is_pause = True
         self.auto_scroll = False
         self.update_timer.stop()
-        self.receiver.update = False
 
     def stop(self):
         """停止日志显示"""
@@ -113,11 +78,13 @@ class LogDisplayCard(PlainTextEdit):
         self.auto_scroll = False
         self.update_timer.stop()
         self.update_logs()  # 停止后 最后更新一次日志
-        self.receiver.update = False
 
     def update_logs(self) -> None:
         """更新日志显示区域"""
-        new_logs = self.receiver.get_new_logs()
+        new_entries = log_buffer.get_since(self._last_log_seq)
+        if len(new_entries) > 0:
+            self._last_log_seq = new_entries[-1].seq
+        new_logs = [i.text for i in new_entries]
         # 格式化日志
         if len(new_logs) != 0:
             formatted_logs = self._format_logs(new_logs)  
@@ -358,6 +358,29 @@ def feature_match_for_one(source_kp, source_desc, template_kp, template_desc,
     # feature_matcher = cv2.FlannBasedMatcher()
     feature_matcher = cv2.BFMatcher()
     matches = feature_matcher.knnMatch(template_desc, source_desc, k=2)
+    return feature_match_for_one_by_knn(matches, source_kp, template_kp,
+                                        template_width=template_width, template_height=template_height,
+                                        source_mask=source_mask, knn_distance_percent=knn_distance_percent)
+
+
+def feature_match_for_one_by_knn(matches, source_kp, template_kp,
+                                 template_width: int, template_height: int,
+                                 source_mask: Optional[MatLike] = None,
+                                 knn_distance_percent: float = 0.7,
+                                 query_offset: int = 0) -> Optional[MatchResult]:
+    """
+    使用已经算好的knn匹配结果 找到一个匹配结果
+    多个模板的描述子合并后一起匹配时使用
+    :param matches: 模板描述子对源图描述子的knn匹配结果 k=2
+    :param source_kp: 源图关键点
+    :param template_kp: 目标关键点
+    :param template_width: 目标原宽度
+    :param template_height: 目标原高度
+    :param source_mask: 源图掩码
+    :param knn_distance_percent: 越小要求匹配程度越高
+    :param query_offset: 合并描述子时 这个模板的第一个描述子的下标
+    :return: 缩放后的位置和大小
+    """
     # 应用比值测试，筛选匹配点
     good_matches = []
     for t in matches:
@@ -371,7 +394,7 @@ def feature_match_for_one(source_kp, source_desc, template_kp, template_desc,
         return None
 
     # 提取匹配点的坐标
-    template_points = np.float32([template_kp[m.queryIdx].pt for m in good_matches]).reshape(-1, 1, 2)  # 模板的
+    template_points = np.float32([template_kp[m.queryIdx - query_offset].pt for m in good_matches]).reshape(-1, 1, 2)  # 模板的
     source_points = np.float32([source_kp[m.trainIdx].pt for m in good_matches]).reshape(-1, 1, 2)  # 原图的
 
     # 使用RANSAC算法估计模板位置和尺度
@@ -388,11 +411,11 @@ def feature_match_for_one(source_kp, source_desc, template_kp, template_desc,
             best_match = good_matches[i]
 
     query_point = source_kp[best_match.trainIdx].pt  # 原图中的关键点坐标 (x, y)
-    train_point = template_kp[best_match.queryIdx].pt  # 模板中的关键点坐标 (x, y)
+    train_point = template_kp[best_match.queryIdx - query_offset].pt  # 模板中的关键点坐标 (x, y)
 
     # 获取最佳匹配的特征点的缩放比例
     query_scale = source_kp[best_match.trainIdx].size
-    train_scale = template_kp[best_match.queryIdx].size
+    train_scale = template_kp[best_match.queryIdx - query_offset].size
     template_scale = query_scale / train_scale
 
     # 模板图缩放后在原图上的偏移量
@@ -762,3 +785,34 @@ def color_in_range(img: MatLike, lower: List[int], upper: List[int],
         return part
     else:
         return connection_erase(part, noise_threshold)
+
+
+def to_thumbnail(img: MatLike, rect: Optional[Rect] = None, max_size: int = 64) -> MatLike:
+    """
+    截取区域后缩小成灰度小图 用于快速比较画面是否有变化
+    :param img: 原图
+    :param rect: 区域 不传入时使用整张图
+    :param max_size: 缩小后的最长边
+    :return:
+    """
+    part = crop_image_only(img, rect)
+    if len(part.shape) == 3:
+        part = cv2.cvtColor(part, cv2.COLOR_RGB2GRAY)
+    height, width = part.shape[:2]
+    scale = max_size / max(height, width)
+    if scale < 1:
+        part = cv2.resize(part, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                          interpolation=cv2.INTER_AREA)
+    return part
+
+
+def thumbnail_diff(t1: MatLike, t2: MatLike) -> float:
+    """
+    两张小图的平均像素差
+    :param t1: to_thumbnail 得到的小图
+    :param t2: to_thumbnail 得到的小图
+    :return: 0~255 尺寸不一致时返回255
+    """
+    if t1.shape != t2.shape:
+        return 255
+    return float(np.mean(cv2.absdiff(t1, t2)))
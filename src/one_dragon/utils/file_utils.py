@@ -1,3 +1,5 @@
+import os
+import tempfile
 import zipfile
 
 
@@ -13,4 +15,25 @@ def unzip_file(zip_file_path: str, unzip_dir_path: str) -> bool:
             zip_ref.extractall(unzip_dir_path)
         return True
     except Exception:
-        return False
\ No newline at end of file
+        return False
+
+def save_text_atomically(file_path: str, text: str) -> None:
+    """
+    先写入临时文件 再替换目标文件 避免进程中断时留下写了一半的文件
+    临时文件名每次都不同 多个线程同时写入同一个文件时不会互相覆盖临时文件
+    :param file_path: 目标文件路径
+    :param text: 文件内容
+    :return:
+    """
+    dir_path, file_name = os.path.split(os.path.abspath(file_path))
+    fd, temp_file_path = tempfile.mkstemp(prefix=f'{file_name}.', suffix='.tmp', dir=dir_path)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file_path, file_path)
+    except Exception:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        raise
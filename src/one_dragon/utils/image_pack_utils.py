@@ -0,0 +1,187 @@
+import json
+import mmap
+import os
+import struct
+from typing import Optional, Any
+
+import numpy as np
+from cv2.typing import MatLike
+
+from one_dragon.utils.log_utils import log
+
+_PACK_MAGIC: bytes = b'ODPK'
+_PACK_VERSION: int = 1
+_PACK_ALIGN: int = 64  # 每张图片的起始位置对齐 方便按块读取
+_PACK_HEAD_FORMAT: str = '<4sIQ'  # 魔数 版本 索引长度
+
+
+def _align(offset: int) -> int:
+    return (offset + _PACK_ALIGN - 1) // _PACK_ALIGN * _PACK_ALIGN
+
+
+def write_image_pack(file_path: str, image_map: dict[str, MatLike],
+                     meta_map: Optional[dict[str, dict]] = None) -> None:
+    """
+    将多张图片不压缩地写入同一个文件
+    文件结构为 文件头 + json索引 + 按顺序对齐存放的图片数据
+    读取时可以直接内存映射 不需要解码
+    :param file_path: 文件路径
+    :param image_map: 图片 key -> 图片
+    :param meta_map: 附加信息 key -> dict 例如原文件的修改时间
+    :return:
+    """
+    index: dict[str, dict] = {}
+    offset = 0
+    to_write: list[tuple[int, np.ndarray]] = []
+    for key, image in image_map.items():
+        if image is None:
+            continue
+        arr = np.ascontiguousarray(image)
+        offset = _align(offset)
+        item = {
+            'offset': offset,
+            'shape': list(arr.shape),
+            'dtype': arr.dtype.str,
+        }
+        if meta_map is not None and key in meta_map:
+            item['meta'] = meta_map[key]
+        index[key] = item
+        to_write.append((offset, arr))
+        offset += arr.nbytes
+
+    index_bytes = json.dumps(index, ensure_ascii=False).encode('utf-8')
+    data_start = _align(struct.calcsize(_PACK_HEAD_FORMAT) + len(index_bytes))
+
+    temp_file_path = f'{file_path}.tmp'
+    with open(temp_file_path, 'wb') as file:
+        file.write(struct.pack(_PACK_HEAD_FORMAT, _PACK_MAGIC, _PACK_VERSION, len(index_bytes)))
+        file.write(index_bytes)
+        for item_offset, arr in to_write:
+            file.seek(data_start + item_offset)
+            file.write(arr.tobytes())
+    os.replace(temp_file_path, file_path)
+
+
+def get_file_meta(file_path: str) -> Optional[dict]:
+    """
+    原文件的信息 写入打包文件时记录 用于读取时判断是否过时
+    :param file_path: 原文件路径
+    :return:
+    """
+    if not os.path.exists(file_path):
+        return None
+    stat = os.stat(file_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def get_fresh_image(image_pack: Optional['ImagePack'], key: str, file_path: str) -> Optional[MatLike]:
+    """
+    从打包文件中获取图片 与原文件不一致时返回空 由调用方改为读取原文件
+    :param image_pack: 打包文件
+    :param key: 图片在打包文件中的key
+    :param file_path: 原文件路径
+    :return:
+    """
+    if image_pack is None or not image_pack.is_valid:
+        return None
+    if not image_pack.has(key):
+        return None
+    if image_pack.get_meta(key) != get_file_meta(file_path):
+        return None
+    return image_pack.get_image(key)
+
+
+class ImagePack:
+
+    def __init__(self, file_path: str):
+        """
+        内存映射方式读取 write_image_pack 写入的文件
+        返回的图片是文件内容的视图 不会复制也不需要解码
+        视图是写时复制的 修改图片不会影响文件
+        :param file_path: 文件路径
+        """
+        self.file_path: str = file_path
+        self._index: dict[str, dict] = {}
+        self._data_start: int = 0
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+
+        self._open()
+
+    def _open(self) -> None:
+        """
+        打开文件并读取索引 文件损坏时视为无效 调用方会改为读取原文件
+        :return:
+        """
+        if not os.path.exists(self.file_path):
+            return
+
+        try:
+            self._file = open(self.file_path, 'rb')
+            head_size = struct.calcsize(_PACK_HEAD_FORMAT)
+            magic, version, index_len = struct.unpack(_PACK_HEAD_FORMAT, self._file.read(head_size))
+            if magic != _PACK_MAGIC or version != _PACK_VERSION:
+                self.close()
+                return
+
+            index = json.loads(self._file.read(index_len).decode('utf-8'))
+            if not isinstance(index, dict):
+                raise ValueError('索引格式错误')
+            self._index = index
+            self._data_start = _align(head_size + index_len)
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (OSError, struct.error, ValueError):  # 解码失败的异常都是 ValueError 的子类
+            log.warning('图片打包文件损坏 将读取原文件 %s', self.file_path, exc_info=True)
+            self._index = {}
+            self.close()
+
+    @property
+    def is_valid(self) -> bool:
+        """
+        文件是否成功打开
+        :return:
+        """
+        return self._mm is not None
+
+    def keys(self) -> list[str]:
+        return list(self._index.keys())
+
+    def has(self, key: str) -> bool:
+        return key in self._index
+
+    def get_meta(self, key: str) -> Optional[dict[str, Any]]:
+        """
+        获取写入时的附加信息
+        :param key:
+        :return:
+        """
+        item = self._index.get(key)
+        return None if item is None else item.get('meta')
+
+    def get_image(self, key: str) -> Optional[MatLike]:
+        """
+        获取一张图片
+        :param key:
+        :return: 文件内容的视图
+        """
+        if self._mm is None:
+            return None
+        item = self._index.get(key)
+        if item is None:
+            return None
+        try:
+            return np.ndarray(shape=tuple(item['shape']), dtype=np.dtype(item['dtype']),
+                              buffer=self._mm, offset=self._data_start + item['offset'])
+        except (KeyError, TypeError, ValueError):  # 文件被截断或索引损坏
+            log.warning('图片打包文件损坏 将读取原文件 %s %s', self.file_path, key)
+            return None
+
+    def close(self) -> None:
+        """
+        关闭文件
+        :return:
+        """
+        self._mm = None  # 仍有图片引用时 映射会在图片释放后再关闭
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,11 +1,222 @@
+import atexit
 import logging
 import os
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import threading
+from collections import deque
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
+from typing import List, Optional, Callable, Any, ClassVar
 
 from one_dragon.utils import os_utils
 
 
+class LogEntry:
+
+    def __init__(self, seq: int, record: logging.LogRecord, text: str):
+        """
+        结构化的日志记录 供界面等直接读取
+        :param seq: 递增的序号
+        :param record: 原始日志记录
+        :param text: 格式化后的文本
+        """
+        self.seq: int = seq
+        """递增的序号 用于增量读取"""
+
+        self.created: float = record.created
+        """日志产生的时间"""
+
+        self.level_no: int = record.levelno
+        """日志等级"""
+
+        self.level_name: str = record.levelname
+        """日志等级名称"""
+
+        self.logger_name: str = record.name
+        """日志器名称"""
+
+        self.filename: str = record.filename
+        """产生日志的文件"""
+
+        self.lineno: int = record.lineno
+        """产生日志的行号"""
+
+        self.thread_name: str = record.threadName
+        """产生日志的线程"""
+
+        self.message: str = record.getMessage()
+        """日志内容"""
+
+        self.text: str = text
+        """格式化后的文本"""
+
+
+class LogRingBuffer(logging.Handler):
+
+    def __init__(self, max_size: int = 1024):
+        """
+        有上限的内存日志队列 保存结构化的日志记录
+        :param max_size: 最多保存的日志数量
+        """
+        logging.Handler.__init__(self)
+        self._entries: deque[LogEntry] = deque(maxlen=max_size)
+        self._seq: int = 0
+        self._lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            text = self.format(record)
+            with self._lock:
+                self._seq += 1
+                self._entries.append(LogEntry(self._seq, record, text))
+        except Exception:
+            self.handleError(record)
+
+    @property
+    def latest_seq(self) -> int:
+        """
+        最新一条日志的序号
+        :return:
+        """
+        return self._seq
+
+    def get_since(self, seq: int) -> List[LogEntry]:
+        """
+        获取某个序号之后的日志
+        :param seq: 序号 不包含
+        :return:
+        """
+        with self._lock:
+            if len(self._entries) == 0 or self._entries[-1].seq <= seq:
+                return []
+            return [i for i in self._entries if i.seq > seq]
+
+    def clear(self) -> None:
+        """
+        清空日志 序号不会重置
+        :return:
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class RepeatLogFilter(logging.Filter):
+
+    SUMMARY_ATTR: ClassVar[str] = 'od_repeat_summary'
+
+    def __init__(self, interval: float = 1, max_level: int = logging.INFO,
+                 summary_handler: Optional[Callable[[logging.LogRecord], Any]] = None):
+        """
+        限制重复日志的输出频率
+        同一位置的相同内容 在间隔时间内只输出一次 之后输出时附带省略的次数
+        如果重复的日志之后没有再出现 在其它日志到来且间隔已过 或 flush 时 补发一条省略次数的日志
+        :param interval: 间隔秒数
+        :param max_level: 只对不高于这个等级的日志生效 告警和错误永远会输出
+        :param summary_handler: 补发省略次数日志的处理方法
+        """
+        logging.Filter.__init__(self)
+        self.interval: float = interval
+        self.max_level: int = max_level
+        self.summary_handler: Optional[Callable[[logging.LogRecord], Any]] = summary_handler
+        self._last_map: dict[tuple, list] = {}  # key -> [上次输出时间, 省略次数]
+        self._pending_map: dict[tuple, logging.LogRecord] = {}  # key -> 最后一条被省略的日志
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, RepeatLogFilter.SUMMARY_ATTR, False):
+            return True
+        if record.levelno > self.max_level or self.interval <= 0:
+            with self._lock:
+                summary_list = self._pop_summary(record.created)
+            self._emit_summary(summary_list)
+            return True
+
+        key = (record.pathname, record.lineno, record.getMessage())
+        now = record.created
+        with self._lock:
+            last = self._last_map.get(key)
+            if last is not None and now - last[0] < self.interval:
+                last[1] += 1
+                self._pending_map[key] = record
+                return False
+
+            if last is not None and last[1] > 0:
+                record.msg = '%s (省略重复 %d 次)' % (record.getMessage(), last[1])
+                record.args = None
+            self._pending_map.pop(key, None)
+
+            self._last_map[key] = [now, 0]
+            if len(self._last_map) > 256:
+                self._last_map = {k: v for k, v in self._last_map.items()
+                                  if now - v[0] < self.interval or k in self._pending_map}
+
+            summary_list = self._pop_summary(now)
+
+        self._emit_summary(summary_list)
+        return True
+
+    def flush(self) -> None:
+        """
+        补发所有还没输出的省略次数
+        :return:
+        """
+        with self._lock:
+            summary_list = self._pop_summary(None)
+        self._emit_summary(summary_list)
+
+    def _pop_summary(self, now: Optional[float]) -> List[logging.LogRecord]:
+        """
+        取出需要补发的省略次数日志 调用时需要持有锁
+        :param now: 当前时间 只取出已经过了间隔的 为None时全部取出
+        :return:
+        """
+        if len(self._pending_map) == 0:
+            return []
+        summary_list = []
+        for key in list(self._pending_map.keys()):
+            last = self._last_map.get(key)
+            if last is None:
+                self._pending_map.pop(key)
+                continue
+            if now is not None and now - last[0] < self.interval:
+                continue
+            record = self._pending_map.pop(key)
+            summary = logging.makeLogRecord(record.__dict__)
+            summary.msg = '%s (省略重复 %d 次)' % (record.getMessage(), last[1])
+            summary.args = None
+            setattr(summary, RepeatLogFilter.SUMMARY_ATTR, True)
+            summary_list.append(summary)
+            last[1] = 0
+        return summary_list
+
+    def _emit_summary(self, summary_list: List[logging.LogRecord]) -> None:
+        """
+        输出补发的日志 需要在锁外调用
+        :param summary_list: 补发的日志
+        :return:
+        """
+        if self.summary_handler is None:
+            return
+        for summary in summary_list:
+            self.summary_handler(summary)
+
+
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_repeat_filter: Optional[RepeatLogFilter] = None
+
+log_buffer: LogRingBuffer = LogRingBuffer()
+"""内存中的日志 界面直接读取"""
+
+
 def get_logger():
+    """
+    日志通过队列交给后台线程写入文件和控制台 不阻塞调用线程
+    :return:
+    """
+    global _log_listener, _queue_handler, _repeat_filter
+    stop_log_listener()
+
     logger = logging.getLogger('OneDragon')
     logger.handlers.clear()
     logger.setLevel(logging.INFO)
@@ -16,16 +227,63 @@ def get_logger():
     archive_handler = TimedRotatingFileHandler(log_file_path, when='midnight', interval=1, backupCount=3, encoding='utf-8')
     archive_handler.setLevel(logging.INFO)
     archive_handler.setFormatter(formatter)
-    logger.addHandler(archive_handler)
 
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+
+    # 其它日志器(例如YOLO)也会写入同一个队列 但只进入内存日志 文件和控制台由它们自己处理
+    archive_handler.addFilter(logging.Filter(logger.name))
+    console_handler.addFilter(logging.Filter(logger.name))
+
+    log_buffer.setLevel(logging.INFO)
+    log_buffer.setFormatter(formatter)
+
+    queue_handler = QueueHandler(_log_queue)
+    queue_handler.setLevel(logging.INFO)
+    repeat_filter = RepeatLogFilter(summary_handler=queue_handler.handle)
+    queue_handler.addFilter(repeat_filter)
+    logger.addHandler(queue_handler)
+
+    for other_logger in logging.Logger.manager.loggerDict.values():  # 重新创建时 替换掉其它日志器上旧的队列处理器
+        if isinstance(other_logger, logging.Logger) and _queue_handler in other_logger.handlers:
+            other_logger.removeHandler(_queue_handler)
+            other_logger.addHandler(queue_handler)
+
+    _queue_handler = queue_handler
+    _repeat_filter = repeat_filter
+
+    _log_listener = QueueListener(_log_queue, archive_handler, console_handler, log_buffer,
+                                  respect_handler_level=True)
+    _log_listener.start()
 
     return logger
 
 
+def stop_log_listener() -> None:
+    """
+    停止后台日志线程 会先写完队列中剩余的日志
+    :return:
+    """
+    global _log_listener
+    if _repeat_filter is not None:
+        _repeat_filter.flush()
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    _log_listener = None
+
+
+def attach_to_log_queue(logger: logging.Logger) -> None:
+    """
+    让其它日志器也通过队列写入内存日志 由后台线程写入 不阻塞调用线程
+    :param logger: 日志器
+    :return:
+    """
+    if _queue_handler is not None and _queue_handler not in logger.handlers:
+        logger.addHandler(_queue_handler)
+
+
 def set_log_level(level: int) -> None:
     """
     显示日志等级
@@ -35,6 +293,9 @@ def set_log_level(level: int) -> None:
     log.setLevel(level)
     for handler in log.handlers:
         handler.setLevel(level)
+    if _log_listener is not None:
+        for handler in _log_listener.handlers:
+            handler.setLevel(level)
 
 
 def mask_text(text: str) -> str:
@@ -52,3 +313,4 @@ def mask_text(text: str) -> str:
 
 
 log = get_logger()
+atexit.register(stop_log_listener)
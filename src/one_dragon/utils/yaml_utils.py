@@ -0,0 +1,119 @@
+import atexit
+import os
+import pickle
+import threading
+from typing import Any, Optional
+
+import yaml
+
+from one_dragon.utils import os_utils
+
+try:
+    _YamlLoader = yaml.CSafeLoader  # 有libyaml时使用C实现 快很多
+except AttributeError:
+    _YamlLoader = yaml.SafeLoader
+
+_ASSET_CACHE_VERSION: int = 1  # 缓存格式变化时修改 旧缓存会被丢弃
+_asset_cache: Optional[dict[str, tuple[int, int, bytes]]] = None  # 文件路径 -> (修改时间, 文件大小, pickle后的数据)
+_asset_cache_changed: bool = False
+_asset_cache_lock = threading.Lock()
+
+
+def safe_load(stream) -> Any:
+    """
+    读取yml内容 有C实现时优先使用
+    :param stream: 文件或字符串
+    :return:
+    """
+    return yaml.load(stream, Loader=_YamlLoader)
+
+
+def load_file(file_path: str) -> Any:
+    """
+    读取yml文件
+    :param file_path: 文件路径
+    :return:
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return safe_load(file)
+
+
+def get_asset_cache_path() -> str:
+    """
+    静态资源yml缓存的文件路径
+    :return:
+    """
+    return os.path.join(os_utils.get_path_under_work_dir('.cache'), 'asset_yaml.pkl')
+
+
+def _load_asset_cache() -> dict[str, tuple[int, int, bytes]]:
+    """
+    读取静态资源yml的缓存 需要在锁内调用
+    :return:
+    """
+    global _asset_cache
+    if _asset_cache is not None:
+        return _asset_cache
+
+    _asset_cache = {}
+    cache_path = get_asset_cache_path()
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as file:
+                version, data = pickle.load(file)
+            if version == _ASSET_CACHE_VERSION:
+                _asset_cache = data
+        except Exception:
+            pass  # 缓存损坏时重新解析即可
+
+    return _asset_cache
+
+
+def load_asset_file(file_path: str) -> Any:
+    """
+    读取只读的静态资源yml文件
+    按 路径+修改时间+文件大小 缓存解析结果 文件没变化时不需要重新解析
+    每次返回的都是新的对象 调用方可以随意修改
+    :param file_path: 文件路径
+    :return:
+    """
+    global _asset_cache_changed
+    stat = os.stat(file_path)
+    with _asset_cache_lock:
+        cache = _load_asset_cache()
+        cached = cache.get(file_path)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return pickle.loads(cached[2])
+
+    data = load_file(file_path)
+
+    with _asset_cache_lock:
+        cache[file_path] = (stat.st_mtime_ns, stat.st_size, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+        _asset_cache_changed = True
+
+    return data
+
+
+def save_asset_cache() -> None:
+    """
+    保存静态资源yml的缓存 只在有变化时写入
+    :return:
+    """
+    global _asset_cache_changed
+    with _asset_cache_lock:
+        if _asset_cache is None or not _asset_cache_changed:
+            return
+        data = {k: v for k, v in _asset_cache.items() if os.path.exists(k)}
+        _asset_cache_changed = False
+
+    try:
+        cache_path = get_asset_cache_path()
+        temp_file_path = f'{cache_path}.tmp'
+        with open(temp_file_path, 'wb') as file:
+            pickle.dump((_ASSET_CACHE_VERSION, data), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file_path, cache_path)
+    except Exception:
+        pass  # 缓存写入失败不影响使用
+
+
+atexit.register(save_asset_cache)
@@ -6,6 +6,7 @@ import os
 from cv2.typing import MatLike
 from typing import Optional, List
 
+from one_dragon.base.operation.operation_profiler import profile_call
 from one_dragon.yolo import onnx_utils
 from one_dragon.yolo.detect_utils import DetectFrameResult, DetectClass, DetectContext, DetectObjectResult, xywh2xyxy, \
     multiclass_nms
@@ -52,6 +53,7 @@ class Yolov8Detector(OnnxModelLoader):
         self.category_2_idx: dict[str, List[int]] = {}
         self._load_detect_classes(self.model_dir_path)
 
+    @profile_call('yolo')
     def run(self, image: MatLike, conf: float = 0.6, iou: float = 0.5, run_time: Optional[float] = None,
             label_list: Optional[List[str]] = None,
             category_list: Optional[List[str]] = None) -> DetectFrameResult:
@@ -39,6 +39,7 @@ class DBPostProcess(object):
                  use_dilation=False,
                  score_mode="fast",
                  box_type='quad',
+                 use_rect_fast_path=False,
                  **kwargs):
         self.thresh = thresh
         self.box_thresh = box_thresh
@@ -47,6 +48,10 @@ class DBPostProcess(object):
         self.min_size = 3
         self.score_mode = score_mode
         self.box_type = box_type
+        # axis-aligned text (e.g. game UI) can skip shapely and pyclipper.
+        # contours that are filled axis-aligned rectangles are expanded analytically,
+        # scores and selected boxes stay the same as the contour path
+        self.use_rect_fast_path = use_rect_fast_path
         assert score_mode in [
             "slow", "fast"
         ], "Score mode must be in [slow, fast] but got: {}".format(score_mode)
@@ -122,31 +127,74 @@ class DBPostProcess(object):
         boxes = []
         scores = []
         for index in range(num_contours):
-            contour = contours[index]
-            points, sside = self.get_mini_boxes(contour)
-            if sside < self.min_size:
-                continue
-            points = np.array(points)
-            if self.score_mode == "fast":
-                score = self.box_score_fast(pred, points.reshape(-1, 2))
-            else:
-                score = self.box_score_slow(pred, contour)
-            if self.box_thresh > score:
+            result = self.box_from_contour(pred, contours[index], width, height,
+                                           dest_width, dest_height)
+            if result is None:
                 continue
+            boxes.append(result[0])
+            scores.append(result[1])
+        return np.array(boxes, dtype="int32"), scores
 
+    def box_from_contour(self, pred, contour, width, height, dest_width,
+                         dest_height):
+        '''
+        get the expanded box of one contour in the dest size.
+        return None if the contour is too small or its score is too low
+        '''
+        points, sside = self.get_mini_boxes(contour)
+        if sside < self.min_size:
+            return None
+        points = np.array(points)
+        if self.score_mode == "fast":
+            score = self.box_score_fast(pred, points.reshape(-1, 2))
+        else:
+            score = self.box_score_slow(pred, contour)
+        if self.box_thresh > score:
+            return None
+
+        if self.use_rect_fast_path and self.is_axis_aligned_rect(contour):
+            box, sside = self.unclip_rect(contour, self.unclip_ratio)
+        else:
             box = self.unclip(points, self.unclip_ratio).reshape(-1, 1, 2)
             box, sside = self.get_mini_boxes(box)
-            if sside < self.min_size + 2:
-                continue
-            box = np.array(box)
+        if sside < self.min_size + 2:
+            return None
+        box = np.array(box)
 
-            box[:, 0] = np.clip(
-                np.round(box[:, 0] / width * dest_width), 0, dest_width)
-            box[:, 1] = np.clip(
-                np.round(box[:, 1] / height * dest_height), 0, dest_height)
-            boxes.append(box.astype("int32"))
-            scores.append(score)
-        return np.array(boxes, dtype="int32"), scores
+        box[:, 0] = np.clip(
+            np.round(box[:, 0] / width * dest_width), 0, dest_width)
+        box[:, 1] = np.clip(
+            np.round(box[:, 1] / height * dest_height), 0, dest_height)
+        return box.astype("int32"), score
+
+    def is_axis_aligned_rect(self, contour):
+        '''
+        whether the contour is a filled axis-aligned rectangle,
+        findContours with CHAIN_APPROX_SIMPLE gives its four corners
+        '''
+        if len(contour) != 4:
+            return False
+        points = contour.reshape(-1, 2)
+        return len(np.unique(points[:, 0])) == 2 and len(np.unique(points[:, 1])) == 2
+
+    def unclip_rect(self, contour, unclip_ratio):
+        '''
+        unclip of an axis-aligned rectangle without shapely and pyclipper:
+        the offset distance is area * ratio / perimeter and the mini box of
+        the rounded offset polygon is the rectangle expanded by it.
+        may differ from unclip by 1px on the map since pyclipper works on
+        integer coordinates
+        '''
+        points = contour.reshape(-1, 2)
+        x0, y0 = points.min(axis=0)
+        x1, y1 = points.max(axis=0)
+        rw, rh = x1 - x0, y1 - y0
+        distance = rw * rh * unclip_ratio / (2 * (rw + rh))
+        box = np.array([[x0 - distance, y0 - distance],
+                        [x1 + distance, y0 - distance],
+                        [x1 + distance, y1 + distance],
+                        [x0 - distance, y1 + distance]])
+        return box, min(rw, rh) + 2 * distance
 
     def unclip(self, box, unclip_ratio):
         poly = Polygon(box)
@@ -36,6 +36,7 @@ class TextDetector(PredictBase):
         postprocess_params["use_dilation"] = args.use_dilation
         postprocess_params["score_mode"] = args.det_db_score_mode
         postprocess_params["box_type"] = args.det_box_type
+        postprocess_params["use_rect_fast_path"] = args.det_db_rect_fast_path
 
         # 实例化预处理操作类
         self.preprocess_op = create_operators(pre_process_list)
@@ -34,6 +34,7 @@ class BaseRecLabelDecode(object):
         for i, char in enumerate(dict_character):
             self.dict[char] = i
         self.character = dict_character
+        self.character_array = np.array(dict_character, dtype=object)
 
     def pred_reverse(self, pred):
         pred_re = []
@@ -86,6 +87,49 @@ class BaseRecLabelDecode(object):
             result_list.append((text, np.mean(conf_list).tolist()))
         return result_list
 
+    def decode_batch(self, text_index, text_prob):
+        """
+        decode the argmax/max output of a whole batch with array operations.
+        duplicate removal, ignored token filtering and index-to-char mapping are
+        done once for the batch. the result is identical to
+        `decode(text_index, text_prob, is_remove_duplicate=True)`.
+        """
+        text_index = np.asarray(text_index)
+        text_prob = np.asarray(text_prob)
+        batch_size = text_index.shape[0]
+        if batch_size == 0:
+            return []
+
+        selection = np.ones(text_index.shape, dtype=bool)
+        selection[:, 1:] = np.diff(text_index, axis=1) != 0
+        for ignored_token in self.get_ignored_tokens():
+            selection &= text_index != ignored_token
+
+        cnt_list = selection.sum(axis=1)
+        end_list = np.cumsum(cnt_list).tolist()
+        start_list = [0] + end_list[:-1]
+        cnt_list = cnt_list.tolist()
+
+        # row-major boolean indexing keeps the tokens of each row together
+        char_list = self.character_array[text_index[selection]].tolist()
+        conf_array = text_prob[selection]
+
+        result_list = []
+        for batch_idx in range(batch_size):
+            start, end = start_list[batch_idx], end_list[batch_idx]
+            text = ''.join(char_list[start:end])
+            if self.reverse:  # for arabic rec
+                text = self.pred_reverse(text)
+
+            if cnt_list[batch_idx] == 0:
+                score = 0.0
+            else:
+                # summing each row on its own keeps the float32 rounding of np.mean.
+                # np.add.reduceat accumulates in a different order and can differ in the last bit
+                score = np.mean(conf_array[start:end]).tolist()
+            result_list.append((text, score))
+        return result_list
+
     def get_ignored_tokens(self):
         return [0]  # for ctc blank
 
@@ -105,7 +149,7 @@ class CTCLabelDecode(BaseRecLabelDecode):
         #     preds = preds.numpy()
         preds_idx = preds.argmax(axis=2)
         preds_prob = preds.max(axis=2)
-        text = self.decode(preds_idx, preds_prob, is_remove_duplicate=True)
+        text = self.decode_batch(preds_idx, preds_prob)
         if label is None:
             return text
         label = self.decode(label)
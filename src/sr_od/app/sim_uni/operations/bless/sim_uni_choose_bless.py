@@ -102,8 +102,9 @@ class SimUniChooseBless(SrOperation):
             self.ctx.controller.click(SimUniChooseBless.RESET_BTN.center)
             return self.round_wait('重置祝福', wait=1)
         else:
+            before = self.screenshot()
             self.ctx.controller.click(target_bless_pos.center)
-            time.sleep(0.25)
+            self.wait_until_changed(before, timeout=0.25, stable_diff_threshold=2)  # 等待祝福被选中 背景有粒子特效
             if self.before_level_start:
                 confirm_point = SimUniChooseBless.CONFIRM_BEFORE_LEVEL_BTN.center
             else:
@@ -1,5 +1,3 @@
-import time
-
 from typing import Optional, List, ClassVar
 
 from one_dragon.base.matcher.match_result import MatchResult
@@ -75,8 +73,9 @@ class SimUniDropBless(SrOperation):
 
         bless_list = [bless.data for bless in bless_pos_list]
         target_idx: int = bless_utils.get_bless_by_priority(bless_list, self.config, can_reset=False, asc=False)
+        before = self.screenshot()
         self.ctx.controller.click(bless_pos_list[target_idx].center)
-        time.sleep(0.25)
+        self.wait_until_changed(before, timeout=0.25, stable_diff_threshold=2)  # 等待祝福被选中 背景有粒子特效
         self.ctx.controller.click(SimUniChooseBless.CONFIRM_BTN.center)
         return self.round_success(wait=1)
 
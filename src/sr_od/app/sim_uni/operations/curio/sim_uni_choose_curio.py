@@ -1,5 +1,3 @@
-import time
-
 from cv2.typing import MatLike
 from typing import Optional, ClassVar, List
 
@@ -89,8 +87,9 @@ class SimUniChooseCurio(SrOperation):
             return self.round_retry('未识别到奇物', wait=1)
 
         target_curio_pos: Optional[MatchResult] = self._get_curio_to_choose(curio_pos_list)
+        before = self.screenshot()
         self.ctx.controller.click(target_curio_pos.center)
-        time.sleep(0.25)
+        self.wait_until_changed(before, timeout=0.25, stable_diff_threshold=2)  # 等待奇物被选中 背景有粒子特效
         self.ctx.controller.click(SimUniChooseCurio.CONFIRM_BTN.center)
         return self.round_success(wait=0.1)
 
@@ -277,8 +276,9 @@ class SimUniDropCurio(SrOperation):
             return self.round_retry('未识别到奇物', wait=1)
 
         target_curio_pos: Optional[MatchResult] = self._get_curio_to_choose(curio_pos_list)
+        before = self.screenshot()
         self.ctx.controller.click(target_curio_pos.center)
-        time.sleep(0.25)
+        self.wait_until_changed(before, timeout=0.25, stable_diff_threshold=2)  # 等待奇物被选中 背景有粒子特效
         self.ctx.controller.click(SimUniChooseCurio.CONFIRM_BTN.center)
         return self.round_success(wait=1)
 
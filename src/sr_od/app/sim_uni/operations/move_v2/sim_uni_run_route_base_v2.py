@@ -1,5 +1,3 @@
-import time
-
 from cv2.typing import MatLike
 from typing import ClassVar, Optional
 
@@ -160,8 +158,11 @@ class SimUniRunRouteBaseV2(SrOperation):
         # 由于攻击之后 人物可能朝反方向了 因此要转动多一点
         # 不要被360整除 否则转一圈之后还是被人物覆盖了看不到
         angle = 35 * self.turn_direction_when_nothing
+        before = self.screenshot()
         self.ctx.controller.turn_by_angle(angle)
-        time.sleep(0.5)
+        # 转动前的画面作为基准 画面开始变化后再等稳定 否则可能在转动生效前就认为稳定了
+        # 3D场景有待机动作和特效 阈值要调大 一直没有变化时等满原来固定的时间
+        self.wait_until_changed(before, timeout=0.5, diff_threshold=5, stable_diff_threshold=5)
 
         if self.nothing_times % 11 == 0:
             # 识别不到内容太多次 判断楼层类型是否有问题
@@ -182,9 +183,10 @@ class SimUniRunRouteBaseV2(SrOperation):
         """
         if self.ctx.detect_info.view_down:
             return
+        before = self.screenshot()
         self.ctx.controller.turn_down(25)
         self.ctx.detect_info.view_down = True
-        time.sleep(0.2)
+        self.wait_until_changed(before, timeout=0.2, diff_threshold=5, stable_diff_threshold=5)  # 等待视角转动完成
 
     def _view_up(self):
         """
@@ -193,9 +195,10 @@ class SimUniRunRouteBaseV2(SrOperation):
         """
         if not self.ctx.detect_info.view_down:
             return
+        before = self.screenshot()
         self.ctx.controller.turn_down(-25)
         self.ctx.detect_info.view_down = False
-        time.sleep(0.2)
+        self.wait_until_changed(before, timeout=0.2, diff_threshold=5, stable_diff_threshold=5)  # 等待视角转动完成
 
     def after_detect_timeout(self) -> OperationRoundResult:
         """
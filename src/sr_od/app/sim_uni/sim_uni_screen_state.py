@@ -1,9 +1,13 @@
+import cv2
+import numpy as np
 from cv2.typing import MatLike
 from enum import Enum
-from typing import Optional, List
+from functools import lru_cache
+from typing import Optional, List, ClassVar, Tuple, Callable
 
 from one_dragon.base.matcher.match_result import MatchResult
 from one_dragon.base.screen import screen_utils
+from one_dragon.base.screen.template_info import TemplateInfo
 from one_dragon.base.screen.screen_utils import FindAreaResultEnum
 from one_dragon.utils import cv2_utils, str_utils
 from one_dragon.utils.i18_utils import gt
@@ -52,6 +56,121 @@ def get_level_type(ctx: SrContext, screen: MatLike) -> Optional[SimUniLevelType]
         return level_type_list[target_idx]
 
 
+class SimUniScreenClassifier:
+
+    # 标题需要匹配的画面 按判断的优先级排列 (画面状态, LCS阈值)
+    TITLE_TARGET_LIST: ClassVar[List[Tuple[str, Optional[float]]]] = [
+        (ScreenState.SIM_TYPE_NORMAL.value, 0.51),
+        (ScreenState.SIM_BLESS.value, 0.51),
+        (ScreenState.SIM_DROP_BLESS.value, 0.51),
+        (ScreenState.SIM_UPGRADE_BLESS.value, 0.51),
+        (ScreenState.SIM_CURIOS.value, 0.51),
+        (ScreenState.SIM_DROP_CURIOS.value, 0.51),
+        (ScreenState.SIM_EVENT.value, None),
+    ]
+
+    def __init__(self,
+                 in_world: bool = False,
+                 empty_to_close: bool = False,
+                 bless: bool = False,
+                 drop_bless: bool = False,
+                 upgrade_bless: bool = False,
+                 curio: bool = False,
+                 drop_curio: bool = False,
+                 event: bool = False,
+                 battle: bool = False,
+                 battle_fail: bool = False,
+                 reward: bool = False,
+                 fast_recover: bool = False,
+                 express_supply: bool = False,
+                 sim_uni: bool = False):
+        """
+        模拟宇宙画面状态的分类器 参数含义同 get_sim_uni_screen_state
+        创建时整理好需要判断的画面 判断时左上角标题只OCR一次 再逐个匹配
+        """
+        self.battle: bool = battle
+
+        # 不依赖标题的画面 按优先级排列
+        self.area_check_list: List[Tuple[str, Callable[[SrContext, MatLike], bool]]] = []
+        if in_world:
+            self.area_check_list.append((ScreenState.NORMAL_IN_WORLD.value, common_screen_state.is_normal_in_world))
+        if battle_fail:
+            self.area_check_list.append((battle_screen_state.ScreenState.BATTLE_FAIL.value,
+                                         battle_screen_state.is_battle_fail))
+        if empty_to_close:
+            self.area_check_list.append((ScreenState.EMPTY_TO_CLOSE.value, is_empty_to_close))
+        if reward:
+            self.area_check_list.append((ScreenState.SIM_REWARD.value, is_sim_uni_get_reward))
+        if fast_recover:
+            self.area_check_list.append((fast_recover_screen_state.ScreenState.FAST_RECOVER.value,
+                                         fast_recover_screen_state.is_fast_recover))
+        if express_supply:
+            self.area_check_list.append((common_screen_state.ScreenState.EXPRESS_SUPPLY.value,
+                                         common_screen_state.is_express_supply))
+
+        # 依赖标题的画面
+        title_flag_list = [sim_uni, bless, drop_bless, upgrade_bless, curio, drop_curio, event]
+        self.title_target_list: List[Tuple[str, Optional[float]]] = [
+            target for target, flag in zip(SimUniScreenClassifier.TITLE_TARGET_LIST, title_flag_list) if flag
+        ]
+
+    def classify(self, ctx: SrContext, screen: MatLike) -> Optional[str]:
+        """
+        判断画面状态
+        :param ctx: 上下文
+        :param screen: 游戏画面
+        :return:
+        """
+        for state, check in self.area_check_list:
+            if check(ctx, screen):
+                return state
+
+        titles = get_sim_uni_titles(ctx, screen)
+
+        # 不知道是不是游戏bug 游戏内正常的模拟宇宙也会显示 黄金与机械
+        if (match_title(ScreenState.SIM_TYPE_NORMAL.value, titles)
+                or match_title(ScreenState.SIM_TYPE_GOLD.value, titles)):
+            for state, lcs_percent in self.title_target_list:
+                if match_title(state, titles, lcs_percent):
+                    return state
+
+        if self.battle:  # 有判断的时候 不在前面的情况 就认为是战斗
+            return battle_screen_state.ScreenState.BATTLE.value
+
+        return None
+
+
+def get_sim_uni_titles(ctx: SrContext, screen: MatLike) -> List[str]:
+    """
+    模拟宇宙画面左上角的标题 同一张画面只OCR一次
+    :param ctx: 上下文
+    :param screen: 游戏画面
+    :return:
+    """
+    return common_screen_state.get_ui_titles(ctx, screen, '模拟宇宙', '左上角标题')
+
+
+def match_title(title_cn: str, titles: List[str], lcs_percent: Optional[float] = None) -> bool:
+    """
+    识别到的标题中 是否有符合的
+    :param title_cn: 中文标题
+    :param titles: 识别到的标题
+    :param lcs_percent: LCS阈值 以识别到的标题长度计算
+    :return:
+    """
+    return str_utils.find_best_match_by_lcs(title_cn, titles, lcs_percent_threshold=lcs_percent) is not None
+
+
+@lru_cache
+def get_sim_uni_screen_classifier(**kwargs) -> SimUniScreenClassifier:
+    """
+    同样的判断条件 共用一个分类器
+    :param kwargs: 参数含义同 get_sim_uni_screen_state
+    :return:
+    """
+    return SimUniScreenClassifier(**kwargs)
+
+
 def get_sim_uni_screen_state(
         ctx: SrContext, screen: MatLike,
         in_world: bool = False,
@@ -89,58 +208,14 @@ def get_sim_uni_screen_state(
     :param sim_uni: 2.3版本新增 宇宙开始时选择祝福显示的是 模拟宇宙
     :return:
     """
-    if in_world and common_screen_state.is_normal_in_world(ctx, screen):
-        return ScreenState.NORMAL_IN_WORLD.value
-
-    if battle_fail and battle_screen_state.is_battle_fail(ctx, screen):
-        return battle_screen_state.ScreenState.BATTLE_FAIL.value
-
-    if empty_to_close and is_empty_to_close(ctx, screen):
-        return ScreenState.EMPTY_TO_CLOSE.value
-
-    if reward and is_sim_uni_get_reward(ctx, screen):
-        return ScreenState.SIM_REWARD.value
-
-    if fast_recover and fast_recover_screen_state.is_fast_recover(ctx, screen):
-        return fast_recover_screen_state.ScreenState.FAST_RECOVER.value
-
-    if express_supply and common_screen_state.is_express_supply(ctx, screen):
-        return common_screen_state.ScreenState.EXPRESS_SUPPLY.value
-
-    titles = common_screen_state.get_ui_titles(ctx, screen, '模拟宇宙', '左上角标题')
-    sim_uni_idx = str_utils.find_best_match_by_lcs(ScreenState.SIM_TYPE_NORMAL.value, titles)
-    gold_idx = str_utils.find_best_match_by_lcs(ScreenState.SIM_TYPE_GOLD.value, titles)  # 不知道是不是游戏bug 游戏内正常的模拟宇宙也会显示这个
-
-    if sim_uni_idx is None and gold_idx is None:
-        if battle:  # 有判断的时候 不在前面的情况 就认为是战斗
-            return battle_screen_state.ScreenState.BATTLE.value
-        return None
-
-    if sim_uni and str_utils.find_best_match_by_lcs(ScreenState.SIM_TYPE_NORMAL.value, titles, lcs_percent_threshold=0.51) is not None:
-        return ScreenState.SIM_TYPE_NORMAL.value
-
-    if bless and str_utils.find_best_match_by_lcs(ScreenState.SIM_BLESS.value, titles, lcs_percent_threshold=0.51) is not None:
-        return ScreenState.SIM_BLESS.value
-
-    if drop_bless and str_utils.find_best_match_by_lcs(ScreenState.SIM_DROP_BLESS.value, titles, lcs_percent_threshold=0.51) is not None:
-        return ScreenState.SIM_DROP_BLESS.value
-
-    if upgrade_bless and str_utils.find_best_match_by_lcs(ScreenState.SIM_UPGRADE_BLESS.value, titles, lcs_percent_threshold=0.51) is not None:
-        return ScreenState.SIM_UPGRADE_BLESS.value
-
-    if curio and str_utils.find_best_match_by_lcs(ScreenState.SIM_CURIOS.value, titles, lcs_percent_threshold=0.51):
-        return ScreenState.SIM_CURIOS.value
-
-    if drop_curio and str_utils.find_best_match_by_lcs(ScreenState.SIM_DROP_CURIOS.value, titles, lcs_percent_threshold=0.51):
-        return ScreenState.SIM_DROP_CURIOS.value
-
-    if event and str_utils.find_best_match_by_lcs(ScreenState.SIM_EVENT.value, titles):
-        return ScreenState.SIM_EVENT.value
-
-    if battle:  # 有判断的时候 不在前面的情况 就认为是战斗
-        return battle_screen_state.ScreenState.BATTLE.value
-
-    return None
+    classifier = get_sim_uni_screen_classifier(
+        in_world=in_world, empty_to_close=empty_to_close,
+        bless=bless, drop_bless=drop_bless, upgrade_bless=upgrade_bless,
+        curio=curio, drop_curio=drop_curio, event=event,
+        battle=battle, battle_fail=battle_fail, reward=reward,
+        fast_recover=fast_recover, express_supply=express_supply, sim_uni=sim_uni
+    )
+    return classifier.classify(ctx, screen)
 
 
 def is_empty_to_close(ctx: SrContext, screen: MatLike) -> bool:
@@ -210,12 +285,12 @@ def get_sim_uni_initial_screen_state(ctx: SrContext, screen: MatLike) -> Optiona
     if common_screen_state.in_secondary_ui(ctx, screen, '星际和平指南'):
         return ScreenState.GUIDE.value
 
-    titles = common_screen_state.get_ui_titles(ctx, screen, '模拟宇宙', '左上角标题')
+    titles = get_sim_uni_titles(ctx, screen)
 
-    if str_utils.find_best_match_by_lcs(ScreenState.SIM_TYPE_EXTEND.value, titles, lcs_percent_threshold=0.5) is not None:
+    if match_title(ScreenState.SIM_TYPE_EXTEND.value, titles, 0.5):
         return ScreenState.SIM_TYPE_EXTEND.value
 
-    if str_utils.find_best_match_by_lcs(ScreenState.SIM_TYPE_NORMAL.value, titles, lcs_percent_threshold=0.5) is not None:
+    if match_title(ScreenState.SIM_TYPE_NORMAL.value, titles, 0.5):
         return ScreenState.SIM_TYPE_NORMAL.value
 
     return None
@@ -245,33 +320,102 @@ def in_sim_uni_choose_path(ctx: SrContext, screen: MatLike) -> bool:
     return in_sim_uni_secondary_ui(ctx, screen, ScreenState.SIM_PATH.value)
 
 
-def match_next_level_entry(ctx: SrContext, screen: MatLike, knn_distance_percent: float=0.7) -> List[MatchResult]:
+class _NextLevelEntryFeatures:
+
+    def __init__(self, template_list: List[Optional[TemplateInfo]]):
+        """
+        各种下层入口图标的特征 合并成一个描述子矩阵 一次匹配全部图标
+        :param template_list: 按 SimUniLevelTypeEnum 顺序的图标模板 不存在的为空
+        """
+        self.level_type_list: List[SimUniLevelType] = []
+        self.kps_list: List[List[cv2.KeyPoint]] = []
+        self.offset_list: List[int] = []  # 每个图标的第一个描述子在合并矩阵中的下标
+        self.size_list: List[Tuple[int, int]] = []  # 每个图标的 (宽, 高)
+
+        desc_list: List[np.ndarray] = []
+        offset = 0
+        for enum, template in zip(SimUniLevelTypeEnum, template_list):
+            level_type: SimUniLevelType = enum.value
+            if template is None:
+                continue
+            kps, desc = template.features
+            if kps is None or desc is None or len(kps) == 0:
+                continue
+            self.level_type_list.append(level_type)
+            self.kps_list.append(kps)
+            self.offset_list.append(offset)
+            self.size_list.append((template.raw.shape[1], template.raw.shape[0]))
+            desc_list.append(desc)
+            offset += len(kps)
+
+        self.desc: Optional[np.ndarray] = np.vstack(desc_list) if len(desc_list) > 0 else None
+
+
+def get_next_level_entry_features(ctx: SrContext) -> _NextLevelEntryFeatures:
+    """
+    下层入口图标的特征 缓存在模板加载器中 模板重新加载后重新计算
+    :param ctx: 上下文
+    :return:
+    """
+    return ctx.template_loader.get_derived(
+        'sim_uni_next_level_entry',
+        [('sim_uni', enum.value.template_id) for enum in SimUniLevelTypeEnum],
+        _NextLevelEntryFeatures
+    )
+
+
+def match_next_level_entry(ctx: SrContext, screen: MatLike, knn_distance_percent: float = 0.7,
+                           scale: float = 1) -> List[MatchResult]:
     """
     获取当前画面中的下一层入口
+    只在入口图标可能出现的区域内提取特征
     MatchResult.data 是对应的类型 SimUniLevelType
     :param ctx: 上下文
     :param screen: 游戏画面
     :param knn_distance_percent: 越小要求匹配程度越高
+    :param scale: 提取特征前的缩放比例 小于1时更快 但较远的图标可能识别不到 还没有用录制的画面验证过 目前都不缩放
     :return:
     """
-    source_kps, source_desc = cv2_utils.feature_detect_and_compute(screen)
+    features = get_next_level_entry_features(ctx)
+    if features.desc is None:
+        return []
 
-    result_list: List[MatchResult] = []
+    # 入口图标浮在传送门上方 转动视角时可能出现在任意横向位置 所以区域保留全宽
+    # 上下边界是按界面布局保守估计的 只去掉了顶部(0~80)和底部(860~1080)的固定界面元素 不是统计实际图标位置得到的
+    # 之后可以用画面录制统计图标出现的纵向范围 再收窄这个区域
+    area = ctx.screen_loader.get_area('模拟宇宙', '下层入口图标')
+    part = screen if area is None else cv2_utils.crop_image_only(screen, area.rect)
+    if scale != 1:
+        part = cv2.resize(part, (int(part.shape[1] * scale), int(part.shape[0] * scale)), interpolation=cv2.INTER_AREA)
 
-    for enum in SimUniLevelTypeEnum:
-        level_type: SimUniLevelType = enum.value
-        template = ctx.template_loader.get_template('sim_uni', level_type.template_id)
-        kps, desc = template.features
+    source_kps, source_desc = cv2_utils.feature_detect_and_compute(part)
+    if source_desc is None or len(source_kps) == 0:
+        return []
 
-        result = cv2_utils.feature_match_for_one(
-            source_kps, source_desc, kps, desc,
-            template_width=template.raw.shape[1], template_height=template.raw.shape[0],
-            knn_distance_percent=knn_distance_percent
+    all_matches = cv2.BFMatcher().knnMatch(features.desc, source_desc, k=2)
+
+    result_list: List[MatchResult] = []
+    for idx, level_type in enumerate(features.level_type_list):
+        kps = features.kps_list[idx]
+        offset = features.offset_list[idx]
+        width, height = features.size_list[idx]
+
+        result = cv2_utils.feature_match_for_one_by_knn(
+            all_matches[offset:offset + len(kps)], source_kps, kps,
+            template_width=width, template_height=height,
+            knn_distance_percent=knn_distance_percent,
+            query_offset=offset
         )
 
         if result is None:
             continue
 
+        if scale != 1:
+            result = MatchResult(result.confidence, result.x / scale, result.y / scale,
+                                 result.w / scale, result.h / scale, result.template_scale / scale)
+        if area is not None:
+            result.add_offset(area.left_top)
+
         log.info('图标识别到入口 %s', level_type.type_name)
         result.data = level_type
         result_list.append(result)
@@ -188,7 +188,7 @@ class TreasuresLightwardRunRecord(AppRunRecord):
         :return:
         """
         schedule['total_star'] = total_star
-        self.save()
+        self.save_later()
 
     def update_mission_star(self, schedule: TreasuresLightwardScheduleRecord, mission_num: int, star: int):
         """
@@ -200,7 +200,7 @@ class TreasuresLightwardRunRecord(AppRunRecord):
         """
         stars = schedule['mission_star']
         stars[mission_num] = star
-        self.save()
+        self.save_later()
 
     def get_latest_total_star(self, schedule_type: TreasuresLightwardTypeEnum):
         """
@@ -1,7 +1,6 @@
-import copy
 import time
 from enum import Enum
-from typing import List, Set, Optional, Any
+from typing import List, Set, Optional, Any, ClassVar
 
 from basic.i18_utils import gt
 from basic.log_utils import log
@@ -394,10 +393,11 @@ class TreasuresLightwardNodeTeam:
 
 class TreasuresLightwardNodeTeamScore:
 
-    def __init__(self, node_team: TreasuresLightwardNodeTeam, combat_type_list: List[CharacterCombatType]):
+    def __init__(self, character_list: List[TreasuresLightwardTeamModuleItem],
+                 combat_type_list: List[CharacterCombatType]):
         """
         节点配队得分模型
-        :param node_team: 节点配队
+        :param character_list: 节点配队的角色
         :param combat_type_list: 节点需要的属性
         """
 
@@ -443,22 +443,24 @@ class TreasuresLightwardNodeTeamScore:
         self.total_score: float = 0
         """总得分"""
 
-        cal_combat_type_list = self._cal_need_combat_type(node_team, combat_type_list)
+        cal_combat_type_list = self._cal_need_combat_type(character_list, combat_type_list)
 
-        self._cal_character_cnt(node_team, combat_type_list, cal_combat_type_list)
+        self._cal_character_cnt(character_list, combat_type_list, cal_combat_type_list)
         self._cal_total_score()
 
     def _cal_need_combat_type(self,
-                              node_team: TreasuresLightwardNodeTeam,
+                              character_list: List[TreasuresLightwardTeamModuleItem],
                               need_combat_type_list: List[CharacterCombatType]):
         """
         计算在配队中真正需要的属性列表
+        :param character_list: 节点配队的角色
         :param need_combat_type_list: 原来需要的属性列表
         :return: 由配队调整后的属性列表
         """
-        if node_team.with_silver:  # 有银狼的情况 可以添加弱点
+        with_silver = any(c.character_id == SILVERWOLF.id for c in character_list)
+        if with_silver:  # 有银狼的情况 可以添加弱点
             team_combat_type_not_in_need: Set[CharacterCombatType] = set()
-            for c in node_team.merge_team_module.character_list:
+            for c in character_list:
                 if c.character.combat_type not in need_combat_type_list:
                     team_combat_type_not_in_need.add(c.character.combat_type)
             self.combat_type_not_need_cnt = len(team_combat_type_not_in_need)
@@ -472,16 +474,16 @@ class TreasuresLightwardNodeTeamScore:
             return need_combat_type_list
 
     def _cal_character_cnt(self,
-                           node_team: TreasuresLightwardNodeTeam,
+                           character_list: List[TreasuresLightwardTeamModuleItem],
                            origin_combat_type_list: List[CharacterCombatType],
                            cal_combat_type_list: List[CharacterCombatType]):
         """
         统计各种角色的数量
-        :param node_team: 节点的配队
+        :param character_list: 节点配队的角色
         :param cal_combat_type_list: 节点需要的属性
         :return:
         """
-        for item in node_team.merge_team_module.character_list:
+        for item in character_list:
             if item.is_attack:
                 self.attack_cnt += 1
                 if item.character.combat_type in origin_combat_type_list:
@@ -670,7 +672,8 @@ class TreasuresLightwardMissionTeam:
             return
 
         for i in range(len(self.node_combat_types)):
-            node = TreasuresLightwardNodeTeamScore(self.node_team_list[i], self.node_combat_types[i])
+            node = TreasuresLightwardNodeTeamScore(self.node_team_list[i].merge_team_module.character_list,
+                                                   self.node_combat_types[i])
             self.cnt_score += node.cnt_score
             self.attack_score += node.attack_score
             self.survival_score += node.survival_score
@@ -685,104 +688,221 @@ class TreasuresLightwardMissionTeam:
                       )
 
 
-@record_performance
-def search_best_mission_team(
-        node_combat_types: List[List[CharacterCombatType]],
-        config_module_list: List[TreasuresLightwardTeamModule]) -> Optional[List[List[Character]]]:
-    """
-    穷举配队组合
-    :param node_combat_types: 节点对应属性
-    :param config_module_list: 配队模块列表
-    :return: 配队组合
-    """
-    total_node_cnt: int = len(node_combat_types)
-    best_mission_team: Optional[TreasuresLightwardMissionTeam] = None
+class TreasuresLightwardTeamSearcher:
 
-    # 先排序 保证可以按阶段搜索
-    sorted_config_module_list = sorted(config_module_list, key=lambda x: x.module_node_phase)
+    # 得分模型中各项的基数 用于估算得分上限
+    CNT_BASE: ClassVar[float] = 1e8
+    ATTACK_MAX: ClassVar[float] = 1e7 + 1e6
+    SURVIVAL_MAX: ClassVar[float] = 1e5
+    SUPPORT_BASE: ClassVar[float] = 1e4
+    COMBAT_TYPE_BASE: ClassVar[float] = 1e3
 
-    def impossibly_greater(current_mission_team: TreasuresLightwardMissionTeam) -> bool:
+    def __init__(self,
+                 node_combat_types: List[List[CharacterCombatType]],
+                 config_module_list: List[TreasuresLightwardTeamModule]):
         """
-        当前配队是否不可能比之前最好的记录更好了
-        :param current_mission_team: 当前配队
+        配队搜索 分支定界
+        每个节点的得分在加入模块时增量计算 并按角色集合缓存
+        当前配队的得分上限不超过已找到的最佳配队时 不再往下搜索
+        最佳配队只记录每个模块分配到的节点
+        :param node_combat_types: 节点对应属性
+        :param config_module_list: 配队模块列表
+        """
+        self.node_combat_types: List[List[CharacterCombatType]] = node_combat_types
+        self.total_node_cnt: int = len(node_combat_types)
+
+        # 先排序 保证可以按阶段搜索
+        self.module_list: List[TreasuresLightwardTeamModule] = sorted(config_module_list,
+                                                                      key=lambda x: x.module_node_phase)
+        self.module_cnt: int = len(self.module_list)
+
+        # 角色(ID+类型)对应一个二进制位 得分只与这两者有关
+        item_bit_map: dict[tuple[str, str], int] = {}
+        self.item_list: List[TreasuresLightwardTeamModuleItem] = []
+        # 角色ID对应一个二进制位 用于判断角色是否重复
+        character_bit_map: dict[str, int] = {}
+
+        self.module_item_mask: List[int] = []
+        self.module_character_mask: List[int] = []
+        self.module_character_cnt: List[int] = []
+        self.module_phase: List[int] = []
+        for module in self.module_list:
+            item_mask = 0
+            character_mask = 0
+            for item in module.character_list:
+                item_key = (item.character_id, item.character_type.name)
+                if item_key not in item_bit_map:
+                    item_bit_map[item_key] = len(self.item_list)
+                    self.item_list.append(item)
+                item_mask |= 1 << item_bit_map[item_key]
+
+                if item.character_id not in character_bit_map:
+                    character_bit_map[item.character_id] = len(character_bit_map)
+                character_mask |= 1 << character_bit_map[item.character_id]
+            self.module_item_mask.append(item_mask)
+            self.module_character_mask.append(character_mask)
+            self.module_character_cnt.append(len(module.character_list))
+            self.module_phase.append(module.module_node_phase)
+
+        # 剩余模块最多还能提供的角色数量 以及是否还能提供输出位、生存位
+        self.suffix_character_cnt: List[int] = [0] * (self.module_cnt + 1)
+        self.suffix_with_attack: List[bool] = [False] * (self.module_cnt + 1)
+        self.suffix_with_survival: List[bool] = [False] * (self.module_cnt + 1)
+        for i in range(self.module_cnt - 1, -1, -1):
+            module = self.module_list[i]
+            self.suffix_character_cnt[i] = self.suffix_character_cnt[i + 1] + self.module_character_cnt[i]
+            self.suffix_with_attack[i] = self.suffix_with_attack[i + 1] or module.with_attack
+            self.suffix_with_survival[i] = self.suffix_with_survival[i + 1] or module.with_survival
+
+        self._score_cache: dict[tuple[int, int], TreasuresLightwardNodeTeamScore] = {}
+
+        # 搜索状态
+        self.node_item_mask: List[int] = [0] * self.total_node_cnt
+        self.node_character_cnt: List[int] = [0] * self.total_node_cnt
+        self.node_phase: List[int] = [0] * self.total_node_cnt
+        self.node_score: List[Optional[TreasuresLightwardNodeTeamScore]] = [None] * self.total_node_cnt
+        self.used_character_mask: int = 0
+        self.assignment: List[int] = [-1] * self.module_cnt
+
+        self.best_score: Optional[float] = None
+        self.best_assignment: Optional[List[int]] = None
+        """最佳配队 每个模块分配到的节点 -1为不使用"""
+
+    def get_node_score(self, node_idx: int, item_mask: int) -> TreasuresLightwardNodeTeamScore:
+        """
+        节点配队的得分 按角色集合缓存
+        :param node_idx: 节点下标
+        :param item_mask: 节点配队的角色集合
         :return:
         """
-        if not current_mission_team.valid_mission_team:  # 未完成配队
-            return False
+        key = (node_idx, item_mask)
+        score = self._score_cache.get(key)
+        if score is None:
+            character_list = [item for bit, item in enumerate(self.item_list) if item_mask >> bit & 1]
+            score = TreasuresLightwardNodeTeamScore(character_list, self.node_combat_types[node_idx])
+            self._score_cache[key] = score
+        return score
 
-        if best_mission_team is None:  # 暂时没有最佳配队
-            return False
+    def upper_bound(self, module_idx: int) -> float:
+        """
+        当前配队继续搜索下去 最多可能达到的得分
+        加入角色可能令银狼转化的属性分降低 所以不使用当前得分 而是按各项的上限估算
+        :param module_idx: 下一个考虑的模块下标
+        :return:
+        """
+        current_cnt = 0
+        free_cnt = 0
+        bound = 0
+        for node_idx in range(self.total_node_cnt):
+            current_cnt += self.node_character_cnt[node_idx]
+            free_cnt += 4 - self.node_character_cnt[node_idx]
+            score = self.node_score[node_idx]
+            if score is not None:
+                bound += score.support_cnt * TreasuresLightwardTeamSearcher.SUPPORT_BASE
 
-        current_mission_team.update_score()
-        all_node_after_attack_and_silver: bool = True  # 所有节点都选过输出和银狼了
-        all_node_after_survival: bool = True  # 所有节点都选过生存位了
-        for i in range(total_node_cnt):
-            node_team = current_mission_team.node_team_list[i]
-            if node_team.node_dfs_phase <= 1:
-                all_node_after_attack_and_silver = False
-            if node_team.node_dfs_phase <= 2:
-                all_node_after_survival = False
-
-        if all_node_after_attack_and_silver and current_mission_team.attack_score < best_mission_team.attack_score:
-            # 选完输出位和银狼 攻击分还落后 就不可能更好
-            return True
-        elif all_node_after_survival:
-            if current_mission_team.survival_score < best_mission_team.survival_score:
-                # 选完生存位 生存分还落后 就不可能更好 生存分只有一种
-                return True
-            elif current_mission_team.support_score + (8 - current_mission_team.character_cnt) * 1e4 < best_mission_team.support_score:
-                # 选完生存位 生存分一样 辅助分不可能跟上
-                return True
-            elif current_mission_team.support_score + (8 - current_mission_team.character_cnt) * 1e4 == best_mission_team.support_score:
-                # 选完生存位 生存分一样 辅助分有可能一样
-                if current_mission_team.combat_type_score + (8 - current_mission_team.character_cnt) * 1e3 < best_mission_team.combat_type_score:
-                    # 选完生存位 生存分一样 辅助分有可能一样 但属性分不可能跟上
-                    return True
+            if self.suffix_with_attack[module_idx] or (score is not None and score.attack_cnt > 0):
+                bound += TreasuresLightwardTeamSearcher.ATTACK_MAX
+            if self.suffix_with_survival[module_idx] or (score is not None and score.survival_cnt > 0):
+                bound += TreasuresLightwardTeamSearcher.SURVIVAL_MAX
 
-        return False
+        extra_cnt = min(free_cnt, self.suffix_character_cnt[module_idx])
+        bound += (current_cnt + extra_cnt) * (TreasuresLightwardTeamSearcher.CNT_BASE
+                                              + TreasuresLightwardTeamSearcher.COMBAT_TYPE_BASE)
+        bound += extra_cnt * TreasuresLightwardTeamSearcher.SUPPORT_BASE
+        return bound
 
-    def dfs(current_mission_team: TreasuresLightwardMissionTeam,
-            current_module_idx: int):
+    def search(self) -> Optional[List[int]]:
+        """
+        搜索最佳配队
+        :return: 每个模块分配到的节点 -1为不使用
         """
-        递归遍历配队组合 这里只会先按节点数量选出队伍 后续再由评分模型判断哪个队伍去哪个节点
-        :param current_mission_team: 当前的配队
-        :param current_module_idx: 当前使用的模块下标
+        self._dfs(0)
+        return self.best_assignment
+
+    def _dfs(self, module_idx: int) -> None:
+        """
+        递归遍历配队组合 遍历顺序与原来的穷举一致 得分相同时保留先找到的
+        :param module_idx: 当前使用的模块下标
         :return:
         """
-        if current_module_idx == len(sorted_config_module_list):
-            if current_mission_team.valid_mission_team:
-                current_mission_team.update_score()
-                nonlocal best_mission_team
-                if best_mission_team is None or current_mission_team.total_score > best_mission_team.total_score:
-                    best_mission_team = copy.deepcopy(current_mission_team)
+        if module_idx == self.module_cnt:
+            if any(cnt == 0 for cnt in self.node_character_cnt):  # 所有节点都有至少一个角色才合法
+                return
+            total_score = sum(score.total_score for score in self.node_score)
+            if self.best_score is None or total_score > self.best_score:
+                self.best_score = total_score
+                self.best_assignment = list(self.assignment)
             return
 
-        if impossibly_greater(current_mission_team):
+        if self.best_score is not None and self.upper_bound(module_idx) <= self.best_score:
             return
 
-        module = sorted_config_module_list[current_module_idx]
-        next_node_phase = module.module_node_phase
-
-        for node_idx in range(total_node_cnt):  # 使用当前模块加入
-            node_team = current_mission_team.node_team_list[node_idx]
-            if next_node_phase >= node_team.node_dfs_phase:  # 可以加入当前节点
-                if current_mission_team.add_to_node(node_idx, module):  # 添加模块到当前节点
-                    temp_phase = node_team.node_dfs_phase
-                    node_team.node_dfs_phase = next_node_phase
+        next_node_phase = self.module_phase[module_idx]
+        item_mask = self.module_item_mask[module_idx]
+        character_mask = self.module_character_mask[module_idx]
+        character_cnt = self.module_character_cnt[module_idx]
+
+        if (self.used_character_mask & character_mask) == 0:
+            for node_idx in range(self.total_node_cnt):  # 使用当前模块加入
+                if next_node_phase < self.node_phase[node_idx]:
+                    continue
+                if self.node_character_cnt[node_idx] + character_cnt > 4:  # 超过人数限制
+                    continue
+
+                temp_phase = self.node_phase[node_idx]
+                temp_item_mask = self.node_item_mask[node_idx]
+                temp_score = self.node_score[node_idx]
+
+                self.node_phase[node_idx] = next_node_phase
+                self.node_item_mask[node_idx] = temp_item_mask | item_mask
+                self.node_character_cnt[node_idx] += character_cnt
+                self.node_score[node_idx] = self.get_node_score(node_idx, self.node_item_mask[node_idx])
+                self.used_character_mask |= character_mask
+                self.assignment[module_idx] = node_idx
+
+                self._dfs(module_idx + 1)
+
+                self.node_phase[node_idx] = temp_phase
+                self.node_item_mask[node_idx] = temp_item_mask
+                self.node_character_cnt[node_idx] -= character_cnt
+                self.node_score[node_idx] = temp_score
+                self.used_character_mask &= ~character_mask
+                self.assignment[module_idx] = -1
 
-                    dfs(current_mission_team, current_module_idx + 1)
+        # 不使用当前模块加入
+        self._dfs(module_idx + 1)
 
-                    current_mission_team.pop_from_node(node_idx, module)  # 弹出模块
-                    node_team.node_dfs_phase = temp_phase
+    def to_mission_team(self, assignment: List[int]) -> TreasuresLightwardMissionTeam:
+        """
+        按模块分配的节点 还原关卡配队
+        :param assignment: 每个模块分配到的节点
+        :return:
+        """
+        mission_team = TreasuresLightwardMissionTeam(self.node_combat_types)
+        for module_idx, node_idx in enumerate(assignment):
+            if node_idx >= 0:
+                mission_team.add_to_node(node_idx, self.module_list[module_idx])
+        return mission_team
 
-        # 不使用当前模块加入
-        dfs(current_mission_team, current_module_idx + 1)
 
+@record_performance
+def search_best_mission_team(
+        node_combat_types: List[List[CharacterCombatType]],
+        config_module_list: List[TreasuresLightwardTeamModule]) -> Optional[List[List[Character]]]:
+    """
+    搜索最佳的配队组合
+    :param node_combat_types: 节点对应属性
+    :param config_module_list: 配队模块列表
+    :return: 配队组合
+    """
     start_time = time.time()
-    dfs(TreasuresLightwardMissionTeam(node_combat_types), 0)  # 搜索
+    searcher = TreasuresLightwardTeamSearcher(node_combat_types, config_module_list)
+    best_assignment = searcher.search()
     log.info('组合配队完成 耗时 %.2f秒', time.time() - start_time)
 
-    if best_mission_team is None:
+    if best_assignment is None:
         return None
-    else:
-        return best_mission_team.final_character_list
+
+    best_mission_team = searcher.to_mission_team(best_assignment)
+    best_mission_team.update_score()
+    return best_mission_team.final_character_list
@@ -20,7 +20,7 @@ class WorldPatrolRunRecord(AppRunRecord):
 
         self.update('finished', self.finished, False)
 
-        self.save()
+        self.save_later()
 
     def add_record(self, route_id: str, time_cost):
         self.finished.append(route_id)
@@ -34,7 +34,7 @@ class WorldPatrolRunRecord(AppRunRecord):
         self.update('dt', self.dt, False)
         self.update('finished', self.finished, False)
         self.update('time_cost', self.time_cost, False)
-        self.save()
+        self.save_later()
 
     def get_estimate_time(self, route_id: str):
         if route_id not in self.time_cost:
@@ -3,7 +3,7 @@ import time
 from typing import Optional, List
 
 from one_dragon.base.operation.one_dragon_context import OneDragonContext
-from one_dragon.utils import i18_utils
+from one_dragon.utils import i18_utils, yaml_utils
 from sr_od.app.assignments.assignments_run_record import AssignmentsRunRecord
 from sr_od.app.buy_xianzhou_parcel.buy_xianzhou_parcel_run_record import BuyXianZhouParcelRunRecord
 from sr_od.app.claim_email.email_run_record import EmailRunRecord
@@ -29,7 +29,8 @@ from sr_od.config.game_config import GameConfig
 from sr_od.config.yolo_config import YoloConfig
 from sr_od.context.context_pos_info import ContextPosInfo
 from sr_od.context.preheat_context import SrPreheatContext
-from sr_od.context.sr_pc_controller import SrPcController
+from sr_od.context.sr_controller_base import SrControllerBase
+from sr_od.context.sr_replay_controller import SrReplayController
 from sr_od.interastral_peace_guide.guide_data import SrGuideData
 from sr_od.screen_state.yolo_screen_detector import YoloScreenDetector
 from sr_od.sr_map.sr_map_data import SrMapData
@@ -131,12 +132,13 @@ class DetectInfo:
 
 class SrContext(OneDragonContext):
 
-    def __init__(self):
+    def __init__(self, listen_button: bool = True):
         """
+        :param listen_button: 是否监听键盘鼠标的快捷键 回放录制画面等没有界面的环境下不需要
         """
-        OneDragonContext.__init__(self)
+        OneDragonContext.__init__(self, listen_button=listen_button)
 
-        self.controller: Optional[SrPcController] = None
+        self.controller: Optional[SrControllerBase] = None
         self.is_pc: bool = True
         self.record_coordinate: bool = False  # 记录坐标
 
@@ -168,14 +170,18 @@ class SrContext(OneDragonContext):
         # 实例独有的配置
         self.load_instance_config()
 
+        # 启动时解析过的静态资源 保存缓存给下次启动使用
+        yaml_utils.save_asset_cache()
+
     def init_by_config(self) -> None:
         """
         根据配置进行初始化
         :return:
         """
-        OneDragonContext.init_by_config(self)
-        i18_utils.update_default_lang(self.game_config.lang)
+        self._init_by_config_without_controller()
 
+        # 只有PC上需要 延迟导入 没有界面的环境下导入 pyautogui 会失败
+        from sr_od.context.sr_pc_controller import SrPcController
         self.controller = SrPcController(
             game_config=self.game_config,
             win_title=self.game_config.win_title,
@@ -183,6 +189,30 @@ class SrContext(OneDragonContext):
             standard_height=self.project_config.screen_standard_height
         )
 
+    def _init_by_config_without_controller(self) -> None:
+        """
+        根据配置进行初始化 不包括控制器
+        :return:
+        """
+        OneDragonContext.init_by_config(self)
+        i18_utils.update_default_lang(self.game_config.lang)
+
+    def init_replay_controller(self, frame_source: str, advance_on_input: bool = False) -> None:
+        """
+        使用录制的画面代替游戏窗口 代替 init_by_config 调用 不会创建PC的控制器
+        :param frame_source: 画面来源 画面录制的会话文件夹、图片文件夹或者视频文件
+        :param advance_on_input: 有输入操作后才切换到下一帧
+        :return:
+        """
+        self._init_by_config_without_controller()
+        self.controller = SrReplayController(
+            game_config=self.game_config,
+            frame_source=frame_source,
+            advance_on_input=advance_on_input,
+            standard_width=self.project_config.screen_standard_width,
+            standard_height=self.project_config.screen_standard_height
+        )
+
     def load_instance_config(self) -> None:
         OneDragonContext.load_instance_config(self)
 
@@ -0,0 +1,48 @@
+from one_dragon.base.controller.replay_controller import ReplayController
+from sr_od.config.game_config import GameConfig
+from sr_od.context.sr_controller_base import SrControllerBase
+
+
+class SrReplayController(SrControllerBase, ReplayController):
+
+    def __init__(self, game_config: GameConfig,
+                 frame_source: str,
+                 advance_on_input: bool = False,
+                 loop: bool = False,
+                 standard_width: int = 1920,
+                 standard_height: int = 1080):
+        """
+        与 SrPcController 提供相同的方法 但画面来自录制 操作只做记录
+        移动相关的状态照常维护 不会真正等待
+        """
+        ReplayController.__init__(self,
+                                  frame_source=frame_source,
+                                  advance_on_input=advance_on_input,
+                                  loop=loop,
+                                  standard_width=standard_width,
+                                  standard_height=standard_height)
+        SrControllerBase.__init__(self, game_config)
+
+    def wait_input(self, seconds: float) -> None:
+        """
+        回放时不需要真正等待
+        :param seconds: 秒
+        :return:
+        """
+        pass
+
+    def turn_by_distance(self, d: float):
+        """
+        横向转向 按距离转
+        :param d: 正数往右转 人物角度增加；负数往左转 人物角度减少
+        :return:
+        """
+        self.record_action('turn', dx=int(d))
+
+    def turn_down(self, distance: float):
+        """
+        视角上下移动
+        :param distance: 正往下 负往上
+        :return:
+        """
+        self.record_action('turn', dy=int(distance * self.turn_dx))
@@ -0,0 +1,16 @@
+from sr_od.sr_map.sr_map_data import SrMapData
+
+
+def build_all_large_map_pack() -> None:
+    """
+    将每个星球的大地图打包成一个文件
+    大地图有更新后需要重新运行 过时的图片会自动改为读取原文件
+    :return:
+    """
+    map_data = SrMapData()
+    for planet in map_data.planet_list:
+        map_data.build_large_map_pack(planet)
+
+
+if __name__ == '__main__':
+    build_all_large_map_pack()
@@ -0,0 +1,285 @@
+import json
+import os
+import re
+import time
+from typing import List, Optional, Callable
+
+import numpy as np
+
+from one_dragon.base.geometry.point import Point
+from one_dragon.base.matcher.match_result import MatchResult
+from one_dragon.base.screen.template_loader import TemplateLoader
+from one_dragon.utils import os_utils, cv2_utils, yaml_utils, cal_utils
+from one_dragon.utils.log_utils import log
+from sr_od.operations.move import cal_pos_utils
+from sr_od.operations.move.cal_pos_utils import VerifyPosInfo
+from sr_od.sr_map import large_map_utils, mini_map_utils
+from sr_od.sr_map.large_map_info import LargeMapInfo
+from sr_od.sr_map.mini_map_info import MiniMapInfo
+from sr_od.sr_map.sr_map_data import SrMapData
+from sr_od.sr_map.sr_map_def import Region
+
+
+class BenchmarkContext:
+
+    def __init__(self):
+        """
+        计算坐标只需要用到地图数据和模板 不需要启动游戏
+        """
+        self.map_data: SrMapData = SrMapData()
+        self.template_loader: TemplateLoader = TemplateLoader()
+
+
+class CalPosCase:
+
+    def __init__(self, case_dir: str, region: Region, mm, verify: VerifyPosInfo,
+                 expected_pos: Optional[Point] = None):
+        """
+        一个坐标计算的样例
+        :param case_dir: 样例文件夹
+        :param region: 所属区域
+        :param mm: 小地图图片
+        :param verify: 验证信息
+        :param expected_pos: 正确的坐标 人工整理的样例才有
+        """
+        self.case_dir: str = case_dir
+        self.region: Region = region
+        self.mm = mm
+        self.verify: VerifyPosInfo = verify
+        self.expected_pos: Optional[Point] = expected_pos
+
+
+def get_fail_case_dir() -> str:
+    """
+    移动中计算坐标失败时 保存的样例
+    :return:
+    """
+    return os.path.join(os_utils.get_work_dir(), '.debug', 'cal_pos_fail')
+
+
+def get_curated_case_dir() -> str:
+    """
+    人工整理的样例 在 verify.yml 中额外记录 expected_pos 即正确的坐标
+    :return:
+    """
+    return os.path.join(os_utils.get_work_dir(), 'assets', 'cal_pos_case')
+
+
+def parse_point(value) -> Optional[Point]:
+    """
+    解析 verify.yml 中的坐标 格式为 (x, y)
+    :param value:
+    :return:
+    """
+    if value is None:
+        return None
+    match = re.match(r'\(\s*(-?\d+)\s*,\s*(-?\d+)\s*\)', str(value))
+    if match is None:
+        return None
+    return Point(int(match.group(1)), int(match.group(2)))
+
+
+def load_case_list(map_data: SrMapData, case_dir_list: List[str]) -> List[CalPosCase]:
+    """
+    读取样例 文件夹结构为 <区域prl_id>/<样例>/mm.png + verify.yml
+    :param map_data: 地图数据
+    :param case_dir_list: 样例根目录
+    :return:
+    """
+    region_map: dict[str, Region] = {r.prl_id: r for r in map_data.region_list}
+    case_list: List[CalPosCase] = []
+    for root_dir in case_dir_list:
+        if not os.path.isdir(root_dir):
+            continue
+        for prl_id in sorted(os.listdir(root_dir)):
+            region = region_map.get(prl_id)
+            region_dir = os.path.join(root_dir, prl_id)
+            if region is None or not os.path.isdir(region_dir):
+                continue
+            for case_name in sorted(os.listdir(region_dir)):
+                case_dir = os.path.join(region_dir, case_name)
+                mm_path = os.path.join(case_dir, 'mm.png')
+                verify_path = os.path.join(case_dir, 'verify.yml')
+                if not os.path.exists(mm_path) or not os.path.exists(verify_path):
+                    continue
+
+                data = yaml_utils.load_file(verify_path) or {}
+                verify = VerifyPosInfo(
+                    last_pos=parse_point(data.get('last_pos')),
+                    max_distance=data.get('max_distance'),
+                    line_p1=parse_point(data.get('line_p1')),
+                    line_p2=parse_point(data.get('line_p2')),
+                )
+                if verify.last_pos is None or verify.max_distance is None:
+                    continue
+
+                case_list.append(CalPosCase(case_dir, region, cv2_utils.read_image(mm_path), verify,
+                                            expected_pos=parse_point(data.get('expected_pos'))))
+
+    return case_list
+
+
+def get_method_map(ctx: BenchmarkContext, sim_uni: bool) -> dict[str, Callable]:
+    """
+    需要测试的定位方法 包括完整流程和单个方法
+    :param ctx: 上下文
+    :param sim_uni: 是否模拟宇宙的定位
+    :return: 名称 -> 方法(lm_info, mm_info, lm_rect, verify)
+    """
+    if sim_uni:
+        return {
+            'sim_uni': lambda lm_info, mm_info, lm_rect, verify: cal_pos_utils.sim_uni_cal_pos(
+                ctx, lm_info, mm_info, lm_rect=lm_rect, running=True, verify=verify),
+            'sim_uni_gray': lambda lm_info, mm_info, lm_rect, verify: cal_pos_utils.sim_uni_cal_pos_by_gray(
+                ctx, lm_info, mm_info, lm_rect=lm_rect,
+                scale_list=cal_pos_utils.get_mini_map_scale_list(True)),
+            'sim_uni_raw': lambda lm_info, mm_info, lm_rect, verify: cal_pos_utils.sim_uni_cal_pos_by_raw(
+                ctx, lm_info, mm_info, lm_rect=lm_rect,
+                scale_list=cal_pos_utils.get_mini_map_scale_list(True)),
+        }
+
+    return {
+        'sequential': lambda lm_info, mm_info, lm_rect, verify: cal_pos_utils.cal_character_pos(
+            ctx, lm_info, mm_info, lm_rect=lm_rect, running=True, verify=verify),
+        'speculative': lambda lm_info, mm_info, lm_rect, verify: cal_pos_utils.cal_character_pos(
+            ctx, lm_info, mm_info, lm_rect=lm_rect, running=True, verify=verify, speculative=True),
+        'road_mask': lambda lm_info, mm_info, lm_rect, verify: cal_pos_utils.cal_character_pos_by_road_mask(
+            ctx, lm_info, mm_info, lm_rect=lm_rect,
+            scale_list=cal_pos_utils.get_mini_map_scale_list(True)),
+        'sp': lambda lm_info, mm_info, lm_rect, verify: cal_pos_utils.cal_character_pos_by_sp_result(
+            ctx, lm_info, mm_info, lm_rect=lm_rect),
+        'gray': lambda lm_info, mm_info, lm_rect, verify: cal_pos_utils.cal_character_pos_by_gray(
+            ctx, lm_info, mm_info, lm_rect=lm_rect,
+            scale_list=cal_pos_utils.get_mini_map_scale_list(True)),
+        'raw': lambda lm_info, mm_info, lm_rect, verify: cal_pos_utils.cal_character_pos_by_raw(
+            ctx, lm_info, mm_info, lm_rect=lm_rect,
+            scale_list=cal_pos_utils.get_mini_map_scale_list(True)),
+    }
+
+
+def _percentile_ms(seconds_list: List[float], q: float) -> float:
+    if len(seconds_list) == 0:
+        return 0
+    return round(float(np.percentile(seconds_list, q)) * 1000, 2)
+
+
+def _summary(seconds_list: List[float]) -> dict:
+    return {
+        'p50_ms': _percentile_ms(seconds_list, 50),
+        'p95_ms': _percentile_ms(seconds_list, 95),
+    }
+
+
+def run_benchmark(case_dir_list: Optional[List[str]] = None,
+                  sim_uni: bool = False,
+                  repeat: int = 3,
+                  accurate_distance: float = 5) -> dict:
+    """
+    使用保存的样例 离线测试计算坐标的效果和耗时
+    :param case_dir_list: 样例根目录 默认使用失败样例和人工整理的样例
+    :param sim_uni: 是否测试模拟宇宙的定位
+    :param repeat: 每个样例重复次数 用于统计耗时
+    :param accurate_distance: 与正确坐标的距离在这个范围内认为是准确的
+    :return: 报告
+    """
+    if case_dir_list is None:
+        case_dir_list = [get_fail_case_dir(), get_curated_case_dir()]
+
+    ctx = BenchmarkContext()
+    case_list = load_case_list(ctx.map_data, case_dir_list)
+    log.info('读取样例 %d 个', len(case_list))
+
+    method_map = get_method_map(ctx, sim_uni)
+    lm_info_map: dict[str, LargeMapInfo] = {}
+    stage_seconds: dict[str, List[float]] = {'analyse_mini_map': [], 'get_large_map_rect': []}
+    method_stat: dict[str, dict] = {
+        name: {'seconds': [], 'found': 0, 'with_expected': 0, 'accurate': 0}
+        for name in method_map
+    }
+    case_report_list: List[dict] = []
+
+    for case in case_list:
+        # 大地图读取不计入耗时
+        if case.region.prl_id not in lm_info_map:
+            lm_info_map[case.region.prl_id] = ctx.map_data.get_large_map_info(case.region)
+        lm_info = lm_info_map[case.region.prl_id]
+        if lm_info.raw is None:
+            log.warning('样例 %s 缺少大地图 跳过', case.case_dir)
+            continue
+
+        t = time.perf_counter()
+        possible_pos = (case.verify.last_pos.x, case.verify.last_pos.y, case.verify.max_distance)
+        lm_rect = large_map_utils.get_large_map_rect_by_pos(lm_info.gray.shape, case.mm.shape[:2], possible_pos)
+        stage_seconds['get_large_map_rect'].append(time.perf_counter() - t)
+
+        case_report = {'case': case.case_dir, 'region': case.region.prl_id, 'result': {}}
+        for name, method in method_map.items():
+            stat = method_stat[name]
+            result: Optional[MatchResult] = None
+            for _ in range(max(repeat, 1)):
+                t = time.perf_counter()
+                mm_info: MiniMapInfo = mini_map_utils.analyse_mini_map(case.mm)  # 每次都重新分析 避免复用中间结果
+                stage_seconds['analyse_mini_map'].append(time.perf_counter() - t)
+
+                t = time.perf_counter()
+                try:
+                    result = method(lm_info, mm_info, lm_rect, case.verify)
+                except Exception:
+                    log.error('样例 %s 定位方法 %s 出错', case.case_dir, name, exc_info=True)
+                    result = None
+                stat['seconds'].append(time.perf_counter() - t)
+
+            pos = None if result is None else result.center
+            if pos is not None:
+                stat['found'] += 1
+            if case.expected_pos is not None:
+                stat['with_expected'] += 1
+                if pos is not None and cal_utils.distance_between(pos, case.expected_pos) <= accurate_distance:
+                    stat['accurate'] += 1
+            case_report['result'][name] = None if pos is None else [pos.x, pos.y]
+
+        case_report_list.append(case_report)
+
+    report = {
+        'case_cnt': len(case_report_list),
+        'sim_uni': sim_uni,
+        'repeat': repeat,
+        'method': {},
+        'stage': {name: _summary(seconds_list) for name, seconds_list in stage_seconds.items()},
+        'case': case_report_list,
+    }
+    for name, stat in method_stat.items():
+        item = {
+            'found': stat['found'],
+            'found_rate': stat['found'] / len(case_report_list) if len(case_report_list) > 0 else 0,
+            'with_expected': stat['with_expected'],
+            'accurate': stat['accurate'],
+            'accuracy': stat['accurate'] / stat['with_expected'] if stat['with_expected'] > 0 else None,
+        }
+        item.update(_summary(stat['seconds']))
+        report['method'][name] = item
+    report['strategy_stat'] = cal_pos_utils.cal_pos_strategy_stat.summary()
+
+    return report
+
+
+def save_report(report: dict, file_path: Optional[str] = None) -> str:
+    """
+    保存报告
+    :param report: 报告
+    :param file_path: 文件路径 默认保存在 .debug 下
+    :return: 文件路径
+    """
+    if file_path is None:
+        file_path = os.path.join(os_utils.get_path_under_work_dir('.debug'),
+                                 'cal_pos_benchmark_%s.json' % os_utils.now_timestamp_str())
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    return file_path
+
+
+if __name__ == '__main__':
+    _report = run_benchmark()
+    _path = save_report(_report)
+    print(json.dumps(_report['method'], ensure_ascii=False, indent=2))
+    print(_path)
@@ -0,0 +1,116 @@
+import argparse
+import importlib
+import json
+import os
+import time
+from typing import Callable, Optional
+
+from one_dragon.base.operation.operation import Operation
+from one_dragon.base.operation.operation_profiler import operation_profiler
+from one_dragon.utils import os_utils
+from one_dragon.utils.log_utils import log
+from sr_od.context.sr_context import SrContext
+from sr_od.context.sr_replay_controller import SrReplayController
+
+
+def load_operation_class(class_path: str) -> type:
+    """
+    按路径加载指令类
+    :param class_path: 模块路径.类名 例如 sr_od.app.sim_uni.operations.sim_uni_event.SimUniEvent
+    :return: 指令类
+    """
+    module_name, class_name = class_path.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def create_replay_context(frame_source: str, advance_on_input: bool = False) -> SrContext:
+    """
+    创建使用录制画面的上下文 不需要游戏窗口 也不监听键盘鼠标 OCR模型同步加载 不计入指令耗时
+    :param frame_source: 画面来源 画面录制的会话文件夹、图片文件夹或者视频文件
+    :param advance_on_input: 有输入操作后才切换到下一帧
+    :return: 上下文
+    """
+    ctx = SrContext(listen_button=False)
+    ctx.init_replay_controller(frame_source, advance_on_input=advance_on_input)
+    ctx.ocr.init_model()
+    return ctx
+
+
+def run_replay(op_factory: Callable[[SrContext], Operation],
+               frame_source: str,
+               advance_on_input: bool = False,
+               profile: bool = True) -> dict:
+    """
+    使用录制的画面运行一个指令 画面播放完时结束运行
+    :param op_factory: 根据上下文创建指令 需要额外初始化上下文的 也在这里处理
+    :param frame_source: 画面来源 画面录制的会话文件夹、图片文件夹或者视频文件
+    :param advance_on_input: 有输入操作后才切换到下一帧
+    :param profile: 是否统计指令耗时
+    :return: 报告
+    """
+    ctx = create_replay_context(frame_source, advance_on_input=advance_on_input)
+    controller: SrReplayController = ctx.controller
+    controller.on_finished = ctx.stop_running
+
+    operation_profiler.enabled = profile
+    operation_profiler.clear()
+
+    op = op_factory(ctx)
+    ctx.start_running()
+    t = time.perf_counter()
+    try:
+        op_result = op.execute()
+    finally:
+        seconds = time.perf_counter() - t
+        ctx.stop_running()
+        controller.close()
+
+    return {
+        'frame_source': frame_source,
+        'operation': type(op).__name__,
+        'success': op_result.success,
+        'status': op_result.status,
+        'seconds': seconds,
+        'frame_cnt': controller.frame_idx + 1,
+        'replay_finished': controller.is_finished,
+        'action_cnt': len(controller.action_list),
+        'actions': controller.export_action_list(),
+        'profile': operation_profiler.summary() if profile else None,
+    }
+
+
+def save_report(report: dict, file_path: Optional[str] = None) -> str:
+    """
+    保存报告 有耗时统计时 同时导出火焰图使用的折叠格式
+    :param report: 报告
+    :param file_path: 文件路径 默认保存在 .debug 下
+    :return: 文件路径
+    """
+    if file_path is None:
+        file_path = os.path.join(os_utils.get_path_under_work_dir('.debug'),
+                                 'replay_%s_%s.json' % (report['operation'], os_utils.now_timestamp_str()))
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    if report['profile'] is not None:
+        with open('%s.folded' % os.path.splitext(file_path)[0], 'w', encoding='utf-8') as file:
+            file.write('\n'.join(operation_profiler.folded_lines()))
+    return file_path
+
+
+if __name__ == '__main__':
+    _parser = argparse.ArgumentParser(description='使用录制的画面运行指令 指令只能有上下文一个参数')
+    _parser.add_argument('frame_source', help='画面录制的会话文件夹、图片文件夹或者视频文件')
+    _parser.add_argument('operation', help='模块路径.类名')
+    _parser.add_argument('--advance-on-input', action='store_true', help='有输入操作后才切换到下一帧')
+    _parser.add_argument('--no-profile', action='store_true', help='不统计指令耗时')
+    _args = _parser.parse_args()
+
+    _op_class = load_operation_class(_args.operation)
+    _report = run_replay(_op_class, _args.frame_source,
+                         advance_on_input=_args.advance_on_input,
+                         profile=not _args.no_profile)
+    _path = save_report(_report)
+    log.info('%s 成功 %s 状态 %s 帧数 %d 输入 %d 耗时 %.2fs',
+             _report['operation'], _report['success'], _report['status'],
+             _report['frame_cnt'], _report['action_cnt'], _report['seconds'])
+    print(_path)
@@ -1,5 +1,3 @@
-import time
-
 from cv2.typing import MatLike
 
 from one_dragon.base.geometry.point import Point
@@ -38,8 +36,9 @@ class ClickPhoneMenuItem(SrOperation):
             return self.round_retry(wait=0.5)
         else:
             log.info('菜单中找到 %s 尝试点击', self.item.cn)
+            before = self.screenshot()
             r = self.ctx.controller.click(result.center)
-            time.sleep(0.5)
+            self.wait_until_changed(before, timeout=0.5, stable_diff_threshold=2)  # 等待进入菜单对应的画面 部分画面有3D背景
             if r:
                 return self.round_success()
             else:
@@ -1,4 +1,6 @@
 import math
+import threading
+import time
 from concurrent.futures import Future
 
 import concurrent.futures
@@ -6,7 +8,7 @@ import cv2
 import numpy as np
 import os
 from cv2.typing import MatLike
-from typing import List, Optional, Tuple
+from typing import List, Optional, Tuple, Callable
 
 from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
@@ -20,6 +22,11 @@ from sr_od.sr_map.mini_map_info import MiniMapInfo
 from sr_od.sr_map.sr_map_def import Region
 
 cal_pos_executor = concurrent.futures.ThreadPoolExecutor(thread_name_prefix='sr_od_cal_pos')
+# 各种定位方法内部会使用 cal_pos_executor 并行匹配不同缩放比例 并等待结果
+# 同时运行多种定位方法时 需要使用另外的线程池 避免互相等待占满线程
+cal_pos_strategy_executor = concurrent.futures.ThreadPoolExecutor(thread_name_prefix='sr_od_cal_pos_strategy',
+                                                                  max_workers=4)
+SPECULATIVE_HEDGE_SECONDS: float = 0.1  # 同时运行定位方法时 前面的方法超过这个时间还没有结果 就开始下一个方法
 
 
 def get_mini_map_scale_list(running: bool, real_move_time: float = 0):
@@ -107,13 +114,193 @@ def similar_result(result_list: List[MatchResult], least_result_cnt: int = 2) ->
     return None
 
 
+class CalPosStrategyStat:
+
+    def __init__(self):
+        """
+        各种定位方法的耗时和被采用次数统计
+        """
+        self._lock = threading.Lock()
+        self._stat: dict[str, dict[str, float]] = {}
+
+    def _get_stat(self, name: str) -> dict[str, float]:
+        """
+        获取一个定位方法的统计 需要在锁内调用
+        :param name: 定位方法
+        :return:
+        """
+        stat = self._stat.get(name)
+        if stat is None:
+            stat = {'run_cnt': 0, 'win_cnt': 0, 'total_seconds': 0, 'max_seconds': 0}
+            self._stat[name] = stat
+        return stat
+
+    def record_run(self, name: str, seconds: float) -> None:
+        """
+        记录一次定位方法的运行
+        :param name: 定位方法
+        :param seconds: 耗时
+        :return:
+        """
+        with self._lock:
+            stat = self._get_stat(name)
+            stat['run_cnt'] += 1
+            stat['total_seconds'] += seconds
+            stat['max_seconds'] = max(stat['max_seconds'], seconds)
+
+    def record_win(self, name: str) -> None:
+        """
+        记录一次定位方法的结果被采用
+        :param name: 定位方法
+        :return:
+        """
+        with self._lock:
+            self._get_stat(name)['win_cnt'] += 1
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """
+        :return: 定位方法 -> 运行次数、被采用次数、采用率、平均耗时、最大耗时
+        """
+        with self._lock:
+            result = {}
+            for name, stat in self._stat.items():
+                run_cnt = stat['run_cnt']
+                result[name] = {
+                    'run_cnt': run_cnt,
+                    'win_cnt': stat['win_cnt'],
+                    'win_rate': stat['win_cnt'] / run_cnt if run_cnt > 0 else 0,
+                    'avg_seconds': stat['total_seconds'] / run_cnt if run_cnt > 0 else 0,
+                    'max_seconds': stat['max_seconds'],
+                }
+            return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stat.clear()
+
+
+cal_pos_strategy_stat: CalPosStrategyStat = CalPosStrategyStat()
+"""全局的定位方法统计"""
+
+
+class CalPosStrategy:
+
+    def __init__(self, name: str,
+                 cal: Callable[[Optional[threading.Event]], Optional[MatchResult]],
+                 is_valid: Callable[[Optional[MatchResult]], bool]):
+        """
+        一种定位方法
+        :param name: 名称 用于统计
+        :param cal: 计算坐标 入参为取消标记 在各步骤之间判断 被设置后尽快返回
+        :param is_valid: 判断结果是否可以直接采用
+        """
+        self.name: str = name
+        self.cal: Callable[[Optional[threading.Event]], Optional[MatchResult]] = cal
+        self.is_valid: Callable[[Optional[MatchResult]], bool] = is_valid
+
+    def run(self, cancel_event: Optional[threading.Event] = None) -> Tuple[Optional[MatchResult], bool]:
+        """
+        运行并记录耗时 被取消的不记录
+        :param cancel_event: 取消标记
+        :return: 结果, 是否可以直接采用
+        """
+        start_time = time.time()
+        result = self.cal(cancel_event)
+        if cancel_event is not None and cancel_event.is_set():
+            return None, False
+        valid = self.is_valid(result)
+        cal_pos_strategy_stat.record_run(self.name, time.time() - start_time)
+        return result, valid
+
+
+def is_valid_sp_result(result: Optional[MatchResult]) -> bool:
+    """
+    特殊点定位的结果是否合理
+    :param result: 特殊点定位结果
+    :return:
+    """
+    if result is None:
+        return False
+    if result.template_scale > 1.3 or result.template_scale < 0.9:  # 不应该有这样的缩放 放弃这个结果
+        log.debug('特殊点定位使用的缩放比例不符合预期')
+        return False
+    return True
+
+
+def run_strategy_sequentially(strategy_list: List[CalPosStrategy]) -> Tuple[Optional[MatchResult], List[Optional[MatchResult]]]:
+    """
+    按顺序运行定位方法 直到有可以采用的结果
+    :param strategy_list: 定位方法
+    :return: 采用的结果, 全部方法的结果
+    """
+    result_list: List[Optional[MatchResult]] = []
+    for strategy in strategy_list:
+        result, valid = strategy.run()
+        result_list.append(result)
+        if valid:
+            cal_pos_strategy_stat.record_win(strategy.name)
+            return result, result_list
+
+    return None, result_list
+
+
+def run_strategy_speculatively(strategy_list: List[CalPosStrategy],
+                               hedge_seconds: float = SPECULATIVE_HEDGE_SECONDS) -> Tuple[Optional[MatchResult], List[Optional[MatchResult]]]:
+    """
+    按顺序启动定位方法 排在前面的是开销小的
+    前面的方法没有可以采用的结果 或者超过 hedge_seconds 还没有结果时 才启动下一个方法 多个方法同时运行
+    有一个可以采用的结果时就马上返回 并通知其它正在运行的方法尽快结束
+    :param strategy_list: 定位方法
+    :param hedge_seconds: 等待多久没有结果后 启动下一个方法
+    :return: 采用的结果, 全部方法的结果 未完成的为空
+    """
+    cancel_event = threading.Event()
+    future_list: List[Future] = []
+    result_list: List[Optional[MatchResult]] = [None] * len(strategy_list)
+    not_done = set()
+    target: Optional[MatchResult] = None
+    while target is None:
+        if len(future_list) < len(strategy_list):
+            future = cal_pos_strategy_executor.submit(strategy_list[len(future_list)].run, cancel_event)
+            future_list.append(future)
+            not_done.add(future)
+            timeout = hedge_seconds if len(future_list) < len(strategy_list) else None
+        elif len(not_done) > 0:
+            timeout = None
+        else:
+            break
+
+        done, not_done = concurrent.futures.wait(not_done, timeout=timeout,
+                                                 return_when=concurrent.futures.FIRST_COMPLETED)
+        # 同时完成时 优先采用排在前面的方法
+        for idx, future in enumerate(future_list):
+            if future not in done:
+                continue
+            try:
+                result, valid = future.result()
+            except Exception:
+                log.error('定位方法 %s 出错', strategy_list[idx].name, exc_info=True)
+                continue
+            result_list[idx] = result
+            if valid and target is None:
+                target = result
+                cal_pos_strategy_stat.record_win(strategy_list[idx].name)
+
+    cancel_event.set()  # 已开始的方法在下一个步骤前结束
+    for future in not_done:
+        future.cancel()
+
+    return target, result_list
+
+
 def cal_character_pos(ctx: SrContext,
                       lm_info: LargeMapInfo, mm_info: MiniMapInfo,
                       lm_rect: Rect = None, show: bool = False,
                       retry_without_rect: bool = False,
                       running: bool = False,
                       real_move_time: float = 0,
-                      verify: Optional[VerifyPosInfo] = None) -> Optional[MatchResult]:
+                      verify: Optional[VerifyPosInfo] = None,
+                      speculative: bool = False) -> Optional[MatchResult]:
     """
     根据小地图 匹配大地图 判断当前的坐标
     :param ctx: 上下文
@@ -125,42 +312,47 @@ def cal_character_pos(ctx: SrContext,
     :param running: 角色是否在移动 移动时候小地图会缩小
     :param real_move_time: 真实移动时间
     :param verify: 校验结果需要的信息
+    :param speculative: 是否提前启动后面的定位方法 采用最先得到的合理结果 用于移动中降低延迟
     :return:
     """
-    # 匹配结果 是缩放后的 offset 和宽高
-    result: Optional[MatchResult] = None
-
     scale_list = get_mini_map_scale_list(running, real_move_time)
-    r1 = None
-    r2 = None
-    r3 = None
-    r4 = None
-
-    if result is None:  # 使用模板匹配 用道路掩码的
-        r1 = cal_character_pos_by_road_mask(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show)
-        if is_valid_result(r1, verify):
-            result = r1
-
-    if result is None:  # 看看有没有特殊点 使用特殊点倒推位置
-        r2 = cal_character_pos_by_sp_result(ctx, lm_info, mm_info, lm_rect=lm_rect)
-        if r2 is not None and (r2.template_scale > 1.3 or r2.template_scale < 0.9):  # 不应该有这样的缩放 放弃这个结果
-            log.debug('特殊点定位使用的缩放比例不符合预期')
-            pass
-        else:
-            result = r2
 
-    if result is None:  # 使用模板匹配 用灰度图的
-        r3 = cal_character_pos_by_gray(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show)
-        if is_valid_result(r3, verify):
-            result = r3
+    strategy_list: List[CalPosStrategy] = [
+        # 使用模板匹配 用道路掩码的
+        CalPosStrategy('road_mask',
+                       lambda c: cal_character_pos_by_road_mask(ctx, lm_info, mm_info, lm_rect=lm_rect,
+                                                                scale_list=scale_list, show=show,
+                                                                cancel_event=c),
+                       lambda r: is_valid_result(r, verify)),
+        # 看看有没有特殊点 使用特殊点倒推位置
+        CalPosStrategy('sp',
+                       lambda c: cal_character_pos_by_sp_result(ctx, lm_info, mm_info, lm_rect=lm_rect,
+                                                                cancel_event=c),
+                       is_valid_sp_result),
+        # 使用模板匹配 用灰度图的
+        CalPosStrategy('gray',
+                       lambda c: cal_character_pos_by_gray(ctx, lm_info, mm_info, lm_rect=lm_rect,
+                                                           scale_list=scale_list, show=show,
+                                                           cancel_event=c),
+                       lambda r: is_valid_result(r, verify)),
+        # 使用模板匹配 用原图的
+        CalPosStrategy('raw',
+                       lambda c: cal_character_pos_by_raw(ctx, lm_info, mm_info, lm_rect=lm_rect,
+                                                          scale_list=scale_list, show=show,
+                                                          cancel_event=c),
+                       lambda r: is_valid_result(r, verify)),
+    ]
 
-    if result is None:  # 使用模板匹配 用原图的
-        r4 = cal_character_pos_by_raw(ctx, lm_info, mm_info, lm_rect=lm_rect, scale_list=scale_list, show=show)
-        if is_valid_result(r4, verify):
-            result = r4
+    # 匹配结果 是缩放后的 offset 和宽高
+    if speculative and not show:
+        # 道路掩码会被多个方法使用 先在当前线程初始化好 避免多个线程同时初始化
+        mini_map_utils.init_road_mask_for_world_patrol(mm_info, another_floor=lm_info.region.another_floor)
+        result, result_list = run_strategy_speculatively(strategy_list)
+    else:
+        result, result_list = run_strategy_sequentially(strategy_list)
 
     if result is None:
-        result = similar_result([r1, r2, r3, r4])
+        result = similar_result(result_list)
 
     if result is None:
         if lm_rect is not None and retry_without_rect:  # 整张大地图试试
@@ -184,7 +376,8 @@ def cal_character_pos_by_gray(ctx: SrContext,
                               lm_info: LargeMapInfo, mm_info: MiniMapInfo,
                               lm_rect: Rect = None,
                               scale_list: List[float] = None,
-                              show: bool = False) -> Optional[MatchResult]:
+                              show: bool = False,
+                              cancel_event: Optional[threading.Event] = None) -> Optional[MatchResult]:
     """
     使用模板匹配 在大地图上匹配小地图的位置 会对小地图进行缩放尝试
     使用灰度图进行匹配
@@ -194,6 +387,7 @@ def cal_character_pos_by_gray(ctx: SrContext,
     :param lm_rect: 圈定的大地图区域 传入后更准确
     :param scale_list: 缩放比例
     :param show: 是否显示调试结果
+    :param cancel_event: 取消标记 被设置后不再匹配剩下的缩放比例
     :return:
     """
     source, lm_rect = cv2_utils.crop_image(lm_info.raw, lm_rect)
@@ -206,7 +400,8 @@ def cal_character_pos_by_gray(ctx: SrContext,
     template_mask = mm_info.road_mask_with_edge
 
     target: MatchResult = template_match_with_scale_list_parallely(ctx, source, template, template_mask,
-                                                                   scale_list, 0.3)
+                                                                   scale_list, 0.3,
+                                                                   cancel_event=cancel_event)
 
     if show:
         scale = target.template_scale if target is not None else 1
@@ -231,7 +426,8 @@ def cal_character_pos_by_raw(ctx: SrContext,
                              lm_rect: Rect = None,
                              show: bool = False,
                              scale_list: List[float] = None,
-                             match_threshold: float = 0.3) -> Optional[MatchResult]:
+                             match_threshold: float = 0.3,
+                             cancel_event: Optional[threading.Event] = None) -> Optional[MatchResult]:
     """
     使用模板匹配 在大地图上匹配小地图的位置 会对小地图进行缩放尝试
     使用小地图原图 - 需要到这一步 说明背景比较杂乱 因此道路掩码只使用中心点包含的连通块
@@ -242,6 +438,7 @@ def cal_character_pos_by_raw(ctx: SrContext,
     :param show: 是否显示调试结果
     :param scale_list: 缩放比例
     :param match_threshold: 模板匹配的阈值
+    :param cancel_event: 取消标记 被设置后不再匹配剩下的缩放比例
     :return:
     """
     source, lm_rect = cv2_utils.crop_image(lm_info.raw, lm_rect)
@@ -251,7 +448,8 @@ def cal_character_pos_by_raw(ctx: SrContext,
     template_mask = mm_info.road_mask_with_edge
 
     target: MatchResult = template_match_with_scale_list_parallely(ctx, source, template, template_mask,
-                                                                   scale_list, match_threshold)
+                                                                   scale_list, match_threshold,
+                                                                   cancel_event=cancel_event)
 
     if show:
         scale = target.template_scale if target is not None else 1
@@ -273,19 +471,25 @@ def cal_character_pos_by_raw(ctx: SrContext,
 
 def cal_character_pos_by_sp_result(ctx: SrContext,
                                    lm_info: LargeMapInfo, mm_info: MiniMapInfo,
-                                   lm_rect: Rect = None) -> Optional[MatchResult]:
+                                   lm_rect: Rect = None,
+                                   cancel_event: Optional[threading.Event] = None) -> Optional[MatchResult]:
     """
     根据特殊点 计算小地图在大地图上的位置
     :param ctx: 上下文
     :param lm_info: 大地图信息
     :param mm_info: 小地图信息
     :param lm_rect: 圈定的大地图区域 传入后更准确
+    :param cancel_event: 取消标记 被设置后不再计算
     :return:
     """
     lm_sp_map = ctx.map_data.get_sp_type_in_rect(lm_info.region, lm_rect)
     if len(lm_sp_map) == 0:
         return None
+    if cancel_event is not None and cancel_event.is_set():
+        return None
     mini_map_utils.init_sp_mask_by_feature_match(ctx, mm_info, set(lm_sp_map.keys()))
+    if cancel_event is not None and cancel_event.is_set():
+        return None
 
     mm_height, mm_width = mm_info.raw.shape[:2]
 
@@ -346,7 +550,8 @@ def cal_character_pos_by_road_mask(ctx: SrContext,
                                    lm_info: LargeMapInfo, mm_info: MiniMapInfo,
                                    lm_rect: Rect = None,
                                    show: bool = False,
-                                   scale_list: List[float] = None) -> Optional[MatchResult]:
+                                   scale_list: List[float] = None,
+                                   cancel_event: Optional[threading.Event] = None) -> Optional[MatchResult]:
     """
     使用模板匹配 在大地图上匹配小地图的位置 会对小地图进行缩放尝试
     使用处理过后的道路掩码图
@@ -356,6 +561,7 @@ def cal_character_pos_by_road_mask(ctx: SrContext,
     :param lm_rect: 圈定的大地图区域 传入后更准确
     :param show: 是否显示调试结果
     :param scale_list: 缩放比例
+    :param cancel_event: 取消标记 被设置后不再匹配剩下的缩放比例
     :return:
     """
     source, lm_rect = cv2_utils.crop_image(lm_info.mask, lm_rect)
@@ -366,7 +572,8 @@ def cal_character_pos_by_road_mask(ctx: SrContext,
 
     target: MatchResult = template_match_with_scale_list_parallely(ctx, source, template, template_mask,
                                                                    scale_list,
-                                                                   0.4)
+                                                                   0.4,
+                                                                   cancel_event=cancel_event)
 
     if show:
         scale = target.template_scale if target is not None else 1
@@ -396,7 +603,8 @@ def merge_road_mask(road_mask, edge_mask):
 def template_match_with_scale_list_parallely(ctx: SrContext,
                                              source: MatLike, template: MatLike, template_mask: MatLike,
                                              scale_list: List[float],
-                                             threshold: float) -> MatchResult:
+                                             threshold: float,
+                                             cancel_event: Optional[threading.Event] = None) -> MatchResult:
     """
     按一定缩放比例进行模板匹配，并行处理不同的缩放比例，返回置信度最高的结果
     :param ctx: 上下文
@@ -405,16 +613,22 @@ def template_match_with_scale_list_parallely(ctx: SrContext,
     :param template_mask: 模板掩码
     :param scale_list: 模板的缩放比例
     :param threshold: 匹配阈值
+    :param cancel_event: 取消标记 被设置后 还没开始的缩放比例不再匹配 并返回空
     :return: 置信度最高的结果
     """
     future_list: List[Future] = []
     for scale in scale_list:
-        f = cal_pos_executor.submit(template_match_with_scale, ctx, source, template, template_mask, scale, threshold)
+        f = cal_pos_executor.submit(template_match_with_scale, ctx, source, template, template_mask, scale, threshold,
+                                    cancel_event)
         thread_utils.handle_future_result(f)
         future_list.append(f)
 
     target: Optional[MatchResult] = None
     for future in future_list:
+        if cancel_event is not None and cancel_event.is_set():
+            for f in future_list:
+                f.cancel()
+            return None
         try:
             result: MatchResult = future.result(1)
             if result is not None:
@@ -429,7 +643,8 @@ def template_match_with_scale_list_parallely(ctx: SrContext,
 
 def template_match_with_scale(ctx: SrContext,
                               source: MatLike, template: MatLike, template_mask: MatLike, scale: float,
-                              threshold: float) -> MatchResult:
+                              threshold: float,
+                              cancel_event: Optional[threading.Event] = None) -> Optional[MatchResult]:
     """
     按一定缩放比例进行模板匹配，返回置信度最高的结果
     :param ctx: 上下文
@@ -438,8 +653,11 @@ def template_match_with_scale(ctx: SrContext,
     :param template_mask: 模板掩码
     :param scale: 模板的缩放比例
     :param threshold: 匹配阈值
+    :param cancel_event: 取消标记 开始匹配前已被设置时 直接返回空
     :return:
     """
+    if cancel_event is not None and cancel_event.is_set():
+        return None
     template_scale = cv2_utils.scale_image(template, scale, copy=False)
     template_mask_scale = cv2_utils.scale_image(template_mask, scale, copy=False)
 
@@ -18,6 +18,7 @@ from sr_od.context.sr_context import SrContext
 from sr_od.operations.move import cal_pos_utils
 from sr_od.operations.move.cal_pos_utils import VerifyPosInfo
 from sr_od.operations.move.get_rid_of_stuck import GetRidOfStuck
+from sr_od.operations.move.pos_tracker import PosTracker
 from sr_od.operations.sr_operation import SrOperation
 from sr_od.operations.technique import UseTechnique
 from sr_od.screen_state import common_screen_state, battle_screen_state
@@ -71,6 +72,7 @@ class MoveDirectly(SrOperation):
         self.last_no_pos_time = 0  # 上一次算不到坐标的时间 目前算坐标太快了 可能地图还在缩放中途就已经失败 所以稍微隔点时间再记录算不到坐标
         self.stop_move_time: Optional[float] = None  # 停止移动的时间
         self.last_move_stuck_time: float = 0  # 上一次脱困结束的时间
+        self.pos_tracker: PosTracker = PosTracker()  # 预测坐标 用于缩小大地图匹配范围
 
         self.run_mode = RunModeEnum.OFF.value.value if no_run else self.ctx.game_config.run_mode
         self.no_battle: bool = no_battle  # 本次移动是否保证没有战斗
@@ -94,6 +96,7 @@ class MoveDirectly(SrOperation):
         if self.ctx.controller.is_moving:  # 连续移动的时候 使用开始点作为一个起始点
             self.pos.append(self.start_pos)
         self.stop_move_time = None
+        self.pos_tracker.reset(self.start_pos, now)
 
         return None
 
@@ -210,6 +213,7 @@ class MoveDirectly(SrOperation):
             stuck_op_result = get_rid_of_stuck.execute()
             if stuck_op_result.success:
                 self.last_rec_time += stuck_op_result.data
+            self.pos_tracker.reset(None, 0)  # 脱困时会往各个方向移动 之前的速度没有参考价值
             self.last_move_stuck_time = time.time()
         else:
             self.stuck_times = 0
@@ -253,6 +257,7 @@ class MoveDirectly(SrOperation):
         self.last_battle_time = fight_end_time
         self.last_rec_time += fight_end_time - fight_start_time  # 战斗可能很久 更改记录时间
         self.ctx.pos_info.pos_first_cal_pos_after_fight = True
+        self.pos_tracker.reset(None, 0)  # 攻击可能产生位移 之前的速度没有参考价值
 
         return self.round_wait()
 
@@ -293,6 +298,18 @@ class MoveDirectly(SrOperation):
         if len(self.pos) == 0:  # 第一个可以直接使用开始点 不进行计算
             return self.start_pos, mm_info
 
+        # 使用运动模型预测的坐标 缩小匹配范围
+        # 攻击和脱困后 移动方向不可预测 只使用最大范围
+        track_rect: Optional[Rect] = None
+        if not self.ctx.pos_info.pos_first_cal_pos_after_fight and self.stuck_times == 0:
+            prediction = self.pos_tracker.predict(now_time, mm_info.angle, self.ctx.controller.is_moving, move_distance)
+            if prediction is not None:
+                predict_pos, predict_radius = prediction
+                track_rect = large_map_utils.get_large_map_rect_by_pos(
+                    self.lm_info.gray.shape, mm.shape[:2],
+                    (predict_pos.x, predict_pos.y, predict_radius))
+                log.debug('预测人物坐标 %s 半径 %.2f', predict_pos, predict_radius)
+
         # 正确移动时 人物不应该偏离直线太远
         # 攻击后 可能因为攻击产生了位移 允许远一点
         # 脱困移动时 会向左右移动 允许远一点
@@ -306,7 +323,11 @@ class MoveDirectly(SrOperation):
                                max_line_distance=max_line_distance
                                )
 
-        next_pos = self.do_cal_pos(mm_info, lm_rect, verify)
+        next_pos = None
+        if track_rect is not None:
+            next_pos = self.do_cal_pos(mm_info, track_rect, verify)
+        if next_pos is None:  # 预测失败时 使用最大范围再试一次
+            next_pos = self.do_cal_pos(mm_info, lm_rect, verify)
 
         if next_pos is None:
             log.error('无法判断当前人物坐标')
@@ -316,6 +337,7 @@ class MoveDirectly(SrOperation):
             if self.ctx.record_coordinate and now_time - self.last_rec_time > 0.5:
                 # RecordCoordinate.save(self.region, mm, next_pos)
                 pass
+            self.pos_tracker.update(next_pos.center, now_time)
         return next_pos.center if next_pos is not None else None, mm_info
 
     def do_cal_pos(self, mm_info: MiniMapInfo,
@@ -334,14 +356,16 @@ class MoveDirectly(SrOperation):
                 lm_rect=lm_rect, retry_without_rect=False,
                 running=self.ctx.controller.is_moving,
                 real_move_time=real_move_time,
-                verify=verify)
+                verify=verify,
+                speculative=self.ctx.controller.is_moving)
             if next_pos is None and self.next_lm_info is not None:
                 next_pos = cal_pos_utils.cal_character_pos(
                     self.ctx, self.next_lm_info, mm_info,
                     lm_rect=lm_rect, retry_without_rect=False,
                     running=self.ctx.controller.is_moving,
                     real_move_time=real_move_time,
-                    verify=verify)
+                    verify=verify,
+                    speculative=self.ctx.controller.is_moving)
         except Exception:
             next_pos = None
             log.error('识别坐标失败', exc_info=True)
@@ -419,8 +443,10 @@ class MoveDirectly(SrOperation):
         """
         self.last_rec_time += self.current_pause_time
         self.last_battle_time += self.current_pause_time
+        self.pos_tracker.shift_time(self.current_pause_time)
 
     def after_operation_done(self, result: OperationResult):
         SrOperation.after_operation_done(self, result)
         if not result.success:
-            self.ctx.controller.stop_moving_forward()
\ No newline at end of file
+            self.ctx.controller.stop_moving_forward()
+        log.debug('定位方法统计 %s', cal_pos_utils.cal_pos_strategy_stat.summary())
\ No newline at end of file
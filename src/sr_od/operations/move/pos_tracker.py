@@ -0,0 +1,120 @@
+import math
+from typing import Optional, Tuple
+
+from one_dragon.base.geometry.point import Point
+
+
+class PosTracker:
+
+    def __init__(self,
+                 min_radius: float = 10,
+                 velocity_alpha: float = 0.5,
+                 max_fix_interval: float = 2):
+        """
+        匀速运动模型的坐标跟踪
+        根据最近几次识别到的坐标估算速度 再结合小地图的朝向 预测下一次的坐标和误差范围
+        用于缩小大地图的匹配范围
+        :param min_radius: 预测范围的最小半径
+        :param velocity_alpha: 更新速度时 新测量速度的权重
+        :param max_fix_interval: 两次坐标间隔超过这个秒数时 不用于估算速度 例如中间进行了战斗
+        """
+        self.min_radius: float = min_radius
+        self.velocity_alpha: float = velocity_alpha
+        self.max_fix_interval: float = max_fix_interval
+
+        self.last_pos: Optional[Point] = None  # 上一次识别到的坐标
+        self.last_time: float = 0  # 上一次识别到坐标的时间
+        self.velocity: Optional[Tuple[float, float]] = None  # 估算的速度 每秒移动的 (x, y)
+        self.error: float = 0  # 预测坐标与识别坐标的平均误差
+
+    def reset(self, pos: Optional[Point], now: float) -> None:
+        """
+        重置跟踪 丢弃之前估算的速度
+        :param pos: 当前坐标
+        :param now: 当前时间
+        :return:
+        """
+        self.last_pos = pos
+        self.last_time = now
+        self.velocity = None
+        self.error = 0
+
+    def shift_time(self, seconds: float) -> None:
+        """
+        暂停等不移动的时间 不应该纳入计算
+        :param seconds: 秒
+        :return:
+        """
+        self.last_time += seconds
+
+    def update(self, pos: Point, now: float) -> None:
+        """
+        识别到新坐标后 更新速度和误差
+        :param pos: 识别到的坐标
+        :param now: 识别的时间
+        :return:
+        """
+        if self.last_pos is None or self.last_time <= 0:
+            self.reset(pos, now)
+            return
+
+        dt = now - self.last_time
+        if dt <= 0:
+            return
+        if dt > self.max_fix_interval:
+            self.reset(pos, now)
+            return
+
+        if self.velocity is not None:
+            px = self.last_pos.x + self.velocity[0] * dt
+            py = self.last_pos.y + self.velocity[1] * dt
+            err = math.hypot(pos.x - px, pos.y - py)
+            self.error = self.error * (1 - self.velocity_alpha) + err * self.velocity_alpha
+
+        vx = (pos.x - self.last_pos.x) / dt
+        vy = (pos.y - self.last_pos.y) / dt
+        if self.velocity is None:
+            self.velocity = (vx, vy)
+        else:
+            a = self.velocity_alpha
+            self.velocity = (self.velocity[0] * (1 - a) + vx * a,
+                             self.velocity[1] * (1 - a) + vy * a)
+
+        self.last_pos = pos
+        self.last_time = now
+
+    def predict(self, now: float, angle: Optional[float], is_moving: bool,
+                max_distance: float) -> Optional[Tuple[Point, float]]:
+        """
+        预测当前坐标和误差范围
+        :param now: 当前时间
+        :param angle: 小地图的人物朝向 正右方为0 顺时针为正
+        :param is_moving: 是否正在往前移动
+        :param max_distance: 这段时间内最多可能移动的距离
+        :return: 预测坐标, 半径。无法预测 或者预测范围不比最大距离小时 返回空
+        """
+        if self.last_pos is None or self.last_time <= 0:
+            return None
+
+        dt = max(now - self.last_time, 0)
+        speed = 0 if self.velocity is None else math.hypot(self.velocity[0], self.velocity[1])
+
+        if not is_moving:
+            # 停下来后只剩下惯性
+            center = self.last_pos
+            radius = self.min_radius + self.error + speed * min(dt, 1)
+        elif self.velocity is None or angle is None:
+            return None
+        else:
+            # 朝向以小地图箭头为准 速度只用大小 转向后也能马上适应
+            rad = math.radians(angle)
+            forward = min(speed * dt, max_distance)
+            center = Point(self.last_pos.x + forward * math.cos(rad),
+                           self.last_pos.y + forward * math.sin(rad))
+            # 误差随时间增长 速度变化(疾跑、撞墙)和朝向误差都包含在内
+            radius = self.min_radius + self.error * 2 + forward * 0.5
+
+        if radius >= max_distance:
+            return None
+
+        return center, radius
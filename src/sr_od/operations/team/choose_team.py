@@ -1,5 +1,3 @@
-import time
-
 import cv2
 from cv2.typing import MatLike
 from typing import ClassVar, Optional
@@ -57,8 +55,9 @@ class ChooseTeam(SrOperation):
             return self.round_retry('未找到配队', wait=0.5)
         else:
             to_click: Point = num_pos[self.team_num]
+            before = self.screenshot()
             if self.ctx.controller.click(to_click):
-                time.sleep(0.5)
+                self.wait_until_changed(before, timeout=0.5)  # 等待切换配队
                 if not self.on:
                     return self.round_success()
                 if self.ctx.controller.click(ChooseTeam.TURN_ON_RECT.center):
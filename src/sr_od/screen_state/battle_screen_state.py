@@ -1,8 +1,9 @@
 from cv2.typing import MatLike
 from enum import Enum
+from typing import List, Optional
 
 from one_dragon.base.screen import screen_utils
-from one_dragon.base.screen.screen_utils import FindAreaResultEnum
+from one_dragon.base.screen.screen_area import ScreenArea
 from sr_od.context.sr_context import SrContext
 from sr_od.screen_state import common_screen_state
 
@@ -14,6 +15,32 @@ class ScreenState(Enum):
     BATTLE_SUCCESS: str = '挑战成功'
 
 
+_BATTLE_SUCCESS_AREA_LIST: List[str] = [
+    '挑战成功-有奖励',
+    '挑战成功-双倍奖励',
+    '挑战成功-无奖励',
+]
+
+_BATTLE_FAIL_AREA_LIST: List[str] = [
+    '战斗失败-有奖励',
+    '战斗失败-双倍奖励',
+    '战斗失败-无奖励',
+]
+
+
+def _find_battle_result_area(ctx: SrContext, screen: MatLike, area_name_list: List[str]) -> Optional[ScreenArea]:
+    """
+    战斗画面中 找到第一个出现的战斗结果区域
+    各个区域位置重叠 合并后只需要识别一次
+    :param ctx: 上下文
+    :param screen: 游戏画面
+    :param area_name_list: 区域名称
+    :return: 找到的区域
+    """
+    area_list = [ctx.screen_loader.get_area('战斗画面', area_name) for area_name in area_name_list]
+    return screen_utils.find_any_area_in_screen(ctx, screen, area_list)
+
+
 def is_battle_fail(ctx: SrContext, screen: MatLike) -> bool:
     """
     是否在战斗失败画面
@@ -21,11 +48,7 @@ def is_battle_fail(ctx: SrContext, screen: MatLike) -> bool:
     :param screen: 游戏画面
     :return:
     """
-    return (
-            screen_utils.find_area(ctx, screen, '战斗画面', '战斗失败-有奖励') == FindAreaResultEnum.TRUE
-            or screen_utils.find_area(ctx, screen, '战斗画面', '战斗失败-双倍奖励') == FindAreaResultEnum.TRUE
-            or screen_utils.find_area(ctx, screen, '战斗画面', '战斗失败-无奖励') == FindAreaResultEnum.TRUE
-    )
+    return _find_battle_result_area(ctx, screen, _BATTLE_FAIL_AREA_LIST) is not None
 
 
 def get_tp_battle_screen_state(
@@ -47,28 +70,19 @@ def get_tp_battle_screen_state(
     if in_world and common_screen_state.is_normal_in_world(ctx, screen):
         return common_screen_state.ScreenState.NORMAL_IN_WORLD.value
 
+    area_name_list: List[str] = []
     if battle_success:
-        success_area_list = [
-            '挑战成功-有奖励',
-            '挑战成功-双倍奖励',
-            '挑战成功-无奖励',
-        ]
-
-        for area_name in success_area_list:
-            result = screen_utils.find_area(ctx, screen, '战斗画面', area_name)
-            if result == FindAreaResultEnum.TRUE:
-                return ScreenState.BATTLE_SUCCESS.value
-
+        area_name_list.extend(_BATTLE_SUCCESS_AREA_LIST)
     if battle_fail:
-        fail_area_list = [
-            '战斗失败-有奖励',
-            '战斗失败-双倍奖励',
-            '战斗失败-无奖励',
-        ]
-
-        for area_name in fail_area_list:
-            result = screen_utils.find_area(ctx, screen, '战斗画面', area_name)
-            if result == FindAreaResultEnum.TRUE:
+        area_name_list.extend(_BATTLE_FAIL_AREA_LIST)
+
+    if len(area_name_list) > 0:
+        # 成功和失败的区域在同一位置 一次识别后按顺序判断 成功优先
+        area = _find_battle_result_area(ctx, screen, area_name_list)
+        if area is not None:
+            if area.area_name in _BATTLE_SUCCESS_AREA_LIST:
+                return ScreenState.BATTLE_SUCCESS.value
+            else:
                 return ScreenState.BATTLE_FAIL.value
 
-    return ScreenState.BATTLE.value
\ No newline at end of file
+    return ScreenState.BATTLE.value
@@ -4,9 +4,12 @@ from cv2.typing import MatLike
 from enum import Enum
 from typing import List
 
+from one_dragon.base.matcher.match_result import MatchResultList
+from one_dragon.base.matcher.ocr import ocr_utils
 from one_dragon.base.screen import screen_utils
 from one_dragon.base.screen.screen_utils import FindAreaResultEnum
-from one_dragon.utils import cv2_utils
+from one_dragon.utils import cv2_utils, str_utils
+from one_dragon.utils.i18_utils import gt
 from sr_od.context.sr_context import SrContext
 
 
@@ -51,6 +54,39 @@ def is_express_supply(ctx: SrContext, screen: MatLike) -> bool:
             or screen_utils.find_area(ctx, screen, '列车补给', '列车补给2') == FindAreaResultEnum.TRUE)
 
 
+def get_ui_title_ocr_result(ctx: SrContext, screen: MatLike,
+                            screen_name: str, area_name: str,
+                            merge_line_distance: float = -1) -> dict[str, MatchResultList]:
+    """
+    识别标题区域 同一张截图的同一区域只OCR一次 新截图后失效
+    返回的结果是共用的 不能修改
+    :param ctx: 上下文
+    :param screen: 游戏画面
+    :param screen_name: 画面名称
+    :param area_name: 区域名称
+    :param merge_line_distance: 多少行距内合并结果 -1为不合并
+    :return: OCR结果
+    """
+    memo = {} if ctx.controller is None else ctx.controller.get_frame_memo(screen)
+    key = ('ui_title', screen_name, area_name, merge_line_distance)
+    ocr_result_map = memo.get(key)
+    if ocr_result_map is not None:
+        return ocr_result_map
+
+    if merge_line_distance == -1:
+        area = ctx.screen_loader.get_area(screen_name, area_name)
+        part = cv2_utils.crop_image_only(screen, area.rect)
+        # cv2_utils.show_image(part, wait=0)
+        ocr_result_map = ctx.ocr.run_ocr(part)
+    else:  # 合并行只需要在原始结果上处理
+        ocr_result_map = ocr_utils.merge_ocr_result_to_multiple_line(
+            get_ui_title_ocr_result(ctx, screen, screen_name, area_name),
+            join_space=True, merge_line_distance=merge_line_distance)
+
+    memo[key] = ocr_result_map
+    return ocr_result_map
+
+
 def get_ui_titles(ctx: SrContext, screen: MatLike,
                   screen_name: str = '', area_name: str = '') -> List[str]:
     """
@@ -62,11 +98,7 @@ def get_ui_titles(ctx: SrContext, screen: MatLike,
     :param area_name: 需要识别的区域名称
     :return:
     """
-    area = ctx.screen_loader.get_area(screen_name, area_name)
-    part = cv2_utils.crop_image_only(screen, area.rect)
-    # cv2_utils.show_image(part, wait=0)
-    ocr_result_map = ctx.ocr.run_ocr(part)
-    return list(ocr_result_map.keys())
+    return list(get_ui_title_ocr_result(ctx, screen, screen_name, area_name).keys())
 
 
 def in_secondary_ui(ctx: SrContext, screen: MatLike,
@@ -74,6 +106,7 @@ def in_secondary_ui(ctx: SrContext, screen: MatLike,
                     screen_name: str = '通用画面', area_name: str = '左上角标题') -> bool:
     """
     根据页面左上方标题文字 判断在哪个二级页面中
+    同一张截图只OCR一次 不同标题只需要重新比较文本
     :param ctx: 上下文
     :param screen: 游戏画面
     :param title_cn: 中文标题
@@ -82,13 +115,19 @@ def in_secondary_ui(ctx: SrContext, screen: MatLike,
     :param area_name: 识别区域
     :return:
     """
-    area = ctx.screen_loader.get_area(screen_name, area_name)
-    part, _ = cv2_utils.crop_image(screen, area.rect)
-    # cv2_utils.show_image(part, wait=0)
-    ocr_map = ctx.ocr.match_words(part, words=[title_cn],
-                                  lcs_percent=lcs_percent, merge_line_distance=10)
-
-    return len(ocr_map) > 0
+    ocr_result_map = get_ui_title_ocr_result(ctx, screen, screen_name, area_name, merge_line_distance=10)
+
+    # 与 ctx.ocr.match_words 的判断一致
+    target = gt(title_cn, 'ocr').lower()
+    for ocr_result in ocr_result_map.keys():
+        ocr_result = ocr_result.lower()
+        if lcs_percent == -1:
+            if ocr_result.find(target) != -1:
+                return True
+        elif str_utils.find_by_lcs(target, ocr_result, percent=lcs_percent):
+            return True
+
+    return False
 
 
 def click_empty_to_close(ctx: SrContext) -> bool:
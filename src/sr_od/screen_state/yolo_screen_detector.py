@@ -211,7 +211,7 @@ class YoloScreenDetector:
             'detect_info.yml'
         )
 
-        yaml_data = YamlOperator(file_path)
+        yaml_data = YamlOperator(file_path, is_asset=True)
         for data_item in yaml_data.data:
             info = SrDetectClass(**data_item)
             self.detect_info_list.append(info)
@@ -70,7 +70,7 @@ class ChooseSpecialPoint(SrOperation):
 
         if dx != 0 or dy != 0:
             large_map_utils.drag_in_large_map(self.ctx, dx, dy)
-            time.sleep(0.5)
+            self.wait_until_stable(timeout=0.5, diff_threshold=2)  # 等待地图拖动的惯性结束
 
         return self.round_retry()
 
@@ -6,7 +6,9 @@ from typing import List, Optional
 from one_dragon.base.config.yaml_operator import YamlOperator
 from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
-from one_dragon.utils import os_utils, str_utils, cv2_utils, cal_utils
+from one_dragon.utils import os_utils, str_utils, cv2_utils, cal_utils, image_pack_utils
+from one_dragon.utils.image_pack_utils import ImagePack
+from one_dragon.utils.log_utils import log
 from one_dragon.utils.i18_utils import gt
 from sr_od.sr_map.large_map_info import LargeMapInfo
 from sr_od.sr_map.sr_map_def import Planet, Region, SpecialPoint
@@ -25,6 +27,7 @@ class SrMapData:
         self.load_map_data()
 
         self.large_map_info_map: dict[str, LargeMapInfo] = {}
+        self.large_map_pack_map: dict[str, Optional[ImagePack]] = {}  # 星球 -> 打包的大地图
 
     def load_map_data(self) -> None:
         """
@@ -45,7 +48,7 @@ class SrMapData:
         :return:
         """
         file_path = os.path.join(self.get_map_data_dir(), 'planet.yml')
-        yaml_op = YamlOperator(file_path)
+        yaml_op = YamlOperator(file_path, is_asset=True)
         self.planet_list = [Planet(**item) for item in yaml_op.data]
 
     def load_region_data(self) -> None:
@@ -58,7 +61,7 @@ class SrMapData:
 
         for p in self.planet_list:
             file_path = os.path.join(self.get_map_data_dir(), p.np_id, f'{p.np_id}.yml')
-            yaml_op = YamlOperator(file_path)
+            yaml_op = YamlOperator(file_path, is_asset=True)
             self.planet_2_region[p.np_id] = []
 
             for r in yaml_op.data:
@@ -98,7 +101,7 @@ class SrMapData:
             loaded_region_set.add(region.pr_id)
 
             file_path = os.path.join(self.get_map_data_dir(), region.planet.np_id, f'{region.pr_id}.yml')
-            yaml_op = YamlOperator(file_path)
+            yaml_op = YamlOperator(file_path, is_asset=True)
 
             for sp_data in yaml_op.data:
                 real_planet = self.best_match_planet_by_name(sp_data['planet_name'])
@@ -274,14 +277,70 @@ class SrMapData:
         :param region: 对应区域
         :return: 地图图片
         """
-        dir_path = SrMapData.get_large_map_dir_path(region)
         info = LargeMapInfo()
         info.region = region
-        info.raw = cv2_utils.read_image(os.path.join(dir_path, 'raw.png'))
-        info.mask = cv2_utils.read_image(os.path.join(dir_path, 'mask.png'))
+        info.raw = self.get_large_map_image(region, 'raw')
+        info.mask = self.get_large_map_image(region, 'mask')
         self.large_map_info_map[region.prl_id] = info
         return info
 
+    def get_large_map_pack(self, planet: Planet) -> Optional[ImagePack]:
+        """
+        获取某个星球打包的大地图 没有生成时返回空
+        :param planet: 星球
+        :return:
+        """
+        if planet.np_id not in self.large_map_pack_map:
+            pack = ImagePack(SrMapData.get_large_map_pack_path(planet))
+            self.large_map_pack_map[planet.np_id] = pack if pack.is_valid else None
+        return self.large_map_pack_map[planet.np_id]
+
+    def build_large_map_pack(self, planet: Planet) -> None:
+        """
+        将某个星球的全部大地图不压缩地打包成一个文件
+        使用时内存映射读取 不需要解码图片
+        :param planet: 星球
+        :return:
+        """
+        image_map: dict[str, MatLike] = {}
+        meta_map: dict[str, dict] = {}
+        for region in self.get_region_list_by_planet(planet):
+            for mt in ['raw', 'mask']:
+                path = SrMapData.get_map_path(region, mt)
+                image = cv2_utils.read_image(path)
+                if image is None:
+                    continue
+                key = SrMapData.get_large_map_pack_key(region, mt)
+                image_map[key] = image
+                meta_map[key] = image_pack_utils.get_file_meta(path)
+
+        old_pack = self.large_map_pack_map.pop(planet.np_id, None)
+        if old_pack is not None:
+            old_pack.close()
+        pack_path = SrMapData.get_large_map_pack_path(planet)
+        image_pack_utils.write_image_pack(pack_path, image_map, meta_map)
+        log.info('大地图打包完成 %s 共 %d 张图片', planet.cn, len(image_map))
+
+    @staticmethod
+    def get_large_map_pack_path(planet: Planet) -> str:
+        """
+        某个星球打包的大地图的文件路径
+        :param planet: 星球
+        :return:
+        """
+        return os.path.join(os_utils.get_path_under_work_dir('assets', 'template', 'large_map'),
+                            planet.np_id, 'large_map.pack')
+
+    @staticmethod
+    def get_large_map_pack_key(region: Region, mt: str = 'raw') -> str:
+        """
+        某张地图在打包文件中的key
+        :param region: 区域
+        :param mt: 地图类型
+        :return:
+        """
+        return '%s/%s' % (region.rl_id, mt)
+
     def get_large_map_info(self, region: Region) -> LargeMapInfo:
         """
         获取某张大地图
@@ -326,15 +385,18 @@ class SrMapData:
         path = SrMapData.get_map_path(region, mt)
         cv2_utils.save_image(image, path)
 
-    @staticmethod
-    def get_large_map_image(region: Region, mt: str = 'raw') -> MatLike:
+    def get_large_map_image(self, region: Region, mt: str = 'raw') -> MatLike:
         """
-        保存某张地图
+        读取某张地图 有打包文件且图片没有更改时 直接返回打包文件的内存映射 不需要解码
         :param region: 区域
         :param mt: 地图类型
         :return:
         """
         path = SrMapData.get_map_path(region, mt)
+        image = image_pack_utils.get_fresh_image(self.get_large_map_pack(region.planet),
+                                                 SrMapData.get_large_map_pack_key(region, mt), path)
+        if image is not None:
+            return image
         return cv2_utils.read_image(path)
 
 